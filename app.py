@@ -4,6 +4,7 @@ Aplicación Streamlit para procesamiento de reportes de comedores comunitarios
 Versión 2.0 - Arquitectura modular con extracción estructurada
 """
 
+import hashlib
 import streamlit as st
 from datetime import datetime
 from logger_config import logger
@@ -12,7 +13,12 @@ from logger_config import logger
 try:
     from excel_processor import ExcelProcessor
     from data_extractor import DataExtractor
-    from utils import UtilsHelper, FileValidator
+    from utils import UtilsHelper
+    from result_cache import ResultCache
+    from batch_processor import procesar_lote
+    from record_builder import concatenar_registros
+    from report_summary import resumir
+    from artifact_store import AlmacenArtefactos, huella_dataframe
     PROCESAMIENTO_DISPONIBLE = True
 except ImportError as e:
     st.error(f"❌ Error importando módulos de procesamiento: {e}")
@@ -21,6 +27,7 @@ except ImportError as e:
 # 📄 IMPORTAR MÓDULOS DE PDF
 try:
     from pdf_generator import GeneradorPDFsRutas
+    from render_cache import RenderCache
     PDF_DISPONIBLE = True
 except ImportError:
     PDF_DISPONIBLE = False
@@ -32,6 +39,12 @@ try:
 except ImportError:
     EMAIL_DISPONIBLE = False
 
+# 🏹 IMPORTAR EXPORTACIÓN COLUMNAR (requiere pyarrow)
+try:
+    from columnar_export import ARROW_DISPONIBLE, exportar_arrow_ipc, exportar_parquet
+except ImportError:
+    ARROW_DISPONIBLE = False
+
 # 📊 IMPORTAR MÓDULOS DE GOOGLE SHEETS
 try:
     from google_sheets_handler import GoogleSheetsHandler
@@ -99,9 +112,182 @@ def mostrar_sidebar():
         else:
             st.warning("⚠️ Google Sheets no disponibles")
         
+        if PROCESAMIENTO_DISPONIBLE:
+            stats_cache = obtener_cache_resultados().estadisticas()
+            st.caption(
+                f"💾 Caché: {stats_cache['aciertos']} aciertos / {stats_cache['fallos']} fallos · "
+                f"{stats_cache['entradas']} archivos ({stats_cache['tamano_bytes'] / 1e6:.1f} MB)"
+            )
+        
         st.markdown("---")
         st.markdown("**🚀 Versión 2.0**\nArquitectura modular")
 
+@st.cache_resource
+def obtener_cache_resultados():
+    """
+    💾 Caché de resultados compartida por todas las sesiones del servidor
+    """
+    return ResultCache(ExcelProcessor.VERSION)
+
+@st.cache_resource
+def obtener_cache_guias():
+    """
+    🗃️ Caché de guías PDF renderizadas compartida por todas las sesiones del servidor
+    """
+    return RenderCache(GeneradorPDFsRutas.VERSION)
+
+def firma_archivos(archivos_subidos):
+    """
+    🔏 Identifica el conjunto de archivos cargados por identidad (id, nombre, tamaño) y hash de contenido
+    
+    El hash de cada archivo se calcula una sola vez por sesión.
+    """
+    hashes_previos = st.session_state.get('hash_por_archivo', {})
+    hashes = {}
+    firma = []
+    for archivo in archivos_subidos:
+        identidad = (getattr(archivo, 'file_id', None), archivo.name, archivo.size)
+        if identidad in hashes_previos:
+            hashes[identidad] = hashes_previos[identidad]
+        else:
+            hashes[identidad] = hashlib.sha256(archivo.getvalue()).hexdigest()
+        firma.append((identidad, hashes[identidad]))
+    st.session_state.hash_por_archivo = hashes
+    return tuple(firma)
+
+def consolidar_lote(resultados_lote):
+    """
+    🧩 Guarda en la sesión el lote procesado, el DataFrame consolidado y sus resúmenes
+    
+    Los totales y agregados (ResumenReporte) se calculan aquí una vez por lote: las
+    métricas, las hojas del Excel y el correo los leen sin volver a agrupar.
+    """
+    lista_de_resultados = [res for res in resultados_lote if res['error'] is None]
+    for resultado in lista_de_resultados:
+        resultado['resumen'] = resumir(resultado['df'])
+    st.session_state.resultados_lote = resultados_lote
+    
+    # Consolidar todos los DataFrames
+    if lista_de_resultados:
+        df_combinado = concatenar_registros([res['df'] for res in lista_de_resultados])
+        st.session_state.df_procesado = df_combinado
+        st.session_state.resumen_reporte = resumir(df_combinado)
+        # Los artefactos del lote anterior ya no sirven
+        st.session_state.huella_datos = huella_dataframe(df_combinado)
+        obtener_almacen_artefactos().limpiar()
+        st.session_state.info_extraida = lista_de_resultados[0]['info_extraida']  # Usar info del primer archivo
+        st.session_state.tipo_archivo = 'MULTIPROCESADO'
+        st.session_state.nombres_archivos = [res['nombre_archivo'] for res in lista_de_resultados]
+
+def obtener_almacen_artefactos():
+    """
+    🧺 Almacén de artefactos (Excel, ZIP de guías) de la sesión, guardados en disco
+    """
+    if 'almacen_artefactos' not in st.session_state:
+        st.session_state.almacen_artefactos = AlmacenArtefactos()
+    return st.session_state.almacen_artefactos
+
+def _huella_datos():
+    df_procesado = st.session_state.df_procesado
+    if 'huella_datos' not in st.session_state:
+        st.session_state.huella_datos = huella_dataframe(df_procesado)
+    return st.session_state.huella_datos
+
+def obtener_excel_reporte():
+    """
+    📊 Excel consolidado del lote; se escribe una vez por datos y parámetros
+    
+    Returns:
+        tuple: (Artefacto, reutilizado)
+    """
+    info_extraida = st.session_state.get('info_extraida', {})
+    tipo_archivo = st.session_state.get('tipo_archivo', 'PROCESADO')
+    
+    def crear():
+        excel = UtilsHelper.crear_excel_descarga_universal(
+            st.session_state.df_procesado, tipo_archivo, info_extraida, st.session_state.get('resumen_reporte')
+        )
+        return excel, {}
+    
+    parametros = {'tipo_archivo': tipo_archivo, 'info_extraida': info_extraida}
+    return obtener_almacen_artefactos().obtener_o_crear("excel", _huella_datos(), parametros, crear)
+
+def obtener_zip_guias(modo, elaborado_por, dictamen, lotes_personalizados, transporte_por_ruta):
+    """
+    📦 ZIP de guías del lote; se renderiza una vez por datos y parámetros
+    
+    El botón de descarga y el correo piden el mismo ZIP: el segundo lo recibe ya generado.
+    
+    Returns:
+        tuple: (Artefacto, reutilizado); el detalle trae num_pdfs, guias_reutilizadas y
+               guias_fallidas (guías que excedieron el tiempo límite y no están en el ZIP)
+    """
+    # Solo se renderizan las guías cuyos datos o parámetros cambiaron
+    generador = GeneradorPDFsRutas(cache=obtener_cache_guias())
+    
+    def crear():
+        zip_archivo, num_pdfs = generador.generar_todos_los_pdfs(
+            st.session_state.df_procesado,
+            modo=modo,
+            elaborado_por=elaborado_por,
+            dictamen=dictamen,
+            lotes_personalizados=lotes_personalizados,
+            transporte_por_ruta=transporte_por_ruta,
+            paralelo=True
+        )
+        return zip_archivo, {
+            'num_pdfs': num_pdfs,
+            'guias_reutilizadas': generador.guias_reutilizadas,
+            'guias_fallidas': list(generador.guias_fallidas)
+        }
+    
+    parametros = generador.parametros_lote(modo, elaborado_por, dictamen, lotes_personalizados, transporte_por_ruta)
+    return obtener_almacen_artefactos().obtener_o_crear("zip", _huella_datos(), parametros, crear)
+
+# Formatos columnares: (extensión, tipo MIME)
+FORMATOS_COLUMNARES = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+def obtener_exportacion_columnar(formato):
+    """
+    🏹 Parquet o Arrow IPC del DataFrame consolidado; se escribe una vez por lote
+    
+    Returns:
+        tuple: (Artefacto, reutilizado)
+    """
+    exportar = exportar_parquet if formato == 'parquet' else exportar_arrow_ipc
+    
+    def crear():
+        return exportar(st.session_state.df_procesado), {}
+    
+    return obtener_almacen_artefactos().obtener_o_crear(formato, _huella_datos(), {}, crear)
+
+def mostrar_descargas_columnares():
+    """
+    📥 Botones de descarga del DataFrame consolidado en Parquet y Arrow IPC
+    """
+    if not ARROW_DISPONIBLE:
+        st.caption("ℹ️ Instala pyarrow para descargar los datos en Parquet / Arrow")
+        return
+    
+    st.markdown("**🏹 Datos normalizados (formatos columnares)**")
+    col1, col2 = st.columns(2)
+    for col, (formato, etiqueta) in zip((col1, col2), (('parquet', "📦 Descargar Parquet"), ('arrow', "🏹 Descargar Arrow IPC"))):
+        extension, mime = FORMATOS_COLUMNARES[formato]
+        with col:
+            artefacto, _ = obtener_exportacion_columnar(formato)
+            with artefacto.abrir() as archivo:
+                st.download_button(
+                    label=etiqueta,
+                    data=archivo,
+                    file_name=f"datos_procesados.{extension}",
+                    mime=mime,
+                    key=f"descargar_{formato}",
+                    help="Mismo esquema tipado en cada lote; se lee con pandas, Polars, DuckDB o Spark"
+                )
+
 def mostrar_tab_procesamiento():
     """
     📊 Tab principal de procesamiento de múltiples archivos
@@ -133,38 +319,24 @@ def mostrar_tab_procesamiento():
     # 🔄 PROCESAR ARCHIVOS
     if archivos_subidos and PROCESAMIENTO_DISPONIBLE:
         
-        lista_de_resultados = []
-        all_dataframes = []
+        # Solo se reprocesa cuando cambia el conjunto de archivos: los reruns de Streamlit
+        # (cualquier interacción con un widget) reutilizan el lote ya procesado
+        firma = firma_archivos(archivos_subidos)
+        if st.session_state.get('firma_lote') != firma:
+            # Procesar todos los archivos en paralelo (los ya procesados se sirven desde la caché)
+            with st.spinner(f"🔄 Procesando {len(archivos_subidos)} archivo(s) en paralelo..."):
+                resultados_lote = procesar_lote(
+                    [(archivo.name, archivo.getvalue()) for archivo in archivos_subidos],
+                    cache=obtener_cache_resultados()
+                )
+            consolidar_lote(resultados_lote)
+            st.session_state.firma_lote = firma
         
-        # Procesar cada archivo
-        for i, archivo in enumerate(archivos_subidos):
-            # Validación previa del archivo
-            es_valido, mensaje = FileValidator.validar_archivo_excel(archivo)
-            if not es_valido:
-                st.error(f"❌ {archivo.name}: {mensaje}")
-                continue
-            
-            with st.spinner(f"🔄 Procesando {archivo.name} ({i+1}/{len(archivos_subidos)})..."):
-                # Inicializar procesador
-                processor = ExcelProcessor()
-                
-                
-                # Procesar archivo completo
-                resultado = processor.procesar_archivo_completo(archivo)
-                df_procesado, num_registros, tipo_archivo, info_extraida = resultado
-                
-            
-            if df_procesado is not None and num_registros > 0:
-                # Almacenar resultado
-                lista_de_resultados.append({
-                    'nombre_archivo': archivo.name,
-                    'df': df_procesado,
-                    'info_extraida': info_extraida,
-                    'num_registros': num_registros
-                })
-                all_dataframes.append(df_procesado)
-            else:
-                st.error(f"❌ No se pudieron procesar los datos del archivo {archivo.name}")
+        resultados_lote = st.session_state.resultados_lote
+        lista_de_resultados = [res for res in resultados_lote if res['error'] is None]
+        for resultado in resultados_lote:
+            if resultado['error'] is not None:
+                st.error(f"❌ {resultado['nombre_archivo']}: {resultado['error']}")
         
         # Mostrar resultados por archivo
         if lista_de_resultados:
@@ -172,27 +344,32 @@ def mostrar_tab_procesamiento():
             
             for resultado in lista_de_resultados:
                 st.subheader(f"📄 {resultado['nombre_archivo']}")
+                if resultado['desde_cache']:
+                    st.caption("💾 Resultado recuperado de la caché")
+                else:
+                    st.caption(f"⏱️ Procesado en {resultado['segundos']:.2f} s")
                 
                 # Mostrar resumen básico
                 df = resultado['df']
                 info = resultado['info_extraida']
+                totales = (resultado.get('resumen') or resumir(df)).totales
                 
                 # Métricas clave
                 col1, col2, col3, col4, col5, col6, col7 = st.columns(7)  # <-- CAMBIO A 7 COLUMNAS
                 with col1:
                     st.metric("Programa", info.get('programa', 'N/A')[:20] + "..." if len(str(info.get('programa', 'N/A'))) > 20 else info.get('programa', 'N/A'))
                 with col2:
-                    st.metric("👥 Beneficiarios", int(df['COBER'].sum()) if 'COBER' in df.columns else 0)
+                    st.metric("👥 Beneficiarios", int(totales['COBER']))
                 with col3:
-                    st.metric("🐷 Cerdo (kg)", f"{df['CARNE_DE_CERDO'].sum():.1f}" if 'CARNE_DE_CERDO' in df.columns else "0.0")
+                    st.metric("🐷 Cerdo (kg)", f"{totales['CARNE_DE_CERDO']:.1f}")
                 with col4:
-                    st.metric("🐄 Res (kg)", f"{df['CARNE_DE_RES'].sum():.1f}" if 'CARNE_DE_RES' in df.columns else "0.0")
+                    st.metric("🐄 Res (kg)", f"{totales['CARNE_DE_RES']:.1f}")
                 with col5:
-                    st.metric("🍗 Muslo (und)", int(df['MUSLO_CONTRAMUSLO'].sum()) if 'MUSLO_CONTRAMUSLO' in df.columns else 0)
+                    st.metric("🍗 Muslo (und)", int(totales['MUSLO_CONTRAMUSLO']))
                 with col6:
-                    st.metric("🐔 Pechuga (kg)", f"{df['POLLO_PESO'].sum():.1f}" if 'POLLO_PESO' in df.columns else "0.0")
+                    st.metric("🐔 Pechuga (kg)", f"{totales['POLLO_PESO']:.1f}")
                 with col7:  # <-- NUEVA COLUMNA TILAPIA
-                    st.metric("🐟 Tilapia (kg)", f"{df['TILAPIA'].sum():.1f}" if 'TILAPIA' in df.columns else "0.0")
+                    st.metric("🐟 Tilapia (kg)", f"{totales['TILAPIA']:.1f}")
                 
                 # Vista previa del DataFrame
                 st.caption("Vista previa (10 primeras filas):")
@@ -200,70 +377,81 @@ def mostrar_tab_procesamiento():
                 
                 st.markdown("---")
             
-            # Consolidar todos los DataFrames
-            if all_dataframes:
-                import pandas as pd
-                df_combinado = pd.concat(all_dataframes, ignore_index=True)
-                st.session_state.df_procesado = df_combinado
-                st.session_state.info_extraida = lista_de_resultados[0]['info_extraida']  # Usar info del primer archivo
-                st.session_state.tipo_archivo = 'MULTIPROCESADO'
-                
-                # --- AÑADIR ESTA LÍNEA ---
-                st.session_state.nombres_archivos = [res['nombre_archivo'] for res in lista_de_resultados]
-                
-                st.success(f"✅ {len(archivos_subidos)} archivos procesados exitosamente. {len(df_combinado)} registros totales consolidados.")
-                
+            st.success(f"✅ {len(lista_de_resultados)} archivos procesados exitosamente. {len(st.session_state.df_procesado)} registros totales consolidados.")
+            mostrar_descargas_columnares()
             
         else:
             st.error("❌ No se pudo procesar ningún archivo")
             mostrar_ayuda_troubleshooting()
 
 
-def enviar_correo_completo(destinatarios, asunto, incluir_excel, incluir_pdfs, config_pdfs):
+def enviar_correo_completo(destinatarios, asunto, incluir_excel, incluir_pdfs, config_pdfs, formatos_columnares=()):
     """
     📤 Envía correo con adjuntos configurados
+    
+    formatos_columnares: 'parquet' y/o 'arrow' para adjuntar también los datos normalizados
     """
     with st.spinner("📤 Preparando y enviando correo..."):
+        archivos_adjuntos = []
         try:
-            archivos_adjuntos = []
             df_procesado = st.session_state.df_procesado
             info_extraida = st.session_state.get('info_extraida', {})
-            tipo_archivo = st.session_state.get('tipo_archivo', 'PROCESADO')
             # --- AÑADIR ESTA LÍNEA ---
             nombres_archivos = st.session_state.get('nombres_archivos', [])
+            resumen = st.session_state.get('resumen_reporte')
+            
+            # Excel y ZIP: si ya se generaron en esta sesión con los mismos datos y parámetros, se reutilizan
+            reutilizados = []
             
             # Generar Excel si se solicita
             if incluir_excel:
-                excel_buffer = UtilsHelper.crear_excel_descarga_universal(df_procesado, tipo_archivo, info_extraida)
+                excel, reutilizado = obtener_excel_reporte()
+                if reutilizado:
+                    reutilizados.append("Excel")
                 nombre_excel = UtilsHelper.generar_nombre_archivo_unico("reporte_correo")
                 archivos_adjuntos.append({
-                    'buffer': excel_buffer,
+                    'buffer': excel.buffer(),
                     'nombre': nombre_excel
                 })
             
             # Generar PDFs si se solicita
             if incluir_pdfs and PDF_DISPONIBLE:
-                from pdf_generator import GeneradorPDFsRutas
-                generador = GeneradorPDFsRutas()
                 modo = "por_comedor" if config_pdfs.get('modo_pdf') == "Un PDF por comedor" else "por_ruta"
                 
-                zip_buffer, num_pdfs = generador.generar_todos_los_pdfs(
-                    df_procesado,
-                    modo=modo,
-                    elaborado_por=config_pdfs.get('elaborado_por', "Supervisor"),
-                    dictamen=config_pdfs.get('dictamen', "APROBADO"),
-                    lotes_personalizados=config_pdfs.get('lotes_personalizados', {}),
-                    transporte_por_ruta=config_pdfs.get('transporte_por_ruta', {}) # <-- NUEVO PARÁMETRO
+                zip_guias, reutilizado = obtener_zip_guias(
+                    modo,
+                    config_pdfs.get('elaborado_por', "Supervisor"),
+                    config_pdfs.get('dictamen', "APROBADO"),
+                    config_pdfs.get('lotes_personalizados', {}),
+                    config_pdfs.get('transporte_por_ruta', {})
                 )
+                if reutilizado:
+                    reutilizados.append(f"ZIP de {zip_guias.detalle['num_pdfs']} PDFs")
+                if zip_guias.detalle['guias_fallidas']:
+                    st.warning(f"⚠️ Guías fuera del ZIP por tiempo límite: {', '.join(zip_guias.detalle['guias_fallidas'])}")
                 
                 nombre_zip = UtilsHelper.generar_nombre_archivo_unico("guias_correo", "zip")
                 archivos_adjuntos.append({
-                    'buffer': zip_buffer,
+                    'buffer': zip_guias.buffer(),
                     'nombre': nombre_zip
                 })
             
+            # Datos normalizados en formatos columnares
+            if ARROW_DISPONIBLE:
+                for formato in formatos_columnares:
+                    columnar, reutilizado = obtener_exportacion_columnar(formato)
+                    if reutilizado:
+                        reutilizados.append(formato.capitalize())
+                    archivos_adjuntos.append({
+                        'buffer': columnar.buffer(),
+                        'nombre': UtilsHelper.generar_nombre_archivo_unico("datos_correo", FORMATOS_COLUMNARES[formato][0])
+                    })
+            
+            if reutilizados:
+                st.caption(f"♻️ Adjuntos ya generados en esta sesión (sin volver a generarlos): {', '.join(reutilizados)}")
+            
             # Crear mensaje HTML
-            estadisticas = UtilsHelper.extraer_estadisticas_rapidas(df_procesado)
+            estadisticas = UtilsHelper.extraer_estadisticas_rapidas(df_procesado, resumen)
             # --- MODIFICAR ESTA LLAMADA ---
             mensaje_html = UtilsHelper.crear_mensaje_html_correo(estadisticas, info_extraida, nombres_archivos)
             
@@ -283,6 +471,10 @@ def enviar_correo_completo(destinatarios, asunto, incluir_excel, incluir_pdfs, c
                 
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
+        finally:
+            # Los adjuntos son archivos abiertos del almacén de artefactos
+            for adjunto in archivos_adjuntos:
+                adjunto['buffer'].close()
 
 def mostrar_tab_generar_y_enviar():
     """
@@ -373,28 +565,31 @@ def mostrar_tab_generar_y_enviar():
         # Botón de generación de PDFs
         if st.button("📄 Generar ZIP de PDFs", type="primary"):
             with st.spinner("📄 Generando PDFs con paginación de 4 filas..."):
-                generador = GeneradorPDFsRutas()
                 modo = "por_comedor" if modo_pdf == "Un PDF por comedor" else "por_ruta"
                 
-                zip_buffer, num_pdfs = generador.generar_todos_los_pdfs(
-                    st.session_state.df_procesado,
-                    modo=modo,
-                    elaborado_por=elaborado_por,
-                    dictamen=dictamen,
-                    lotes_personalizados=lotes_personalizados,
-                    transporte_por_ruta=transporte_por_ruta # <-- NUEVO PARÁMETRO
+                zip_guias, reutilizado = obtener_zip_guias(
+                    modo, elaborado_por, dictamen, lotes_personalizados, transporte_por_ruta
                 )
+                num_pdfs = zip_guias.detalle['num_pdfs']
                 
                 nombre_zip = UtilsHelper.generar_nombre_archivo_unico(f"guias_{modo}", "zip")
                 
-                st.download_button(
-                    label=f"📦 Descargar ZIP ({num_pdfs} PDFs)",
-                    data=zip_buffer,
-                    file_name=nombre_zip,
-                    mime="application/zip"
-                )
+                with zip_guias.abrir() as archivo_zip:
+                    st.download_button(
+                        label=f"📦 Descargar ZIP ({num_pdfs} PDFs)",
+                        data=archivo_zip,
+                        file_name=nombre_zip,
+                        mime="application/zip"
+                    )
                 
-                st.success(f"✅ {num_pdfs} PDFs generados correctamente")
+                if reutilizado:
+                    st.success(f"♻️ ZIP de {num_pdfs} PDFs ya generado en esta sesión con los mismos datos y parámetros")
+                else:
+                    st.success(f"✅ {num_pdfs} PDFs generados correctamente")
+                    if zip_guias.detalle['guias_reutilizadas']:
+                        st.caption(f"🗃️ {zip_guias.detalle['guias_reutilizadas']} guías sin cambios tomadas de la caché")
+                if zip_guias.detalle['guias_fallidas']:
+                    st.warning(f"⚠️ {len(zip_guias.detalle['guias_fallidas'])} guías excedieron el tiempo límite y no están en el ZIP: {', '.join(zip_guias.detalle['guias_fallidas'])}")
     
     # SEPARADOR
     st.markdown("---")
@@ -531,6 +726,15 @@ def mostrar_tab_generar_y_enviar():
         incluir_excel = st.checkbox("📊 Incluir Excel", value=True, key="incluir_excel_correos")
     with col2:
         incluir_pdfs = st.checkbox("📄 Incluir PDFs", value=True, key="incluir_pdfs_correos")
+    formatos_columnares = []
+    if ARROW_DISPONIBLE:
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.checkbox("📦 Incluir Parquet", value=False, key="incluir_parquet_correos"):
+                formatos_columnares.append('parquet')
+        with col2:
+            if st.checkbox("🏹 Incluir Arrow IPC", value=False, key="incluir_arrow_correos"):
+                formatos_columnares.append('arrow')
     
     # Botón de envío
     if st.button("📤 Enviar Correo", type="primary"):
@@ -540,7 +744,7 @@ def mostrar_tab_generar_y_enviar():
             st.error("❌ Completa destinatarios y asunto")
             return
         
-        if not incluir_excel and not incluir_pdfs:
+        if not incluir_excel and not incluir_pdfs and not formatos_columnares:
             st.error("❌ Selecciona al menos un tipo de adjunto")
             return
         
@@ -555,7 +759,7 @@ def mostrar_tab_generar_y_enviar():
                 'transporte_por_ruta': transporte_por_ruta # <-- NUEVO PARÁMETRO
             }
         
-        enviar_correo_completo(destinatarios, asunto, incluir_excel, incluir_pdfs, config_pdfs)
+        enviar_correo_completo(destinatarios, asunto, incluir_excel, incluir_pdfs, config_pdfs, formatos_columnares)
 
 def mostrar_ayuda_troubleshooting():
     """
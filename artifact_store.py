@@ -0,0 +1,158 @@
+"""
+🧺 ARTIFACT_STORE.PY
+Almacén de artefactos de reporte (Excel, ZIP de guías) de una sesión
+Cada artefacto se identifica por la huella del DataFrame consolidado y los parámetros con
+que se generó: la descarga y el correo piden el mismo artefacto y el segundo en pedirlo
+lo recibe ya generado, sin volver a escribir el Excel ni renderizar las guías.
+Los artefactos se guardan en archivos temporales y se abren al pedirlos, de modo que la
+sesión no retiene su contenido en memoria
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from logger_config import logger
+
+MAX_ENTRADAS = 6
+TAMANO_MAXIMO_POR_DEFECTO = 256 * 1024 * 1024  # 256 MB en disco
+
+
+def huella_dataframe(df):
+    """
+    🧬 SHA-256 de las columnas, los tipos y el contenido de un DataFrame
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()], ensure_ascii=False).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class Artefacto:
+    """
+    Archivo generado (en disco) y los datos de su generación (p. ej. número de PDFs).
+    """
+
+    def __init__(self, ruta, detalle=None):
+        self.ruta = ruta
+        self.tamano = os.path.getsize(ruta)
+        self.detalle = detalle or {}
+
+    def abrir(self):
+        """📄 Archivo abierto en modo binario (para download_button o un adjunto de correo)"""
+        return open(self.ruta, 'rb')
+
+    def buffer(self):
+        """📄 Igual que abrir(): quien lo usa debe cerrarlo"""
+        return self.abrir()
+
+    def eliminar(self):
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+class AlmacenArtefactos:
+    """
+    Artefactos en archivos temporales, abiertos al pedirlos, con desalojo LRU por número de
+    entradas y tamaño total.
+
+    Uso:
+        artefacto, reutilizado = almacen.obtener_o_crear("zip", huella, parametros, crear)
+
+    ``crear`` es una función sin argumentos que devuelve (bytes | archivo, detalle). El
+    contenido se copia a un archivo del directorio temporal del almacén (que se borra con
+    el almacén) y los archivos recibidos se cierran.
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, tamano_maximo=TAMANO_MAXIMO_POR_DEFECTO):
+        self.max_entradas = max_entradas
+        self.tamano_maximo = tamano_maximo
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._directorio = tempfile.TemporaryDirectory(prefix="artefactos_")
+
+    @staticmethod
+    def clave(tipo, huella_datos, parametros):
+        """
+        🔑 Clave del artefacto: tipo, huella del DataFrame y parámetros (serializables a JSON)
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{tipo}\0{huella_datos}\0".encode("utf-8"))
+        digest.update(json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def obtener(self, clave):
+        """
+        🔍 Artefacto guardado con esa clave, o None
+        """
+        with self._lock:
+            artefacto = self._entradas.get(clave)
+            if artefacto is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return artefacto
+
+    def guardar(self, clave, artefacto):
+        """
+        💾 Guarda un artefacto y desaloja los usados hace más tiempo si se excede el límite
+        """
+        with self._lock:
+            anterior = self._entradas.get(clave)
+            if anterior is not None and anterior is not artefacto:
+                anterior.eliminar()
+            self._entradas[clave] = artefacto
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > 1 and (
+                len(self._entradas) > self.max_entradas or self.tamano_bytes() > self.tamano_maximo
+            ):
+                _, desalojado = self._entradas.popitem(last=False)
+                desalojado.eliminar()
+
+    def obtener_o_crear(self, tipo, huella_datos, parametros, crear):
+        """
+        ♻️ Devuelve el artefacto ya generado o lo genera con ``crear`` y lo guarda
+
+        Returns:
+            tuple: (Artefacto, reutilizado)
+        """
+        clave = self.clave(tipo, huella_datos, parametros)
+        artefacto = self.obtener(clave)
+        if artefacto is not None:
+            logger.info(f"Artefacto {tipo} reutilizado ({clave[:12]})")
+            return artefacto, True
+
+        contenido, detalle = crear()
+        descriptor, ruta = tempfile.mkstemp(prefix=f"{tipo}_", dir=self._directorio.name)
+        with os.fdopen(descriptor, 'wb') as destino:
+            if isinstance(contenido, bytes):
+                destino.write(contenido)
+            else:
+                # Buffers y archivos temporales: copiar por bloques desde el inicio y liberar
+                contenido.seek(0)
+                shutil.copyfileobj(contenido, destino)
+                contenido.close()
+        artefacto = Artefacto(ruta, detalle)
+        self.guardar(clave, artefacto)
+        return artefacto, False
+
+    def tamano_bytes(self):
+        return sum(artefacto.tamano for artefacto in self._entradas.values())
+
+    def limpiar(self):
+        """🧹 Descarta todos los artefactos (p. ej. al cargar un lote nuevo)"""
+        with self._lock:
+            for artefacto in self._entradas.values():
+                artefacto.eliminar()
+            self._entradas.clear()
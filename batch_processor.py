@@ -0,0 +1,229 @@
+"""
+🚀 BATCH_PROCESSOR.PY
+Ingesta en paralelo de varios archivos Excel con un pool de procesos
+Conserva el orden de entrada, aísla fallos y tiempos límite por archivo
+y reporta el tiempo de cada archivo
+"""
+
+import io
+import math
+import os
+import signal
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from excel_processor import ExcelProcessor
+from excel_stream import ExcelStreamReader
+from raw_sheet import RawSheet
+from utils import FileValidator
+from process_pool import crear_pool, cerrar_pool
+from logger_config import logger
+
+# Tiempo máximo de procesamiento por archivo (segundos)
+TIMEOUT_POR_ARCHIVO = 120
+# Margen adicional que espera el proceso principal antes de abandonar un archivo
+MARGEN_ESPERA = 5
+# Tamaño a partir del cual un .xlsx se procesa en streaming (sin cargar la hoja completa)
+UMBRAL_STREAMING = 10 * 1024 * 1024  # 10 MB
+# Firma de un archivo ZIP (.xlsx); los .xls antiguos no se pueden leer en streaming
+FIRMA_XLSX = b"PK\x03\x04"
+
+
+class _TiempoAgotado(BaseException):
+    # BaseException: procesar_archivo_completo captura Exception y no debe absorber el tiempo límite
+    pass
+
+
+def _alarma(signum, frame):
+    raise _TiempoAgotado()
+
+
+def _nuevo_resultado(nombre_archivo, **valores):
+    """
+    🧾 Resultado por archivo con los valores por defecto de un archivo no procesado
+    """
+    resultado = {
+        'nombre_archivo': nombre_archivo,
+        'df': None,
+        'num_registros': 0,
+        'tipo_archivo': None,
+        'info_extraida': {},
+        'error': None,
+        'segundos': 0.0,
+        'desde_cache': False,
+    }
+    resultado.update(valores)
+    return resultado
+
+
+def _leer_y_procesar(contenido, salida):
+    """
+    📥 Lee, valida y procesa el libro; los .xlsx desde UMBRAL_STREAMING bytes van en streaming
+
+    Returns:
+        tuple | None: Resultado de ExcelProcessor, o None si hubo error (queda en salida)
+    """
+    streaming = len(contenido) >= UMBRAL_STREAMING and contenido[:4] == FIRMA_XLSX
+    try:
+        if streaming:
+            # Solo las primeras filas para validar: la hoja completa nunca se carga
+            hoja = ExcelStreamReader.hoja_muestra(io.BytesIO(contenido))
+        else:
+            hoja = RawSheet.desde_archivo(io.BytesIO(contenido))
+    except Exception as e:
+        salida['error'] = f"Error leyendo el archivo: {str(e)}"
+        return None
+
+    es_valido, mensaje = FileValidator.validar_archivo_excel(hoja)
+    if not es_valido:
+        salida['error'] = mensaje
+        return None
+
+    if streaming:
+        return ExcelProcessor().procesar_archivo_streaming(io.BytesIO(contenido))
+    return ExcelProcessor().procesar_archivo_completo(hoja)
+
+
+def procesar_contenido(nombre_archivo, contenido, timeout=None):
+    """
+    📄 Lee, valida y procesa un archivo a partir de sus bytes (ejecutable en un proceso hijo)
+
+    Los .xlsx de UMBRAL_STREAMING bytes o más se procesan con procesar_archivo_streaming
+    (memoria constante); el resto con procesar_archivo_completo.
+
+    Args:
+        nombre_archivo (str): Nombre original del archivo (solo para mensajes)
+        contenido (bytes): Bytes del archivo Excel
+        timeout (int): Segundos máximos de procesamiento (None = sin límite)
+
+    Returns:
+        dict: {'nombre_archivo', 'df', 'num_registros', 'tipo_archivo', 'info_extraida',
+               'error', 'segundos', 'desde_cache'}
+    """
+    inicio = time.perf_counter()
+    salida = _nuevo_resultado(nombre_archivo)
+
+    # SIGALRM solo existe en Unix y solo puede usarse desde el hilo principal
+    usar_alarma = bool(timeout) and hasattr(signal, "SIGALRM")
+    if usar_alarma:
+        try:
+            anterior = signal.signal(signal.SIGALRM, _alarma)
+            signal.alarm(int(math.ceil(timeout)))
+        except ValueError:
+            usar_alarma = False
+
+    try:
+        resultado = _leer_y_procesar(contenido, salida)
+        if resultado is None:
+            return salida
+
+        df_procesado, num_registros, tipo_archivo, info_extraida = resultado
+        salida.update({
+            'df': df_procesado,
+            'num_registros': num_registros,
+            'tipo_archivo': tipo_archivo,
+            'info_extraida': info_extraida,
+        })
+        if df_procesado is None or num_registros == 0:
+            salida['error'] = "No se pudieron procesar los datos del archivo"
+    except _TiempoAgotado:
+        salida['error'] = f"Tiempo límite agotado ({timeout} s)"
+    finally:
+        if usar_alarma:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, anterior)
+        salida['segundos'] = time.perf_counter() - inicio
+
+    return salida
+
+
+def procesar_lote(archivos, max_workers=None, timeout=TIMEOUT_POR_ARCHIVO, cache=None):
+    """
+    🚀 Procesa varios archivos en paralelo con ProcessPoolExecutor
+
+    Args:
+        archivos (list): Pares (nombre_archivo, bytes) en el orden de carga
+        max_workers (int): Procesos del pool (por defecto, núcleos disponibles)
+        timeout (int): Segundos máximos por archivo
+        cache (ResultCache): Caché de resultados opcional; los aciertos no se envían al pool
+
+    Returns:
+        list[dict]: Un resultado por archivo, en el mismo orden de entrada
+            (ver procesar_contenido); 'error' es None si el archivo se procesó bien
+    """
+    resultados = [None] * len(archivos)
+    claves = [None] * len(archivos)
+    pendientes = []
+
+    # 1. Servir desde la caché lo que ya fue procesado
+    for i, (nombre, contenido) in enumerate(archivos):
+        if cache is not None:
+            claves[i] = cache.clave(contenido)
+            cacheado = cache.obtener(claves[i])
+            if cacheado is not None:
+                df_procesado, num_registros, tipo_archivo, info_extraida = cacheado
+                resultados[i] = _nuevo_resultado(
+                    nombre, df=df_procesado, num_registros=num_registros,
+                    tipo_archivo=tipo_archivo, info_extraida=info_extraida, desde_cache=True,
+                )
+                continue
+        pendientes.append(i)
+
+    # 2. Procesar el resto en el pool, aunque sea un solo archivo: en el hilo de Streamlit
+    #    no hay SIGALRM y el tiempo límite solo se puede imponer desde fuera del proceso
+    if pendientes:
+        num_workers = min(len(pendientes), max_workers or os.cpu_count() or 1)
+        _procesar_en_pool(archivos, pendientes, resultados, num_workers, timeout)
+
+    # 3. Guardar en la caché los archivos procesados correctamente
+    if cache is not None:
+        for i in pendientes:
+            resultado = resultados[i]
+            if resultado['error'] is None:
+                cache.guardar(claves[i], (
+                    resultado['df'], resultado['num_registros'],
+                    resultado['tipo_archivo'], resultado['info_extraida'],
+                ))
+
+    return resultados
+
+
+def _procesar_en_pool(archivos, pendientes, resultados, num_workers, timeout):
+    """
+    🧵 Reparte los archivos pendientes en el pool y recoge los resultados en orden
+
+    Un archivo que excede el tiempo límite se reporta como error y al terminar se matan
+    los procesos que siguen ocupados.
+    """
+    inicio = time.perf_counter()
+    pool = crear_pool(num_workers)
+    abandonado = False
+    try:
+        futuros = [
+            (i, pool.submit(procesar_contenido, *archivos[i], timeout=timeout))
+            for i in pendientes
+        ]
+        for posicion, (i, futuro) in enumerate(futuros):
+            nombre = archivos[i][0]
+            espera = None
+            if timeout:
+                # El archivo en la posición p empieza, como muy tarde, tras p // num_workers tandas
+                limite = inicio + (posicion // num_workers + 1) * (timeout + MARGEN_ESPERA)
+                espera = max(0.0, limite - time.perf_counter())
+            try:
+                resultados[i] = futuro.result(timeout=espera)
+            except FuturesTimeoutError:
+                abandonado = True
+                logger.error(f"Archivo {nombre} excedió {timeout} s en el pool")
+                resultados[i] = _nuevo_resultado(
+                    nombre, error=f"Tiempo límite agotado ({timeout} s)", segundos=time.perf_counter() - inicio
+                )
+            except Exception as e:
+                # Un proceso hijo caído (BrokenProcessPool) solo afecta a sus archivos
+                logger.error(f"Error procesando {nombre} en el pool: {e}")
+                resultados[i] = _nuevo_resultado(
+                    nombre, error=f"Error en el proceso de trabajo: {str(e)}", segundos=time.perf_counter() - inicio
+                )
+    finally:
+        # Si algún archivo se abandonó, no bloquear la interfaz esperando al proceso colgado
+        cerrar_pool(pool, abandonado)
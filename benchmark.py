@@ -0,0 +1,399 @@
+"""
+⏱️ BENCHMARK.PY
+Mediciones de rendimiento de la ingesta y generación de reportes
+Uso: python benchmark.py [descubrimiento] [streaming] [paginas] [excel] [smtp]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from excel_processor import ExcelProcessor
+from excel_stream import ExcelStreamReader
+from pdf_generator import GeneradorPDFsRutas
+from raw_sheet import RawSheet, TableIndex
+from smtp_pool import PoolSMTP
+from record_builder import concatenar_registros
+from utils import UtilsHelper
+
+CARPETA_RAIZ = os.path.dirname(os.path.abspath(__file__))
+CARPETA_MUESTRAS = os.path.join(CARPETA_RAIZ, "excel")
+
+
+def crear_libro_sintetico(num_rutas=50, comedores_por_ruta=40):
+    """
+    🧪 Crea en memoria un libro con la estructura de un reporte de despachos real
+
+    Returns:
+        BytesIO: Archivo .xlsx con `num_rutas` tablas de `comedores_por_ruta` filas
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.append([])
+    ws.append([])
+    ws.append([])
+    ws.append(["PROGRAMA:COMEDORES COMUNITARIOS CALI 2025 - COMEDORES COMUNITARIOS CALI 2025 / CP AM CALI"])
+    ws.append(["LISTA DE PESO MATERIA PRIMA - CARNES"])
+    ws.append(["DESPACHO: COMEDORES CALI"])
+    ws.append([])
+    ws.append(["Solicitud Remesa:  MENUS PARA 10 DIAS"])
+    ws.append(["Dias de consumo:  2025-07-21 - 2025-07-22"])
+    ws.append(["COMEDORES COMUNITARIOS CALI 2025", None, None, None, None,
+               "CARNE DE CERDO MAGRA / B X 1000", "MUSLO / CONTRAMUSLO DE POLLO UND / UND", "PECHUGA POLLO / KG"])
+
+    rng = np.random.default_rng(42)
+    for ruta in range(1, num_rutas + 1):
+        ws.append([f"DIA 1 - RUTA {ruta}"])
+        ws.append(["N°", "MUNICIPIO", "COMEDOR / ESCUELA", "COBER", "DIRECCIÓN", "B X 1000", "UND", "KG"])
+        for n in range(1, comedores_por_ruta + 1):
+            cober = int(rng.integers(40, 500))
+            ws.append([n, "CALI", f"COMEDOR {ruta}-{n}", cober, f"CL {n} # {ruta}-{n}",
+                       round(cober * 0.2), cober, round(cober * 0.35)])
+        ws.append(["TOTAL COBERTURA RUTA"])
+        ws.append(["CAJAS / PACAS"])
+        ws.append(["ENTREGO A SATISFACCIÓN:"])
+        ws.append([])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _descubrimiento_por_filas(df_raw):
+    """
+    🐢 Referencia: recorrido fila por fila con iloc y búsqueda hacia atrás del título (versión anterior)
+    """
+    tablas = []
+    for i in range(len(df_raw)):
+        if str(df_raw.iloc[i, 0]).strip() in ["N°", "No."] and str(df_raw.iloc[i, 1]).strip() not in ["nan", ""]:
+            titulo = -1
+            for j in range(i - 1, -1, -1):
+                celda = df_raw.iloc[j, 0]
+                if not pd.isna(celda) and isinstance(celda, str) and celda.strip():
+                    if "PROGRAMA:" not in celda.upper() and "EMPRESA:" not in celda.upper():
+                        titulo = j
+                        break
+            tablas.append((i, titulo))
+    return tablas
+
+
+def _medir(funcion, repeticiones=5):
+    """
+    ⏲️ Devuelve el mejor tiempo (segundos) de varias ejecuciones
+    """
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def benchmark_descubrimiento():
+    """
+    🗂️ Compara el descubrimiento de tablas fila por fila contra el índice vectorizado
+    """
+    casos = [(os.path.basename(ruta), ruta) for ruta in sorted(glob.glob(os.path.join(CARPETA_MUESTRAS, "*.xlsx")))]
+    casos.append(("sintetico_50_rutas.xlsx", crear_libro_sintetico(num_rutas=50)))
+
+    print(f"{'archivo':45} {'filas':>6} {'tablas':>6} {'por_filas_ms':>13} {'indice_ms':>10} {'proceso_ms':>11}")
+    for nombre, origen in casos:
+        df_raw = pd.read_excel(origen, header=None)
+        hoja = RawSheet(df_raw)
+        indice = TableIndex.construir(hoja)
+
+        t_filas = _medir(lambda: _descubrimiento_por_filas(df_raw))
+        t_indice = _medir(lambda: TableIndex.construir(hoja))
+
+        processor = ExcelProcessor()
+        info = processor.extractor.extraer_informacion_estructurada(hoja)
+        with contextlib.redirect_stdout(io.StringIO()):
+            t_proceso = _medir(lambda: processor._extraer_registros_comedores(hoja, None, None, info))
+
+        print(f"{nombre[:45]:45} {hoja.n_filas:6d} {len(indice):6d} "
+              f"{t_filas * 1000:13.2f} {t_indice * 1000:10.2f} {t_proceso * 1000:11.2f}")
+
+
+def _medir_memoria(funcion):
+    """
+    📈 Ejecuta la función y devuelve (segundos, pico de memoria en MB)
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion()
+        return time.perf_counter() - inicio, tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_streaming():
+    """
+    🌊 Compara la ingesta completa (DataFrame de la hoja) contra la ingesta en streaming
+    """
+    print(f"{'rutas':>6} {'filas_hoja':>10} {'completo_s':>11} {'completo_MB':>12} {'stream_s':>9} {'stream_MB':>10}")
+    for num_rutas in (50, 200):
+        contenido = crear_libro_sintetico(num_rutas=num_rutas).getvalue()
+
+        t_completo, mb_completo = _medir_memoria(
+            lambda: ExcelProcessor().procesar_archivo_completo(io.BytesIO(contenido))
+        )
+        lector = ExcelStreamReader(ExcelProcessor())
+        t_stream, mb_stream = _medir_memoria(
+            lambda: sum(1 for _ in lector.iterar_registros(io.BytesIO(contenido)))
+        )
+        print(f"{num_rutas:6d} {lector.filas_leidas:10d} {t_completo:11.2f} {mb_completo:12.1f} "
+              f"{t_stream:9.2f} {mb_stream:10.1f}")
+
+
+def _contar_paginas(zip_archivo):
+    """
+    📄 Total de páginas de las guías de un ZIP (cuenta los objetos /Type /Page)
+    """
+    with zipfile.ZipFile(zip_archivo) as paquete:
+        return sum(paquete.read(nombre).count(b"/Type /Page\n") for nombre in paquete.namelist())
+
+
+def _guias_por_comedor_documento_completo(generador, df):
+    """
+    🐢 Referencia: una guía por comedor con su documento completo (encabezado y pie por comedor)
+
+    Returns:
+        tuple: (guias, paginas)
+    """
+    guias = paginas = 0
+    for ruta_nombre, datos_ruta in generador.procesar_datos_para_pdf(df).items():
+        for comedor in datos_ruta['comedores']:
+            datos_comedor = {'comedores': [comedor], 'programa_info': datos_ruta['programa_info']}
+            pdf = generador.generar_pdf_individual(ruta_nombre, datos_comedor, "Benchmark").getvalue()
+            guias += 1
+            paginas += pdf.count(b"/Type /Page\n")
+    return guias, paginas
+
+
+def benchmark_paginas():
+    """
+    🖨️ Compara el render de guías con SimpleDocTemplate (platypus) contra el render directo en canvas
+
+    En modo por comedor compara un documento platypus completo por comedor contra el
+    molde de encabezado y pie armado una vez por ruta.
+    """
+    contenido = crear_libro_sintetico(num_rutas=10).getvalue()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df, _, _, _ = ExcelProcessor().procesar_archivo_completo(io.BytesIO(contenido))
+
+    def zip_completo(motor, modo):
+        def generar():
+            generador = GeneradorPDFsRutas(motor=motor)
+            zip_archivo, guias = generador.generar_todos_los_pdfs(df, modo=modo, elaborado_por="Benchmark")
+            return guias, _contar_paginas(zip_archivo)
+        return generar
+
+    casos = [
+        ("por_ruta", "platypus", zip_completo("platypus", "por_ruta")),
+        ("por_ruta", "canvas", zip_completo("canvas", "por_ruta")),
+        ("por_comedor", "platypus", lambda: _guias_por_comedor_documento_completo(GeneradorPDFsRutas(), df)),
+        ("por_comedor", "molde", zip_completo("platypus", "por_comedor")),
+    ]
+
+    # Las guías buscan las firmas en imagenes/ relativo al directorio actual
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        carpeta_firmas = os.path.join(CARPETA_RAIZ, "imagenes")
+        if os.path.isdir(carpeta_firmas):
+            shutil.copytree(carpeta_firmas, os.path.join(directorio, "imagenes"))
+        os.chdir(directorio)
+        try:
+            print(f"{'modo':12} {'motor':9} {'guias':>6} {'paginas':>8} {'tiempo_s':>9} {'paginas_s':>10}")
+            for modo, motor, funcion in casos:
+                resultado = {}
+
+                def generar():
+                    resultado["guias"], resultado["paginas"] = funcion()
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    tiempo = _medir(generar, repeticiones=2)
+                print(f"{modo:12} {motor:9} {resultado['guias']:6d} {resultado['paginas']:8d} "
+                      f"{tiempo:9.2f} {resultado['paginas'] / tiempo:10.1f}")
+        finally:
+            os.chdir(directorio_original)
+
+
+def benchmark_excel(filas=100_000):
+    """
+    📊 Compara el Excel de descarga con pd.ExcelWriter (openpyxl) contra la escritura
+    en streaming (write_only) sobre un consolidado sintético de `filas` filas
+    """
+    contenido = crear_libro_sintetico(num_rutas=50).getvalue()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df, _, _, _ = ExcelProcessor().procesar_archivo_completo(io.BytesIO(contenido))
+    df = concatenar_registros([df] * -(-filas // len(df))).iloc[:filas]
+
+    print(f"{'motor':10} {'filas':>8} {'tiempo_s':>9} {'pico_MB':>8} {'archivo_MB':>11}")
+    for motor in ("openpyxl", "streaming"):
+        resultado = {}
+
+        def exportar():
+            archivo = UtilsHelper.crear_excel_descarga_universal(df, "BENCHMARK", {}, motor=motor)
+            archivo.seek(0, os.SEEK_END)
+            resultado["bytes"] = archivo.tell()
+            archivo.close()
+
+        tiempo, pico = _medir_memoria(exportar)
+        print(f"{motor:10} {len(df):8d} {tiempo:9.2f} {pico:8.1f} {resultado['bytes'] / 1e6:11.1f}")
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """
+    Sesión SMTP mínima (sin TLS ni autenticación) que acepta y descarta los mensajes
+    """
+
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode("ascii"))
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.conexiones += 1
+            servidor.sockets.append(self.connection)
+        # Simula el costo de abrir una sesión real (TCP + TLS + login)
+        time.sleep(servidor.latencia_conexion)
+        self._responder("220 localhost SMTP de pruebas")
+        with contextlib.suppress(ConnectionError):
+            self._sesion()
+
+    def _sesion(self):
+        servidor = self.server
+        for linea in self.rfile:
+            comando = linea.decode("ascii", "replace").strip().upper()
+            if comando.startswith(("EHLO", "HELO")):
+                self._responder("250 localhost")
+            elif comando == "DATA":
+                self._responder("354 Fin con <CRLF>.<CRLF>")
+                for linea_datos in self.rfile:
+                    if linea_datos in (b".\r\n", b".\n"):
+                        break
+                with servidor.lock:
+                    servidor.mensajes += 1
+                self._responder("250 OK")
+            elif comando == "QUIT":
+                self._responder("221 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self._responder("250 OK")
+
+
+class ServidorSMTPLocal(socketserver.ThreadingTCPServer):
+    """
+    📭 Servidor SMTP local de pruebas en un puerto libre de 127.0.0.1
+
+    Cuenta conexiones y mensajes; ``cortar_conexiones`` cierra las sesiones abiertas
+    para probar la reconexión del pool.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latencia_conexion=0.0):
+        super().__init__(("127.0.0.1", 0), _ManejadorSMTP)
+        self.latencia_conexion = latencia_conexion
+        self.conexiones = 0
+        self.mensajes = 0
+        self.sockets = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def puerto(self):
+        return self.server_address[1]
+
+    def cortar_conexiones(self):
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            with contextlib.suppress(OSError):
+                sock.shutdown(2)
+
+    def cerrar(self):
+        self.shutdown()
+        self.server_close()
+
+
+def benchmark_smtp(num_correos=12, latencia_conexion=0.05):
+    """
+    📮 Compara una conexión SMTP por correo contra el pool (una sesión reutilizada) al
+    enviar `num_correos` correos a un servidor local con `latencia_conexion` s por sesión
+    """
+    mensaje = "Subject: Reporte\r\n\r\n" + "x" * 2000
+    correos = [("reportes@localhost", [f"supervisor{i}@localhost"], mensaje) for i in range(num_correos)]
+
+    print(f"{'modo':18} {'correos':>8} {'tiempo_s':>9} {'conexiones':>11}")
+    servidor = ServidorSMTPLocal(latencia_conexion)
+    try:
+        # max_conexiones=0: cada conexión se cierra al terminar el envío (como antes del pool)
+        modos = [
+            ("conexion_por_correo", PoolSMTP("127.0.0.1", servidor.puerto, usar_ssl=False, max_conexiones=0), False),
+            ("pool", PoolSMTP("127.0.0.1", servidor.puerto, usar_ssl=False), False),
+            ("pool_lote", PoolSMTP("127.0.0.1", servidor.puerto, usar_ssl=False), True),
+        ]
+        for nombre, pool, lote in modos:
+            conexiones_antes = servidor.conexiones
+            inicio = time.perf_counter()
+            if lote:
+                pool.enviar_lote(correos)
+            else:
+                for remitente, destinatarios, texto in correos:
+                    pool.enviar(remitente, destinatarios, texto)
+            tiempo = time.perf_counter() - inicio
+            print(f"{nombre:18} {num_correos:8d} {tiempo:9.2f} {servidor.conexiones - conexiones_antes:11d}")
+
+        # Reconexión: el servidor corta la sesión que el pool tiene abierta
+        servidor.cortar_conexiones()
+        pool.enviar_lote(correos)
+        print(f"tras corte del servidor: {num_correos} correos enviados, {pool.estadisticas()['conexiones_abiertas']} conexiones abiertas en total")
+        pool.cerrar()
+        print(f"mensajes recibidos por el servidor: {servidor.mensajes}")
+    finally:
+        servidor.cerrar()
+
+
+BENCHMARKS = {
+    "descubrimiento": benchmark_descubrimiento,
+    "streaming": benchmark_streaming,
+    "paginas": benchmark_paginas,
+    "excel": benchmark_excel,
+    "smtp": benchmark_smtp,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del procesador de reportes")
+    parser.add_argument("casos", nargs="*", help=f"Benchmarks a ejecutar: {', '.join(BENCHMARKS)} (todos por defecto)")
+    args = parser.parse_args()
+    desconocidos = [nombre for nombre in args.casos if nombre not in BENCHMARKS]
+    if desconocidos:
+        parser.error(f"Benchmarks desconocidos: {', '.join(desconocidos)}")
+
+    for nombre in args.casos or BENCHMARKS:
+        print(f"\n=== {nombre} ===")
+        BENCHMARKS[nombre]()
+
+
+if __name__ == "__main__":
+    main()
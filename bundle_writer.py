@@ -0,0 +1,94 @@
+"""
+📦 BUNDLE_WRITER.PY
+Escritura en streaming de paquetes ZIP de guías
+Cada PDF se agrega al ZIP apenas se renderiza, sobre un archivo temporal que vive en
+memoria mientras es pequeño y pasa a disco al crecer, así que la memoria no depende
+del número de guías; cada entrada se guarda sin comprimir o comprimida según convenga
+"""
+
+import tempfile
+import zipfile
+import zlib
+
+# Tamaño a partir del cual el ZIP temporal pasa de memoria a disco
+UMBRAL_MEMORIA = 16 * 1024 * 1024  # 16 MB
+# Bytes de cada entrada que se comprimen de prueba para decidir si vale la pena
+TAMANO_MUESTRA = 64 * 1024
+# Proporción comprimida/original por encima de la cual la entrada se guarda sin comprimir
+UMBRAL_COMPRESION = 0.9
+
+
+def elegir_compresion(datos):
+    """
+    🗜️ ZIP_DEFLATED si una muestra de los datos se reduce lo suficiente, si no ZIP_STORED
+
+    Los PDF con imágenes y flujos ya comprimidos apenas ganan con deflate; comprimir solo
+    una muestra rápida (nivel 1) evita gastar CPU en deflate completos inútiles.
+    """
+    muestra = datos[:TAMANO_MUESTRA]
+    if not muestra:
+        return zipfile.ZIP_STORED
+    proporcion = len(zlib.compress(muestra, 1)) / len(muestra)
+    return zipfile.ZIP_DEFLATED if proporcion < UMBRAL_COMPRESION else zipfile.ZIP_STORED
+
+
+class EscritorZip:
+    """
+    ZIP incremental sobre un SpooledTemporaryFile.
+
+    Uso:
+        with EscritorZip() as paquete:
+            for nombre, datos in archivos:
+                paquete.agregar(nombre, datos)
+        archivo = paquete.archivo  # posicionado al inicio, listo para leer
+
+    ``compresion`` fija el método de todas las entradas (zipfile.ZIP_STORED o
+    zipfile.ZIP_DEFLATED); con None se elige por entrada con ``elegir_compresion``.
+    """
+
+    def __init__(self, umbral_memoria=UMBRAL_MEMORIA, compresion=None):
+        self.compresion = compresion
+        self.archivo = tempfile.SpooledTemporaryFile(max_size=umbral_memoria, mode='w+b')
+        self._zip = zipfile.ZipFile(self.archivo, 'w', zipfile.ZIP_DEFLATED)
+        self.num_entradas = 0
+        self.bytes_originales = 0
+
+    def agregar(self, nombre, datos, compresion=None):
+        """
+        ➕ Escribe una entrada en el ZIP
+
+        Args:
+            nombre (str): Nombre de la entrada dentro del ZIP
+            datos (bytes): Contenido; el llamador puede liberarlo en cuanto vuelve
+            compresion (int): Método para esta entrada (por defecto, el del escritor o automático)
+        """
+        metodo = compresion if compresion is not None else self.compresion
+        if metodo is None:
+            metodo = elegir_compresion(datos)
+        self._zip.writestr(nombre, datos, compress_type=metodo)
+        self.num_entradas += 1
+        self.bytes_originales += len(datos)
+
+    def cerrar(self):
+        """
+        🔒 Escribe el directorio central y devuelve el archivo posicionado al inicio
+        """
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+            self.archivo.seek(0)
+        return self.archivo
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excepcion, excepcion, traza):
+        if tipo_excepcion is not None:
+            # cerrar() pudo haberse llamado ya dentro del with: no ocultar la excepción original
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            self.archivo.close()
+            return False
+        self.cerrar()
+        return False
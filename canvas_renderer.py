@@ -0,0 +1,499 @@
+"""
+🖌️ CANVAS_RENDERER.PY
+Motor de render rápido de guías de transporte directamente sobre el canvas de ReportLab
+La guía tiene un diseño fijo (23 columnas de ancho fijo, 4 comedores por página, encabezado
+y pie constantes), así que el encabezado y el pie se dibujan una sola vez por ruta (MoldeGuia),
+se copian como Form XObjects en cada documento y la tabla de comedores se dibuja con
+coordenadas precalculadas, sin la negociación wrap/split de SimpleDocTemplate
+"""
+
+import io
+from datetime import datetime
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+from reportlab.platypus.tables import CellStyle, spanFixDim
+from reportlab import rl_config
+
+from template import ANCHOS_COLUMNAS, FILAS_POR_PAGINA, MARGENES_GUIA
+
+# Relleno interno del Frame que usa SimpleDocTemplate
+RELLENO_MARCO = 6
+# Número de guía provisional con el que se ensaya el título al grabar un molde
+NUMERO_GUIA_ENSAYO = "0000-000"
+# Moldes de ruta conservados por renderizador
+MAX_MOLDES = 32
+
+# Índice de cada propiedad de celda en la tupla de estilo resuelta
+_FUENTE, _TAMANO, _INTERLINEADO, _ALINEACION, _ALINEACION_V = 0, 1, 2, 3, 4
+_RELLENO_IZQ, _RELLENO_DER, _RELLENO_SUP, _RELLENO_INF = 5, 6, 7, 8
+
+_PROPIEDADES_CELDA = {
+    'FONTNAME': _FUENTE, 'FACE': _FUENTE,
+    'FONTSIZE': _TAMANO, 'SIZE': _TAMANO,
+    'LEADING': _INTERLINEADO,
+    'ALIGN': _ALINEACION, 'ALIGNMENT': _ALINEACION,
+    'VALIGN': _ALINEACION_V,
+    'LEFTPADDING': _RELLENO_IZQ, 'RIGHTPADDING': _RELLENO_DER,
+    'TOPPADDING': _RELLENO_SUP, 'BOTTOMPADDING': _RELLENO_INF,
+}
+
+# Valores por defecto de una celda de Table (reportlab.platypus.tables.CellStyle)
+_ESTILO_BASE = (
+    CellStyle.fontname, CellStyle.fontsize, CellStyle.leading, CellStyle.alignment, CellStyle.valign,
+    CellStyle.leftPadding, CellStyle.rightPadding, CellStyle.topPadding, CellStyle.bottomPadding,
+)
+
+
+class DisposicionNoSoportada(Exception):
+    """La guía no cabe en el diseño fijo (p. ej. una página desbordada); usar SimpleDocTemplate"""
+
+
+@lru_cache(maxsize=8192)
+def ancho_texto(texto, fuente, tamano):
+    """
+    📏 Ancho de un texto en puntos, memorizado (los mismos textos se repiten en todas las guías)
+    """
+    return stringWidth(texto, fuente, tamano)
+
+
+class TablaCompilada:
+    """
+    Tabla de solo texto con el estilo ya resuelto celda por celda.
+
+    Interpreta los mismos comandos de TableStyle que usa la plantilla (fuentes, alineación,
+    rellenos, BACKGROUND, GRID y SPAN) con las mismas reglas de Table: alto de fila según
+    líneas × interlineado + rellenos, celdas fusionadas repartidas con spanFixDim y líneas
+    de la grilla interrumpidas en las fusiones. Se compila una vez por número de filas y
+    combinación de fusiones y solo las alturas se calculan por página.
+    """
+
+    def __init__(self, anchos_columnas, num_filas, comandos):
+        self.num_columnas = len(anchos_columnas)
+        self.num_filas = num_filas
+        self.posiciones_x = [0]
+        ancho = 0
+        for ancho_columna in anchos_columnas:
+            ancho = ancho + ancho_columna
+            self.posiciones_x.append(ancho)
+        self.ancho = ancho
+
+        estilos = [[list(_ESTILO_BASE) for _ in range(self.num_columnas)] for _ in range(num_filas)]
+        self.fondos = []
+        self.lineas = []
+        fusiones = []
+        for comando in comandos:
+            operacion, (c0, f0), (c1, f1) = comando[:3]
+            valores = comando[3:]
+            if operacion == 'BACKGROUND':
+                color = colors.toColorOrNone(valores[0])
+                if color is not None:
+                    self.fondos.append((self._normalizar(c0, c1, f0, f1, recortar=False), color))
+            elif operacion == 'SPAN':
+                c0, c1, f0, f1 = self._normalizar(c0, c1, f0, f1, recortar=False)
+                fusiones.append((min(c0, c1), min(f0, f1), max(c0, c1), max(f0, f1)))
+            elif operacion == 'GRID' and len(comando) == 5:
+                self.lineas.append((self._normalizar(c0, c1, f0, f1), valores[0], colors.toColor(valores[1])))
+            elif operacion in _PROPIEDADES_CELDA:
+                indice = _PROPIEDADES_CELDA[operacion]
+                c0, c1, f0, f1 = self._normalizar(c0, c1, f0, f1)
+                for fila in range(f0, f1 + 1):
+                    for columna in range(c0, c1 + 1):
+                        estilos[fila][columna][indice] = valores[0]
+            else:
+                raise DisposicionNoSoportada(f"Comando de estilo no soportado: {operacion}")
+        self.estilos = [[tuple(estilo) for estilo in fila] for fila in estilos]
+
+        # Fusiones: celda de origen -> rango, celdas tapadas y celdas en fusiones verticales
+        self.fusiones = {}
+        self.tapadas = set()
+        self.en_fusion_vertical = set()
+        for c0, f0, c1, f1 in fusiones:
+            celdas = {(c, f) for f in range(f0, f1 + 1) for c in range(c0, c1 + 1)}
+            if f0 != f1:
+                self.en_fusion_vertical |= celdas
+            self.tapadas |= celdas
+            self.fusiones[(c0, f0)] = (c0, f0, c1, f1)
+        self.tapadas -= set(self.fusiones)
+
+    def _normalizar(self, c0, c1, f0, f1, recortar=True):
+        if c0 < 0: c0 += self.num_columnas
+        if c1 < 0: c1 += self.num_columnas
+        if f0 < 0: f0 += self.num_filas
+        if f1 < 0: f1 += self.num_filas
+        if recortar:
+            return max(0, c0), min(self.num_columnas - 1, c1), max(0, f0), min(self.num_filas - 1, f1)
+        return c0, c1, f0, f1
+
+    def alturas(self, data):
+        """
+        📐 Alto de cada fila para estos textos (mismo cálculo que Table con rowHeights=None)
+        """
+        alturas = []
+        restricciones = {}
+        for f, fila in enumerate(data):
+            alto_fila = 0
+            for c, valor in enumerate(fila):
+                if (c, f) in self.tapadas and (c, f) in self.en_fusion_vertical:
+                    continue
+                estilo = self.estilos[f][c]
+                lineas = (valor is not None and str(valor) or '').count('\n') + 1
+                alto = (estilo[_INTERLINEADO] or 1.2 * estilo[_TAMANO]) * lineas
+                alto += estilo[_RELLENO_INF] + estilo[_RELLENO_SUP]
+                rango = self.fusiones.get((c, f))
+                if rango and rango[1] != rango[3]:
+                    clave = (rango[1], rango[3])
+                    restricciones[clave] = max(restricciones.get(clave, alto), alto)
+                    alto = 0
+                if alto > alto_fila:
+                    alto_fila = alto
+            alturas.append(alto_fila)
+        if restricciones:
+            spanFixDim([None] * len(alturas), alturas, restricciones)
+        return alturas
+
+    @staticmethod
+    def posiciones_y(alturas):
+        """
+        Posiciones de los bordes de fila desde arriba (índice 0 = borde superior),
+        sumadas de abajo hacia arriba con compensación como en Table._calc_height
+        """
+        posiciones = []
+        altura = compensacion = 0
+        for i in range(len(alturas) - 1, -1, -1):
+            posiciones.append(altura)
+            y = alturas[i] - compensacion
+            t = altura + y
+            compensacion = (t - altura) - y
+            altura = t
+        posiciones.append(altura)
+        posiciones.reverse()
+        return posiciones
+
+    def dibujar(self, canv, x, y, data, alturas):
+        """
+        🖌️ Dibuja la tabla con su esquina inferior izquierda en (x, y)
+        """
+        px = self.posiciones_x
+        py = self.posiciones_y(alturas)
+        nf, nc = self.num_filas, self.num_columnas
+
+        canv.saveState()
+        canv.translate(x, y)
+
+        # 1. Fondos
+        for (c0, c1, f0, f1), color in self.fondos:
+            x0, y0 = px[c0], py[f0]
+            canv.setFillColor(color)
+            canv.rect(x0, y0, px[min(c1 + 1, nc)] - x0, py[min(f1 + 1, nf)] - y0, stroke=0, fill=1)
+
+        # 2. Textos en un único objeto de texto
+        rectangulos = {}
+        bloques_h, bloques_v = {}, {}
+        for (c, f), (c0, f0, c1, f1) in self.fusiones.items():
+            rectangulos[(c, f)] = (px[c0], py[f1 + 1], px[c1 + 1] - px[c0], py[f0] - py[f1 + 1])
+            for columna in range(c0 + 1, c1 + 1):
+                bloques_v.setdefault(px[columna], []).append((py[f1 + 1], py[f0]))
+            for fila in range(f0 + 1, f1 + 1):
+                bloques_h.setdefault(py[fila], []).append((px[c0], px[c1 + 1]))
+
+        texto = canv.beginText()
+        texto.setFillColor(colors.black)
+        fuente_actual = None
+        for f, fila in enumerate(data):
+            for c, valor in enumerate(fila):
+                if (c, f) in self.tapadas:
+                    continue
+                if valor is None or valor == '':
+                    continue
+                if (c, f) in rectangulos:
+                    x0, y0, ancho, alto = rectangulos[(c, f)]
+                else:
+                    x0, y0, ancho, alto = px[c], py[f + 1], px[c + 1] - px[c], alturas[f]
+                fuente, tamano, interlineado, alineacion, alineacion_v, izq, der, sup, inf = self.estilos[f][c]
+                if fuente_actual != (fuente, tamano, interlineado):
+                    texto.setFont(fuente, tamano, interlineado)
+                    fuente_actual = (fuente, tamano, interlineado)
+
+                lineas = str(valor).split('\n')
+                if alineacion_v == 'TOP':
+                    y_linea = y0 + alto - sup - tamano
+                elif alineacion_v == 'MIDDLE':
+                    y_linea = y0 + (inf + alto - sup + len(lineas) * interlineado) / 2.0 - tamano
+                else:
+                    y_linea = y0 + inf + len(lineas) * interlineado - tamano
+                for linea in lineas:
+                    if alineacion == 'LEFT':
+                        x_linea = x0 + izq
+                    elif alineacion in ('CENTER', 'CENTRE'):
+                        x_linea = x0 + (ancho + izq - der) * 0.5 - 0.5 * ancho_texto(linea, fuente, tamano)
+                    else:
+                        x_linea = x0 + ancho - der - ancho_texto(linea, fuente, tamano)
+                    texto.setTextOrigin(x_linea, y_linea)
+                    texto.textOut(linea)
+                    y_linea -= interlineado
+        canv.drawText(texto)
+
+        # 3. Grilla (caja + líneas interiores), sin cruzar las celdas fusionadas
+        for bloques in (bloques_h, bloques_v):
+            for lista in bloques.values():
+                lista.sort()
+        for (c0, c1, f0, f1), grosor, color in self.lineas:
+            segmentos = []
+            for y_linea in py[f0:f1 + 2]:
+                for a, b in _tramos(px[c0], px[c1 + 1], bloques_h.get(y_linea)):
+                    segmentos.append((a, y_linea, b, y_linea))
+            for x_linea in px[c0:c1 + 2]:
+                for a, b in _tramos(py[f1 + 1], py[f0], bloques_v.get(x_linea)):
+                    segmentos.append((x_linea, a, x_linea, b))
+            canv.setStrokeColor(color)
+            canv.setLineWidth(grosor)
+            canv.setLineCap(1)
+            canv.setLineJoin(1)
+            canv.lines(segmentos)
+
+        canv.restoreState()
+
+
+def _tramos(inicio, fin, bloques, margen=rl_config._FUZZ):
+    """
+    Tramos de [inicio, fin] que no caen dentro de los bloques (intervalos ordenados)
+    """
+    if not bloques or inicio >= bloques[-1][1] - margen or fin <= bloques[0][0] + margen:
+        return [(inicio, fin)]
+    tramos = []
+    for b0, b1 in bloques:
+        if b1 <= inicio + margen or b0 >= fin - margen:
+            continue
+        if max(inicio, b0) > inicio:
+            tramos.append((inicio, max(inicio, b0)))
+        inicio = min(fin, b1)
+        if inicio >= fin - margen:
+            break
+    if inicio < fin - margen:
+        tramos.append((inicio, fin))
+    return tramos
+
+
+def _apilar(canv, flowables, x, y, ancho_disponible, al_inicio=False, espacio_anterior=0):
+    """
+    Dibuja flowables uno debajo de otro como lo hace un Frame de platypus
+
+    espacio_anterior es el spaceAfter del flowable dibujado justo antes (para continuar una pila).
+
+    Returns:
+        tuple: (y final, y más baja dibujada)
+    """
+    y_minima = y
+    for i, flowable in enumerate(flowables):
+        espacio = 0
+        if not (al_inicio and i == 0):
+            espacio = max(flowable.getSpaceBefore() - espacio_anterior, 0)
+        ancho, alto = flowable.wrapOn(canv, ancho_disponible, y)
+        y -= alto + espacio
+        flowable.drawOn(canv, x, y, _sW=ancho_disponible - ancho)
+        y_minima = min(y_minima, y)
+        espacio_anterior = flowable.getSpaceAfter()
+        y -= espacio_anterior
+    return y, y_minima
+
+
+def _copiar_xobject(original):
+    """
+    Copia de una imagen ya codificada, sin registrar, para agregarla a otro documento
+    """
+    copia = object.__new__(type(original))
+    copia.__dict__.update(original.__dict__)
+    copia.__dict__.pop('__InternalName__', None)
+    return copia
+
+
+class MoldeGuia:
+    """
+    Encabezado y pie de las guías de una ruta, dibujados una sola vez.
+
+    Todas las guías de una ruta (la guía completa o una por comedor) comparten el encabezado,
+    salvo el título con el número de guía, y el pie. El molde los dibuja en un canvas de
+    ensayo y guarda los operadores PDF resultantes, las fuentes en orden de registro y las
+    imágenes ya codificadas. Cada documento registra las mismas fuentes en el mismo orden
+    (mismos nombres internos /F1, /F2, ...) y las mismas imágenes, dibuja solo el título y
+    copia el resto de los operadores a sus Form XObjects.
+
+    Usa atributos internos del canvas de ReportLab (_doc, _code, _formsinuse).
+    """
+
+    def __init__(self, renderizador, datos_programa, elaborado_por, conductor, placa):
+        plantilla = renderizador.plantilla
+        x, y_superior, ancho = renderizador.x_marco, renderizador.y_superior, renderizador.ancho_disponible
+        canv = canvas.Canvas(io.BytesIO(), pagesize=A4)
+
+        encabezado = plantilla.crear_encabezado(datos_programa, NUMERO_GUIA_ENSAYO)
+        titulo, resto = encabezado[0], encabezado[1:]
+        resto.append(plantilla.crear_tabla_encabezados(datos_programa))
+        resto.extend(plantilla.crear_seccion_ruta(datos_programa.get('dia', 'Ruta General')))
+
+        canv.beginForm('EncabezadoGuia')
+        self.alto_titulo = titulo.wrapOn(canv, ancho, y_superior)[1]
+        y_titulo, _ = _apilar(canv, [titulo], x, y_superior, ancho, al_inicio=True)
+        inicio = len(canv._code)
+        self.y_tabla, _ = _apilar(canv, resto, x, y_titulo, ancho, espacio_anterior=titulo.getSpaceAfter())
+        self.codigo_encabezado = canv._code[inicio:]
+        self.formas_encabezado = list(canv._formsinuse)
+        canv.endForm()
+
+        # El pie se dibuja con su borde superior en y_superior y se desplaza en cada página
+        canv.beginForm('PieGuia')
+        _, y_minima_pie = _apilar(canv, plantilla.crear_pie_pagina(elaborado_por, conductor, placa),
+                                  x, y_superior, ancho)
+        self.codigo_pie = list(canv._code)
+        self.formas_pie = list(canv._formsinuse)
+        canv.endForm()
+        self.alto_pie = y_superior - y_minima_pie
+
+        self.fuentes = list(canv._doc.fontMapping)
+        self.imagenes = [
+            (nombre, objeto) for nombre, objeto in canv._doc.idToObject.items()
+            if isinstance(objeto, pdfdoc.PDFImageXObject)
+        ]
+        self.renderizador = renderizador
+
+    def iniciar(self, canv, titulo):
+        """
+        🧱 Registra fuentes e imágenes del molde y crea las formas 'EncabezadoGuia' y 'PieGuia'
+
+        Args:
+            canv (Canvas): Documento recién creado (sin nada dibujado)
+            titulo (Paragraph): Título con el número de guía de este documento
+        """
+        r = self.renderizador
+        if titulo.wrapOn(canv, r.ancho_disponible, r.y_superior)[1] != self.alto_titulo:
+            raise DisposicionNoSoportada("El título de la guía no ocupa una sola línea")
+
+        documento = canv._doc
+        for fuente in self.fuentes:
+            documento.getInternalFontName(fuente)
+        for nombre, objeto in self.imagenes:
+            documento.Reference(_copiar_xobject(objeto), nombre)
+        if self.imagenes:
+            canv._currentPageHasImages = 1
+
+        canv.beginForm('EncabezadoGuia')
+        _apilar(canv, [titulo], r.x_marco, r.y_superior, r.ancho_disponible, al_inicio=True)
+        canv._code.extend(self.codigo_encabezado)
+        canv._formsinuse.extend(self.formas_encabezado)
+        canv.endForm()
+
+        canv.beginForm('PieGuia')
+        canv._code.extend(self.codigo_pie)
+        canv._formsinuse.extend(self.formas_pie)
+        canv.endForm()
+
+
+class RenderizadorCanvas:
+    """
+    Genera la guía paginada sobre un canvas, con el mismo resultado visual que
+    PlantillaGuiaTransporte.generar_pdf_con_paginacion.
+
+    El encabezado (textos, tabla de productos y ruta) y el pie (transportador, firmas y nota)
+    son idénticos en todas las páginas de una guía y en todas las guías de una ruta: se
+    dibujan una vez por ruta (MoldeGuia), se copian como Form XObject en cada documento y
+    cada página solo los referencia. La tabla de comedores se dibuja con TablaCompilada.
+    Si el contenido no cabe en una página lanza DisposicionNoSoportada para que el llamador
+    use el motor de platypus.
+    """
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+        self._tablas = {}
+        self._moldes = {}
+
+        ancho_pagina, alto_pagina = A4
+        self.ancho_pagina, self.alto_pagina = ancho_pagina, alto_pagina
+        # Marco de SimpleDocTemplate con los márgenes de la guía
+        self.x_marco = MARGENES_GUIA['leftMargin'] + RELLENO_MARCO
+        self.y_superior = alto_pagina - MARGENES_GUIA['topMargin'] - RELLENO_MARCO
+        self.y_inferior = MARGENES_GUIA['bottomMargin'] + RELLENO_MARCO
+        self.ancho_disponible = (ancho_pagina - MARGENES_GUIA['leftMargin'] - MARGENES_GUIA['rightMargin']
+                                 - 2 * RELLENO_MARCO)
+
+    def reiniciar(self):
+        """
+        🔄 Descarta los moldes de ruta (se llama al comenzar cada lote de guías)
+        """
+        self._moldes.clear()
+
+    def molde(self, datos_programa, elaborado_por, conductor, placa):
+        """
+        🧱 Molde de encabezado y pie para esos datos del programa, firmante y transporte
+
+        Las guías por comedor de una misma ruta comparten el molde, así que el encabezado
+        y el pie se arman y dibujan una vez por ruta y no una vez por comedor.
+        """
+        clave = (tuple(sorted((k, str(v)) for k, v in datos_programa.items())),
+                 elaborado_por, conductor, placa, datetime.now().strftime('%Y-%m-%d'))
+        molde = self._moldes.get(clave)
+        if molde is None:
+            if len(self._moldes) >= MAX_MOLDES:
+                self._moldes.clear()
+            molde = self._moldes[clave] = MoldeGuia(self, datos_programa, elaborado_por, conductor, placa)
+        return molde
+
+    def tabla_compilada(self, num_filas_datos, presentes):
+        """
+        ♻️ Tabla compilada para `num_filas_datos` comedores y esa combinación de productos
+        """
+        clave = (num_filas_datos, presentes)
+        if clave not in self._tablas:
+            self._tablas[clave] = TablaCompilada(
+                ANCHOS_COLUMNAS, num_filas_datos + 2,
+                self.plantilla.estilo_tabla_comedores(num_filas_datos, presentes),
+            )
+        return self._tablas[clave]
+
+    def generar_pdf(self, datos_programa, datos_comedores, lotes_personalizados=None, elaborado_por="____________________", nombre_archivo="guia_transporte.pdf", conductor=None, placa=None, buffer=None):
+        """
+        Genera la guía paginada (4 comedores por página) dibujando directamente en el canvas
+
+        Recibe los mismos argumentos que generar_pdf_con_paginacion.
+        """
+        if not datos_comedores:
+            raise DisposicionNoSoportada("Guía sin comedores")
+
+        plantilla = self.plantilla
+        numero_guia = plantilla.generar_numero_guia_aleatorio()
+        molde = self.molde(datos_programa, elaborado_por, conductor, placa)
+        canv = canvas.Canvas(buffer if buffer is not None else nombre_archivo, pagesize=A4)
+
+        # 1. Encabezado y pie del molde de la ruta; solo el título se dibuja para este documento
+        molde.iniciar(canv, plantilla.crear_titulo_guia(numero_guia))
+        y_tabla, alto_pie = molde.y_tabla, molde.alto_pie
+
+        # 2. Planificar todas las páginas antes de dibujar (mismo orden de números aleatorios)
+        paginas = []
+        for i in range(0, len(datos_comedores), FILAS_POR_PAGINA):
+            chunk_comedores = datos_comedores[i:i + FILAS_POR_PAGINA]
+            data, presentes = plantilla.preparar_filas_comedores(chunk_comedores, lotes_personalizados)
+            tabla = self.tabla_compilada(len(chunk_comedores), presentes)
+            alturas = tabla.alturas(data)
+            y_pie = y_tabla - sum(alturas)
+            if y_pie - alto_pie < self.y_inferior - rl_config._FUZZ:
+                raise DisposicionNoSoportada("El contenido no cabe en una página")
+            paginas.append((tabla, data, alturas, y_pie))
+
+        # 3. Dibujar: encabezado, tabla de comedores y pie desplazado bajo la tabla
+        x_tabla = self.x_marco
+        for tabla, data, alturas, y_pie in paginas:
+            canv.doForm('EncabezadoGuia')
+            tabla.dibujar(canv, x_tabla + (self.ancho_disponible - tabla.ancho) / 2.0, y_pie, data, alturas)
+            canv.saveState()
+            canv.translate(0, y_pie - self.y_superior)
+            canv.doForm('PieGuia')
+            canv.restoreState()
+            canv.showPage()
+
+        canv.save()
+        print(f"PDF (canvas) generado exitosamente: {nombre_archivo if buffer is None else 'en memoria'}")
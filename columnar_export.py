@@ -0,0 +1,97 @@
+"""
+🏹 COLUMNAR_EXPORT.PY
+Exportación del DataFrame normalizado a formatos columnares (Parquet y Arrow IPC)
+Ambos usan el mismo esquema tipado y versionado (categorías como diccionarios, int32 y
+float32 como en memoria), así que releerlos con pandas devuelve exactamente los tipos de
+ExcelProcessor sin volver a convertir nada
+"""
+
+from io import BytesIO
+
+from record_builder import COLUMNAS_CATEGORICAS, ORDEN_COLUMNAS, TIPOS_NUMERICOS
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    ARROW_DISPONIBLE = True
+except ImportError:
+    ARROW_DISPONIBLE = False
+
+# Versión del esquema: subirla al cambiar columnas o tipos
+VERSION_ESQUEMA = "1"
+COMPRESION_PARQUET = "zstd"
+
+
+def esquema_registros():
+    """
+    📐 Esquema Arrow de los registros de comedores, en ORDEN_COLUMNAS
+
+    Columnas repetidas como dictionary<int32, string>, N° int64, textos string, COBER y
+    MUSLO_CONTRAMUSLO int32 y los kilos float32.
+    """
+    tipos_numericos = {
+        campo: pa.from_numpy_dtype(tipo) for campo, tipo in TIPOS_NUMERICOS.items()
+    }
+    campos = []
+    for columna in ORDEN_COLUMNAS:
+        if columna in COLUMNAS_CATEGORICAS:
+            tipo = pa.dictionary(pa.int32(), pa.string())
+        elif columna in tipos_numericos:
+            tipo = tipos_numericos[columna]
+        elif columna == 'N°':
+            tipo = pa.int64()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(columna, tipo))
+    return pa.schema(campos, metadata={
+        'esquema': 'registros_comedores',
+        'version': VERSION_ESQUEMA,
+    })
+
+
+def tabla_arrow(df):
+    """
+    🧱 Tabla Arrow del DataFrame con el esquema de los registros
+
+    Las columnas que no están en el esquema se omiten y las que faltan quedan nulas.
+    """
+    esquema = esquema_registros()
+    columnas = []
+    for campo in esquema:
+        if campo.name in df.columns:
+            columnas.append(pa.Array.from_pandas(df[campo.name]).cast(campo.type))
+        else:
+            columnas.append(pa.nulls(len(df), type=campo.type))
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def exportar_parquet(df, compresion=COMPRESION_PARQUET):
+    """
+    📦 Parquet (zstd por defecto) del DataFrame normalizado
+
+    Returns:
+        BytesIO: Archivo posicionado al inicio
+    """
+    buffer = BytesIO()
+    pq.write_table(tabla_arrow(df), buffer, compression=compresion)
+    buffer.seek(0)
+    return buffer
+
+
+def exportar_arrow_ipc(df, compresion=None):
+    """
+    🏹 Archivo Arrow IPC (.arrow, el formato de Feather v2) del DataFrame normalizado
+
+    Sin compresión por defecto, para poder abrirlo con memory-map sin copiar.
+
+    Returns:
+        BytesIO: Archivo posicionado al inicio
+    """
+    tabla = tabla_arrow(df)
+    buffer = BytesIO()
+    opciones = pa.ipc.IpcWriteOptions(compression=compresion)
+    with pa.ipc.new_file(buffer, tabla.schema, options=opciones) as escritor:
+        escritor.write_table(tabla)
+    buffer.seek(0)
+    return buffer
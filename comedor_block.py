@@ -0,0 +1,123 @@
+"""
+🧮 COMEDOR_BLOCK.PY
+Bloque de comedores pre-normalizado para la tabla de la guía
+Los pesos y unidades se convierten una sola vez (float/int) al agrupar las rutas, junto
+con los textos ya partidos en líneas y las cadenas formateadas de cada celda; la tabla
+de comedores solo ensambla filas con estas piezas y los lotes y temperaturas del momento
+"""
+
+# Productos en el orden de las columnas de la guía: (clave del lote, columna, conversión)
+PRODUCTOS = [
+    ('cerdo', 'CARNE_DE_CERDO', float),
+    ('pechuga', 'POLLO_PESO', float),
+    ('muslo', 'MUSLO_CONTRAMUSLO', int),
+    ('tilapia', 'TILAPIA', float),
+    ('res', 'CARNE_DE_RES', float),
+]
+
+
+def dividir_texto_inteligente(texto, max_chars_por_linea=20, max_lineas=3):
+    """Divide texto largo en múltiples líneas"""
+    if not texto or len(str(texto)) <= max_chars_por_linea:
+        return str(texto)
+
+    texto_str = str(texto).strip()
+    palabras = texto_str.split()
+    lineas = []
+    linea_actual = ""
+
+    for palabra in palabras:
+        if linea_actual and len(linea_actual + " " + palabra) > max_chars_por_linea:
+            lineas.append(linea_actual)
+            linea_actual = palabra
+        else:
+            if linea_actual:
+                linea_actual += " " + palabra
+            else:
+                linea_actual = palabra
+
+    if linea_actual:
+        lineas.append(linea_actual)
+
+    if len(lineas) > max_lineas:
+        lineas = lineas[:max_lineas]
+        if len(lineas[max_lineas-1]) <= max_chars_por_linea - 3:
+            lineas[max_lineas-1] += "..."
+        else:
+            lineas[max_lineas-1] = lineas[max_lineas-1][:max_chars_por_linea-3] + "..."
+
+    return "\n".join(lineas)
+
+
+def _formatear(cantidad, conversion):
+    """Texto de la celda de un producto: KG con 2 decimales, UND como entero, vacío si es 0"""
+    if cantidad <= 0:
+        return ""
+    return str(cantidad) if conversion is int else f"{cantidad:.2f}"
+
+
+class BloqueComedores:
+    """
+    Comedores de una ruta (o de una página) con sus datos ya tipados y formateados.
+
+    Cada fila guarda las 6 celdas fijas de la guía (municipio, departamento, comedor,
+    cobertura y dirección ya partidas en líneas) y, por producto, la cantidad y su texto.
+    Al armar el bloque se calculan también los totales y qué productos están presentes,
+    así que recortarlo por página (``bloque[i:i + 4]``) no vuelve a convertir nada.
+    """
+
+    def __init__(self, celdas, cobertura, cantidades):
+        # celdas: [(municipio, departamento, comedor, cober, direccion)] por fila
+        self.celdas = celdas
+        # cobertura: [int] por fila; cantidades: {columna: [float|int]} por producto
+        self.cobertura = cobertura
+        self.cantidades = cantidades
+        self.textos = {
+            columna: [_formatear(cantidad, conversion) for cantidad in cantidades[columna]]
+            for _, columna, conversion in PRODUCTOS
+        }
+        self.presentes = tuple(any(cantidad > 0 for cantidad in cantidades[columna])
+                               for _, columna, _ in PRODUCTOS)
+        self.total_cobertura = sum(cobertura)
+        self.totales = {columna: sum(cantidades[columna]) for _, columna, _ in PRODUCTOS}
+
+    @classmethod
+    def desde_comedores(cls, comedores):
+        """
+        🏗️ Arma el bloque a partir de la lista de comedores (dicts) de agrupar_rutas
+        """
+        celdas = [(
+            dividir_texto_inteligente(c.get('MUNICIPIO', 'CALI'), max_chars_por_linea=8, max_lineas=2),
+            c.get('DEPARTAMENTO', 'VALLE'),
+            dividir_texto_inteligente(c.get('COMEDOR/ESCUELA', ''), max_chars_por_linea=25, max_lineas=3),
+            str(c.get('COBER', 0)),
+            dividir_texto_inteligente(c.get('DIRECCIÓN', ''), max_chars_por_linea=20, max_lineas=3),
+        ) for c in comedores]
+        cobertura = [int(c.get('COBER', 0) or 0) for c in comedores]
+        cantidades = {
+            columna: [conversion(c.get(columna, 0) or 0) for c in comedores]
+            for _, columna, conversion in PRODUCTOS
+        }
+        return cls(celdas, cobertura, cantidades)
+
+    def __len__(self):
+        return len(self.celdas)
+
+    def __getitem__(self, seleccion):
+        if not isinstance(seleccion, slice):
+            raise TypeError("BloqueComedores solo admite recortes (bloque[i:j])")
+        return BloqueComedores(
+            self.celdas[seleccion],
+            self.cobertura[seleccion],
+            {columna: valores[seleccion] for columna, valores in self.cantidades.items()},
+        )
+
+    def fila_totales(self):
+        """
+        ➕ Textos de la fila TOTAL COBERTURA RUTA (columnas 0-22)
+        """
+        fila = ['TOTAL COBERTURA RUTA', '', '', '', f"{self.total_cobertura:,}", '']
+        for _, columna, conversion in PRODUCTOS:
+            fila += [_formatear(self.totales[columna], conversion), '', '']
+        fila += ['', '']
+        return fila
@@ -4,9 +4,9 @@ Módulo para extracción estructurada de información de archivos Excel
 Maneja el parsing inteligente de encabezados y metadatos
 """
 
-import pandas as pd
 import re
 from datetime import datetime
+from raw_sheet import RawSheet
 
 class DataExtractor:
     """
@@ -26,10 +26,13 @@ class DataExtractor:
     def detectar_tipo_archivo(self, df_raw):
         """
         ✅ Detecta el tipo de archivo basado en patrones en las primeras 15 filas
+        
+        Args:
+            df_raw: DataFrame crudo o RawSheet ya construida
         """
-        for i in range(min(15, len(df_raw))):
-            fila = df_raw.iloc[i, 0] if not pd.isna(df_raw.iloc[i, 0]) else ""
-            fila_str = str(fila).upper()
+        hoja = RawSheet.desde(df_raw)
+        for i in range(min(15, len(hoja))):
+            fila_str = hoja.celda_mayus(i, 0)
             
             # 1. COMEDORES COMUNITARIOS
             if "COMEDORES COMUNITARIOS" in fila_str:
@@ -37,8 +40,8 @@ class DataExtractor:
                 
             # 2. CONSORCIO ALIMENTANDO A CALI (con subtipos)
             elif "CONSORCIO ALIMENTANDO A CALI" in fila_str:
-                for j in range(i, min(30, len(df_raw))):
-                    fila_j = str(df_raw.iloc[j, 0]).upper() if not pd.isna(df_raw.iloc[j, 0]) else ""
+                for j in range(i, min(30, len(hoja))):
+                    fila_j = hoja.celda_mayus(j, 0)
                     if "CONGELADOS RUTA" in fila_j:
                         return "CONSORCIO_CONGELADOS", fila_str
                     elif "JU CALI" in fila_j or "JORNADA UNICA" in fila_j:
@@ -69,6 +72,7 @@ class DataExtractor:
                 'fecha_entrega': str
             }
         """
+        hoja = RawSheet.desde(df_raw)
         resultado = {
             'programa': 'PROGRAMA NO DETECTADO',
             'empresa': 'EMPRESA NO DETECTADA',
@@ -79,23 +83,23 @@ class DataExtractor:
         }
         
         # ✅ EXTRAER INFORMACIÓN DE LA FILA 4
-        if len(df_raw) > 3:  # Verificar que existe la fila 4 (índice 3)
-            fila_4 = str(df_raw.iloc[3, 0]).strip() if not pd.isna(df_raw.iloc[3, 0]) else ""
+        if len(hoja) > 3:  # Verificar que existe la fila 4 (índice 3)
+            fila_4 = hoja.celda_texto(3, 0)
             if fila_4:
                 programa_info = self._parsear_fila_programa(fila_4)
                 resultado.update(programa_info)
         
         # ✅ EXTRAER SOLICITUD REMESA DE LA FILA 8
-        if len(df_raw) > 7:  # Verificar que existe la fila 8 (índice 7)
-            fila_8 = str(df_raw.iloc[7, 0]).strip() if not pd.isna(df_raw.iloc[7, 0]) else ""
+        if len(hoja) > 7:  # Verificar que existe la fila 8 (índice 7)
+            fila_8 = hoja.celda_texto(7, 0)
             if fila_8:
                 solicitud = self._parsear_solicitud_remesa(fila_8)
                 if solicitud:
                     resultado['solicitud_remesa'] = solicitud
         
         # ✅ EXTRAER DÍAS DE CONSUMO DE LA FILA 9
-        if len(df_raw) > 8:  # Verificar que existe la fila 9 (índice 8)
-            fila_9 = str(df_raw.iloc[8, 0]).strip() if not pd.isna(df_raw.iloc[8, 0]) else ""
+        if len(hoja) > 8:  # Verificar que existe la fila 9 (índice 8)
+            fila_9 = hoja.celda_texto(8, 0)
             if fila_9:
                 dias = self._parsear_dias_consumo(fila_9)
                 if dias:
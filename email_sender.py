@@ -1,11 +1,85 @@
 import streamlit as st
-import smtplib
-import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 
+from smtp_pool import HOST_POR_DEFECTO, PUERTO_POR_DEFECTO, PoolSMTP
+
+def configuracion_smtp():
+    """
+    ⚙️ Servidor y credenciales SMTP desde st.secrets
+    
+    Las credenciales vienen de [gmail]; la sección [smtp] (opcional) cambia host, port,
+    ssl y starttls. Sin ella se usa smtp.gmail.com:465 con SSL.
+    """
+    smtp = st.secrets.get("smtp", {})
+    return {
+        'host': smtp.get("host", HOST_POR_DEFECTO),
+        'puerto': int(smtp.get("port", PUERTO_POR_DEFECTO)),
+        'usuario': st.secrets["gmail"]["email"],
+        'password': st.secrets["gmail"]["app_password"],
+        'usar_ssl': bool(smtp.get("ssl", True)),
+        'starttls': bool(smtp.get("starttls", False)),
+    }
+
+@st.cache_resource
+def obtener_pool_smtp(host, puerto, usuario, password, usar_ssl=True, starttls=False):
+    """
+    📮 Pool de conexiones SMTP compartido por todas las sesiones del servidor
+    
+    El handshake TLS y el login se hacen una vez por conexión, no una vez por correo.
+    """
+    return PoolSMTP(host, puerto, usuario, password, usar_ssl=usar_ssl, starttls=starttls)
+
+def crear_mensaje(remitente, destinatarios, asunto, cuerpo_mensaje, adjuntos):
+    """
+    ✉️ Mensaje MIME con cuerpo HTML y adjuntos
+    
+    Args:
+        adjuntos (list): Lista de diccionarios con 'buffer' y 'nombre'
+    """
+    mensaje = MIMEMultipart()
+    mensaje["From"] = remitente
+    mensaje["To"] = ", ".join(destinatarios)
+    mensaje["Subject"] = asunto
+
+    # Adjuntar cuerpo del mensaje
+    mensaje.attach(MIMEText(cuerpo_mensaje, "html"))
+
+    # ⭐ ADJUNTAR MÚLTIPLES ARCHIVOS
+    for adjunto in adjuntos:
+        # Crear objeto MIMEBase para cada adjunto
+        part = MIMEBase("application", "octet-stream")
+        
+        # Leer el contenido del buffer
+        buffer = adjunto['buffer']
+        nombre = adjunto['nombre']
+        
+        # Si el buffer tiene el método getvalue(), usarlo; sino, leerlo directamente
+        if hasattr(buffer, 'getvalue'):
+            contenido = buffer.getvalue()
+        else:
+            # Si es un BytesIO, asegurar que esté en posición 0
+            buffer.seek(0)
+            contenido = buffer.read()
+        
+        part.set_payload(contenido)
+        
+        # Codificar en base64
+        encoders.encode_base64(part)
+        
+        # Añadir cabecera
+        part.add_header(
+            "Content-Disposition",
+            f"attachment; filename= {nombre}",
+        )
+        
+        # Adjuntar al mensaje
+        mensaje.attach(part)
+    
+    return mensaje
+
 def enviar_correo_con_adjunto(destinatarios, asunto, cuerpo_mensaje, archivo_adjunto_buffer, nombre_archivo_adjunto):
     """
     Envía un correo electrónico usando Gmail con un archivo adjunto desde un buffer en memoria.
@@ -39,56 +113,12 @@ def enviar_correo_con_adjuntos(destinatarios, asunto, cuerpo_mensaje, adjuntos):
         bool: True si exitoso, False si hay error
     """
     try:
-        # Cargar credenciales
-        remitente = st.secrets["gmail"]["email"]
-        password = st.secrets["gmail"]["app_password"]
-
-        # Crear mensaje
-        mensaje = MIMEMultipart()
-        mensaje["From"] = remitente
-        mensaje["To"] = ", ".join(destinatarios)
-        mensaje["Subject"] = asunto
-
-        # Adjuntar cuerpo del mensaje
-        mensaje.attach(MIMEText(cuerpo_mensaje, "html"))
-
-        # ⭐ ADJUNTAR MÚLTIPLES ARCHIVOS
-        for adjunto in adjuntos:
-            # Crear objeto MIMEBase para cada adjunto
-            part = MIMEBase("application", "octet-stream")
-            
-            # Leer el contenido del buffer
-            buffer = adjunto['buffer']
-            nombre = adjunto['nombre']
-            
-            # Si el buffer tiene el método getvalue(), usarlo; sino, leerlo directamente
-            if hasattr(buffer, 'getvalue'):
-                contenido = buffer.getvalue()
-            else:
-                # Si es un BytesIO, asegurar que esté en posición 0
-                buffer.seek(0)
-                contenido = buffer.read()
-            
-            part.set_payload(contenido)
-            
-            # Codificar en base64
-            encoders.encode_base64(part)
-            
-            # Añadir cabecera
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename= {nombre}",
-            )
-            
-            # Adjuntar al mensaje
-            mensaje.attach(part)
-
-        # Enviar correo
-        context = ssl.create_default_context()
+        config = configuracion_smtp()
+        remitente = config['usuario']
+        mensaje = crear_mensaje(remitente, destinatarios, asunto, cuerpo_mensaje, adjuntos)
         
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(remitente, password)
-            server.sendmail(remitente, destinatarios, mensaje.as_string())
+        # Enviar correo por una conexión del pool (se reutiliza entre envíos)
+        obtener_pool_smtp(**config).enviar(remitente, destinatarios, mensaje.as_string())
             
         return True
 
@@ -0,0 +1,95 @@
+"""
+📤 EXCEL_EXPORT.PY
+Exportación a Excel en streaming con memoria constante
+Las hojas se escriben fila a fila con un libro openpyxl en modo write_only (cada hoja va a
+un archivo temporal, sin modelo de celdas en memoria) y el .xlsx final queda en un
+SpooledTemporaryFile: en memoria mientras es pequeño, en disco al crecer
+"""
+
+import tempfile
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# Tamaño a partir del cual el .xlsx temporal pasa de memoria a disco
+UMBRAL_MEMORIA = 16 * 1024 * 1024  # 16 MB
+# Filas que se convierten a valores de Python de una vez
+FILAS_POR_BLOQUE = 5000
+
+# Estilo de encabezados e índices (el mismo que aplica pandas.to_excel)
+_BORDE = Side(style='thin')
+FUENTE_ENCABEZADO = Font(bold=True)
+BORDE_ENCABEZADO = Border(left=_BORDE, right=_BORDE, top=_BORDE, bottom=_BORDE)
+ALINEACION_ENCABEZADO = Alignment(horizontal='center', vertical='top')
+
+
+def _celda_encabezado(hoja, valor):
+    celda = WriteOnlyCell(hoja, value=valor)
+    celda.font = FUENTE_ENCABEZADO
+    celda.border = BORDE_ENCABEZADO
+    celda.alignment = ALINEACION_ENCABEZADO
+    return celda
+
+
+def _valores_columna(serie):
+    """
+    🔄 Valores de Python de una columna, con None en los vacíos
+
+    Los float32 se escriben por su valor decimal (12.3, no 12.300000190734863).
+    """
+    if serie.dtype == np.float32:
+        serie = serie.astype(str).astype(np.float64)
+    valores = serie.astype(object)
+    return valores.where(serie.notna(), None).tolist()
+
+
+def escribir_hoja(libro, nombre, df, index=True):
+    """
+    📝 Agrega una hoja al libro write_only con el contenido del DataFrame
+
+    Con index=True los niveles del índice se escriben como primeras columnas, en negrita
+    como los encabezados; a diferencia de to_excel, los valores repetidos de un
+    MultiIndex no se combinan (write_only no admite celdas combinadas).
+    """
+    hoja = libro.create_sheet(title=nombre)
+    if index:
+        nombres_indice = [n if n is not None else '' for n in df.index.names]
+        df = df.reset_index()
+        num_indice = len(nombres_indice)
+        encabezados = nombres_indice + [str(c) for c in df.columns[num_indice:]]
+    else:
+        num_indice = 0
+        encabezados = [str(c) for c in df.columns]
+    hoja.append([_celda_encabezado(hoja, valor) for valor in encabezados])
+
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        columnas = [_valores_columna(bloque.iloc[:, i]) for i in range(bloque.shape[1])]
+        for fila in zip(*columnas):
+            if num_indice:
+                fila = [_celda_encabezado(hoja, valor) for valor in fila[:num_indice]] + list(fila[num_indice:])
+            hoja.append(fila)
+    return hoja
+
+
+def escribir_libro_streaming(hojas, umbral_memoria=UMBRAL_MEMORIA):
+    """
+    📦 Escribe un .xlsx con las hojas dadas sin construir el modelo de celdas en memoria
+
+    Args:
+        hojas (list): Tuplas (nombre, DataFrame, index) en el orden del libro
+        umbral_memoria (int): Bytes a partir de los cuales el archivo pasa a disco
+
+    Returns:
+        SpooledTemporaryFile: Archivo .xlsx posicionado al inicio
+    """
+    libro = Workbook(write_only=True)
+    for nombre, df, index in hojas:
+        escribir_hoja(libro, nombre, df, index)
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=umbral_memoria, mode='w+b')
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
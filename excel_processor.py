@@ -4,10 +4,14 @@ Módulo principal para el procesamiento de archivos Excel
 Maneja la lógica de extracción de comedores, rutas y productos
 """
 
+import numpy as np
 import pandas as pd
-import re
 from datetime import datetime
 from data_extractor import DataExtractor
+from raw_sheet import RawSheet, TableIndex
+from excel_stream import ExcelStreamReader
+from product_classifier import ClasificadorProductos
+from record_builder import ConstructorRegistros, valores_numericos, compactar_tipos
 from logger_config import logger
 
 class ExcelProcessor:
@@ -15,6 +19,18 @@ class ExcelProcessor:
     Clase principal para procesar archivos Excel de comedores/programas alimentarios
     """
     
+    # Incrementar cuando cambie el resultado de la extracción (invalida la caché de resultados)
+    VERSION = "2.2"
+    
+    # Producto detectado -> columna final del DataFrame (en el orden de salida)
+    COLUMNAS_PRODUCTOS = {
+        'carne_cerdo': 'CARNE_DE_CERDO',
+        'carne_res': 'CARNE_DE_RES',
+        'MUSLO_CONTRAMUSLO': 'MUSLO_CONTRAMUSLO',
+        'pollo_peso': 'POLLO_PESO',
+        'tilapia': 'TILAPIA',
+    }
+    
     def __init__(self):
         self.extractor = DataExtractor()
         self.patrones_productos = {
@@ -44,28 +60,33 @@ class ExcelProcessor:
                 'variaciones_texto': ['TILAPIA', 'FILETE DE TILAPIA']
             }
         }
+        # Catálogo compilado una sola vez y compartido por todos los procesadores del proceso
+        self.clasificador = ClasificadorProductos.para(self.patrones_productos)
     
     def procesar_archivo_completo(self, archivo_excel):
         """
         🎯 FUNCIÓN PRINCIPAL: Procesa completamente un archivo Excel
         
         Args:
-            archivo_excel: Archivo subido en Streamlit
+            archivo_excel: RawSheet ya leída (p. ej. la usada en la validación) o archivo subido en Streamlit
             
         Returns:
             tuple: (df_procesado, num_registros, tipo_archivo, info_extraida)
         """
         try:
-            # 1. LEER ARCHIVO EXCEL
-            df_raw = pd.read_excel(archivo_excel, header=None)
-            print(f"📊 Archivo leído: {len(df_raw)} filas, {len(df_raw.columns)} columnas")
+            # 1. LEER ARCHIVO EXCEL (una sola vez; se reutiliza la hoja si ya fue leída)
+            if isinstance(archivo_excel, RawSheet):
+                hoja = archivo_excel
+            else:
+                hoja = RawSheet.desde_archivo(archivo_excel)
+            print(f"📊 Archivo leído: {hoja.n_filas} filas, {hoja.n_columnas} columnas")
             
             # 2. DETECTAR TIPO DE ARCHIVO
-            tipo_archivo, programa_detectado = self.extractor.detectar_tipo_archivo(df_raw)
+            tipo_archivo, programa_detectado = self.extractor.detectar_tipo_archivo(hoja)
             print(f"🔍 Tipo detectado: {tipo_archivo}")
             
             # 3. EXTRAER INFORMACIÓN ESTRUCTURADA (NUEVA FUNCIONALIDAD)
-            info_extraida = self.extractor.extraer_informacion_estructurada(df_raw)
+            info_extraida = self.extractor.extraer_informacion_estructurada(hoja)
             print(f"📋 Info extraída: {info_extraida}")
             
             # 4. VALIDAR INFORMACIÓN EXTRAÍDA
@@ -79,7 +100,7 @@ class ExcelProcessor:
             
             # 6. PROCESAR DATOS DE COMEDORES
             registros_consolidados = self._extraer_registros_comedores(
-                df_raw, 
+                hoja, 
                 patron_rutas, 
                 tipo_archivo, 
                 info_extraida
@@ -87,7 +108,46 @@ class ExcelProcessor:
             
             print(f"🏪 Registros encontrados: {len(registros_consolidados)}")
             
-            # 7. CREAR DATAFRAME FINAL
+            # 7. CREAR DATAFRAME FINAL (tipos compactos directamente desde las columnas)
+            if len(registros_consolidados):
+                df_final = registros_consolidados.construir_dataframe()
+                return df_final, len(registros_consolidados), tipo_archivo, info_extraida
+            else:
+                print(f"❌ No se encontraron registros válidos para tipo: {tipo_archivo}")
+                return None, 0, tipo_archivo, info_extraida
+                
+        except Exception as e:
+            print(f"Error procesando archivo: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None, 0, "ERROR", {}
+    
+    def procesar_archivo_streaming(self, archivo_excel):
+        """
+        🌊 Variante de procesar_archivo_completo que no carga la hoja completa en memoria
+        
+        Usa openpyxl en modo solo lectura y una única pasada hacia adelante: la cabecera
+        (filas 4/8/9), la detección de tablas y la extracción de filas ocurren a la vez.
+        Para consumir los registros uno a uno usar directamente ExcelStreamReader.
+        
+        Args:
+            archivo_excel: Ruta o archivo subido en Streamlit (.xlsx)
+            
+        Returns:
+            tuple: (df_procesado, num_registros, tipo_archivo, info_extraida)
+        """
+        try:
+            lector = ExcelStreamReader(self)
+            registros_consolidados = list(lector.iterar_registros(archivo_excel))
+            tipo_archivo, info_extraida = lector.tipo_archivo, lector.info_extraida
+            print(f"🌊 Archivo recorrido en streaming: {lector.filas_leidas} filas, tipo {tipo_archivo}")
+            
+            es_valida, errores = self.extractor.validar_informacion_extraida(info_extraida)
+            if not es_valida:
+                print(f"⚠️ Advertencias en extracción: {errores}")
+            
+            print(f"🏪 Registros encontrados: {len(registros_consolidados)}")
+            
             if registros_consolidados:
                 df_final = self._crear_dataframe_final(registros_consolidados)
                 return df_final, len(registros_consolidados), tipo_archivo, info_extraida
@@ -96,48 +156,33 @@ class ExcelProcessor:
                 return None, 0, tipo_archivo, info_extraida
                 
         except Exception as e:
-            print(f"Error procesando archivo: {str(e)}")
+            print(f"Error procesando archivo en streaming: {str(e)}")
             import traceback
             traceback.print_exc()
             return None, 0, "ERROR", {}
     
-    def _extraer_registros_comedores(self, df_raw, patron_rutas, tipo_archivo, info_extraida):
+    def _extraer_registros_comedores(self, hoja, patron_rutas, tipo_archivo, info_extraida):
         """
         🏪 Estrategia de extracción generalizada: busca tablas directamente.
         Cualquier texto previo a una tabla se considera la "ruta".
+        
+        El índice de tablas se calcula en un solo barrido vectorizado, de modo que
+        solo se visitan las filas de datos reales de cada tabla.
+        
+        Returns:
+            ConstructorRegistros: Registros acumulados por columnas (len() = número de registros)
         """
-        registros_consolidados = []
+        registros_consolidados = ConstructorRegistros(info_extraida)
         ruta_actual = "RUTA GENERAL"  # Valor por defecto si no se encuentra texto antes
 
-        # Iteramos por cada fila para encontrar el inicio de las tablas
-        for i in range(len(df_raw)):
-            try:
-                celda_A_str = str(df_raw.iloc[i, 0]).strip()
-                celda_B_str = str(df_raw.iloc[i, 1]).strip()
+        for fila_encabezado, datos_inicio, fila_fin, fila_titulo in TableIndex.construir(hoja):
+            if fila_titulo >= 0:
+                ruta_actual = hoja.celda_texto(fila_titulo, 0)
 
-                # Condición de inicio de tabla: "N°" en Col A y texto en Col B
-                if celda_A_str in ["N°", "No."] and celda_B_str not in ["nan", ""]:
-                    
-                    # --- Lógica para encontrar el nombre de la ruta ---
-                    # Buscamos hacia arriba desde la tabla para encontrar el último texto no numérico
-                    for j in range(i - 1, -1, -1):
-                        celda_ruta = df_raw.iloc[j, 0]
-                        if not pd.isna(celda_ruta) and isinstance(celda_ruta, str) and celda_ruta.strip():
-                            # Asegurarnos de que no sea parte de la información del programa
-                            if "PROGRAMA:" not in celda_ruta.upper() and "EMPRESA:" not in celda_ruta.upper():
-                                ruta_actual = celda_ruta.strip()
-                                break  # Encontramos el título, salimos del bucle de búsqueda
-                    
-                    # Procesar la tabla encontrada
-                    columnas_productos, _ = self._detectar_columnas_productos(df_raw, i)
-                    
-                    comedores_datos = self._extraer_datos_de_tabla(df_raw, i, columnas_productos, "DIA 1", ruta_actual, info_extraida)
-                    
-                    if comedores_datos:
-                        registros_consolidados.extend(comedores_datos)
-            
-            except IndexError:  # Si una fila no tiene suficientes columnas
-                continue
+            # Procesar la tabla encontrada
+            columnas_productos, _ = self._detectar_columnas_productos(hoja, fila_encabezado)
+
+            self._extraer_datos_de_tabla(registros_consolidados, hoja, datos_inicio, fila_fin, columnas_productos, "DIA 1", ruta_actual)
                 
         return registros_consolidados
     
@@ -158,104 +203,60 @@ class ExcelProcessor:
             
         return dia, ruta
     
-    def _detectar_columnas_productos(self, df_raw, fila_inicio):
+    def _detectar_columnas_productos(self, hoja, fila_inicio):
         """
         🔍 Detecta las columnas de productos (F, G, H) con patrones específicos
         """
+        fila_fin = min(fila_inicio + 10, hoja.n_filas)
+        col_fin = min(hoja.n_columnas, 8)  # Solo columnas F, G, H si existen (índices 5, 6, 7)
+        
+        # Marcar de una vez las celdas del bloque que contienen indicadores de productos
+        bloque = hoja.texto_mayus[fila_inicio:fila_fin, 5:col_fin]
+        tiene_unidad = np.zeros(bloque.shape, dtype=bool)
+        for unidad in self.clasificador.unidades:
+            tiene_unidad |= np.char.find(bloque, unidad) >= 0
+        
         # Buscar fila de encabezados en rango limitado
-        for fila in range(fila_inicio, min(fila_inicio + 10, len(df_raw))):
-            columnas_productos_encontradas = False
+        for desplazamiento in np.flatnonzero(tiene_unidad.any(axis=1)):
+            fila = fila_inicio + int(desplazamiento)
             
-            # Verificar solo columnas F, G, H si existen (índices 5, 6, 7)
-            for col in range(5, min(len(df_raw.columns), 8)):  # Hasta donde existan columnas
-                celda = str(df_raw.iloc[fila, col]).upper() if not pd.isna(df_raw.iloc[fila, col]) else ""
-                
-                # Verificar si contiene indicadores de productos
-                if any(unidad in celda for unidades in [p['unidades_validas'] for p in self.patrones_productos.values()] for unidad in unidades):
-                    columnas_productos_encontradas = True
-                    break
+            # Mapear cada columna F, G, H
+            columnas_detectadas = {}
             
-            if columnas_productos_encontradas:
-                # Mapear cada columna F, G, H
-                columnas_detectadas = {}
+            for col in range(5, col_fin):
+                encabezado_actual = hoja.celda_mayus(fila, col)
                 
-                for col in range(5, min(8, len(df_raw.columns))):
-                    encabezado_actual = str(df_raw.iloc[fila, col]).upper() if not pd.isna(df_raw.iloc[fila, col]) else ""
+                if encabezado_actual:
+                    producto_detectado = self._clasificar_producto_por_patron(encabezado_actual)
                     
-                    if encabezado_actual.strip():
-                        producto_detectado = self._clasificar_producto_por_patron(encabezado_actual)
-                        
-                        if producto_detectado:
-                            columnas_detectadas[producto_detectado] = col
-                
-                if columnas_detectadas:
-                    return columnas_detectadas, fila
+                    if producto_detectado:
+                        columnas_detectadas[producto_detectado] = col
+            
+            if columnas_detectadas:
+                return columnas_detectadas, fila
         
         # Si no encuentra patrones específicos, usar detección por contexto
-        return self._detectar_por_contexto(df_raw, fila_inicio)
+        return self._detectar_por_contexto(hoja, fila_inicio)
     
     def _clasificar_producto_por_patron(self, encabezado):
         """
         🏷️ Clasifica un encabezado de columna con sistema de puntuación mejorado
-        """
-        encabezado_limpio = self._limpiar_texto_para_comparacion(encabezado)
         
-        posibles_coincidencias = []
-
-        for producto, config in self.patrones_productos.items():
-            tiene_palabra_clave = any(palabra in encabezado_limpio for palabra in config['palabras_clave'])
-            tiene_unidad_valida = any(unidad in encabezado_limpio for unidad in config['unidades_validas'])
-            
-            if tiene_palabra_clave and tiene_unidad_valida:
-                # Puntuación basada en cuántas palabras clave y variaciones de texto coinciden
-                score = sum(1 for palabra in config['palabras_clave'] if palabra in encabezado_limpio)
-                score += sum(1 for variacion in config['variaciones_texto'] if self._limpiar_texto_para_comparacion(variacion) in encabezado_limpio)
-                posibles_coincidencias.append((score, producto))
-        
-        if not posibles_coincidencias:
-            return None
-
-        # Ordenar por puntuación para encontrar la mejor coincidencia
-        posibles_coincidencias.sort(key=lambda x: x[0], reverse=True)
-        
-        # Lógica de desempate: si dos productos tienen la misma puntuación,
-        # preferimos el que tiene una coincidencia de 'variaciones_texto' más larga.
-        if len(posibles_coincidencias) > 1 and posibles_coincidencias[0][0] == posibles_coincidencias[1][0]:
-            # Implementar desempate si es necesario, o simplemente tomar el primero
-            pass
-
-        return posibles_coincidencias[0][1]
-    
-    def _limpiar_texto_para_comparacion(self, texto):
-        """
-        🧹 Limpia el texto para hacer comparaciones más robustas
+        Usa el clasificador compilado: una pasada por encabezado distinto en todo el lote.
         """
-        import re
-        
-        # Convertir a mayúsculas
-        texto_limpio = texto.upper()
-        
-        # Remover caracteres especiales y normalizar espacios
-        texto_limpio = re.sub(r'[^\w\s]', ' ', texto_limpio)
-        texto_limpio = re.sub(r'\s+', ' ', texto_limpio)
-        texto_limpio = texto_limpio.strip()
-        
-        return texto_limpio
+        return self.clasificador.clasificar(encabezado)
     
-    def _detectar_por_contexto(self, df_raw, fila_inicio):
+    def _detectar_por_contexto(self, hoja, fila_inicio):
         """
         🎯 Detección alternativa cuando no encuentra patrones específicos
         """
         mapeo_defecto = {}
+        num_columnas = hoja.n_columnas
         
         # Analizar las columnas F, G, H (si existen) y asignar por probabilidad
-        for col in range(5, min(len(df_raw.columns), 8)):
-            pistas_columna = []
-            
-            for fila in range(max(0, fila_inicio - 3), min(fila_inicio + 8, len(df_raw))):
-                celda = str(df_raw.iloc[fila, col]).upper() if not pd.isna(df_raw.iloc[fila, col]) else ""
-                if celda.strip():
-                    pistas_columna.append(celda)
+        for col in range(5, min(num_columnas, 8)):
+            ventana = hoja.texto_mayus[max(0, fila_inicio - 3):min(fila_inicio + 8, hoja.n_filas), col]
+            pistas_columna = [str(celda) for celda in ventana if celda]
             
             # Clasificar la columna basándose en todas las pistas
             producto_mas_probable = None
@@ -271,117 +272,93 @@ class ExcelProcessor:
         # Si aún está vacío, aplicar reglas heurísticas (ajustado para mínimo 6 columnas)
         if not mapeo_defecto:
             mapeo_defecto['carne_cerdo'] = 5  # Columna F siempre existe
-            if len(df_raw.columns) >= 7:  # Si tiene columna G
+            if num_columnas >= 7:  # Si tiene columna G
                 mapeo_defecto['MUSLO_CONTRAMUSLO'] = 6
-            if len(df_raw.columns) >= 8:  # Si tiene columna H
+            if num_columnas >= 8:  # Si tiene columna H
                 mapeo_defecto['pollo_peso'] = 7
-            elif len(df_raw.columns) >= 7 and 'MUSLO_CONTRAMUSLO' not in mapeo_defecto:
+            elif num_columnas >= 7 and 'MUSLO_CONTRAMUSLO' not in mapeo_defecto:
                 mapeo_defecto['carne_res'] = 6  # Alternativa si solo hay 2 columnas de productos
         
         return mapeo_defecto, fila_inicio + 2
     
-    def _extraer_datos_de_tabla(self, df_raw, inicio_tabla, columnas_productos, dia, ruta, info_extraida):
+    def _extraer_datos_de_tabla(self, registros, hoja, datos_inicio, fila_fin, columnas_productos, dia, ruta):
         """
-        Lee una tabla de datos desde su inicio hasta que la estructura se rompe.
-        Se detiene en filas vacías, al encontrar la palabra "TOTAL", o si los datos dejan de ser válidos.
+        Agrega al constructor las filas de datos de una tabla ya delimitada por el índice de tablas.
+        El rango [datos_inicio, fila_fin) contiene solo filas válidas (número en col A y datos en B y C);
+        la parada en filas vacías o "TOTAL" ya se resolvió al construir el índice.
         """
-        comedores_datos = []
-        for k in range(inicio_tabla + 1, len(df_raw)):
-            try:
-                primera_celda = df_raw.iloc[k, 0]
-                
-                # --- CONDICIÓN DE PARADA ROBUSTA ---
-                # 1. Si la primera celda está vacía o es texto que no es un número.
-                if pd.isna(primera_celda) or not isinstance(primera_celda, (int, float)):
-                    # 2. Permitimos la palabra "TOTAL" como señal de fin.
-                    if "TOTAL" in str(primera_celda).upper():
-                        break
-                    # Si es otro texto, y ya hemos leído datos, es el fin de la tabla.
-                    elif len(comedores_datos) > 0:
-                        break
-                    # Si no, simplemente es una línea de texto que ignoramos.
-                    else:
-                        continue
-                
-                # Si es una fila de datos válida (número en col A y datos en B y C)
-                if not pd.isna(df_raw.iloc[k, 1]) and not pd.isna(df_raw.iloc[k, 2]):
-                    registro = {
-                        'PROGRAMA': info_extraida.get('programa', 'N/A'), 'EMPRESA': info_extraida.get('empresa', 'N/A'),
-                        'MODALIDAD': info_extraida.get('modalidad', 'N/A'), 'SOLICITUD_REMESA': info_extraida.get('solicitud_remesa', 'N/A'),
-                        'DIAS_CONSUMO': info_extraida.get('dias_consumo', 'N/A'), 'FECHA_ENTREGA': info_extraida.get('fecha_entrega', 'N/A'),
-                        'DIA': dia, 'RUTA': ruta, 'N°': int(primera_celda), 'MUNICIPIO': str(df_raw.iloc[k, 1]).strip(),
-                        'COMEDOR/ESCUELA': str(df_raw.iloc[k, 2]).strip(), 'COBER': df_raw.iloc[k, 3] if not pd.isna(df_raw.iloc[k, 3]) else 0,
-                        'DIRECCIÓN': str(df_raw.iloc[k, 4]).strip() if not pd.isna(df_raw.iloc[k, 4]) else "",
-                    }
-                    registro.update(self._mapear_productos(df_raw, k, columnas_productos))
-                    comedores_datos.append(registro)
-                else:
-                    # Si las columnas B o C están vacías, la tabla terminó.
-                    if len(comedores_datos) > 0:
-                        break
-
-            except (IndexError, ValueError):
-                continue
-                
-        return comedores_datos
+        productos = self._extraer_productos_columnares(hoja, datos_inicio, fila_fin, columnas_productos)
+        registros.agregar_tabla(hoja, datos_inicio, fila_fin, dia, ruta, productos)
     
-    def _mapear_productos(self, df_raw, fila, columnas_productos):
+    def _extraer_productos_columnares(self, hoja, datos_inicio, fila_fin, columnas_productos):
         """
-        🥩 Mapea los productos según las columnas detectadas
+        🥩 Extrae las cantidades de productos de una tabla como columnas completas
+        
+        Cada columna detectada se recorta de la hoja para todo el rango de la tabla y se
+        convierte a número en un solo paso (vacíos y textos no numéricos quedan en 0).
         """
-        productos = {}
+        filas = slice(datos_inicio, fila_fin)
+        return {
+            nombre_columna: valores_numericos(hoja, filas, columnas_productos.get(producto_tipo))
+            for producto_tipo, nombre_columna in self.COLUMNAS_PRODUCTOS.items()
+        }
+    
+    def _crear_registro_base(self, fila, dia, ruta, info_extraida):
+        """
+        🧾 Construye los campos de un comedor (sin productos) a partir de los valores de una fila de datos
+        (ingesta en streaming, que recibe las filas una a una)
         
-        # Mapear cada tipo de producto
-        for producto_tipo in ['carne_cerdo', 'carne_res', 'MUSLO_CONTRAMUSLO', 'pollo_peso', 'tilapia']:
-            if producto_tipo in columnas_productos:
-                col = columnas_productos[producto_tipo]
-                valor = df_raw.iloc[fila, col] if not pd.isna(df_raw.iloc[fila, col]) else 0
-                
-                # Mapear al nombre de columna final
-                if producto_tipo == 'carne_cerdo':
-                    productos['CARNE_DE_CERDO'] = valor
-                elif producto_tipo == 'carne_res':
-                    productos['CARNE_DE_RES'] = valor
-                elif producto_tipo == 'MUSLO_CONTRAMUSLO':
-                    productos['MUSLO_CONTRAMUSLO'] = valor
-                elif producto_tipo == 'pollo_peso':
-                    productos['POLLO_PESO'] = valor
-                elif producto_tipo == 'tilapia':
-                    productos['TILAPIA'] = valor
-            else:
-                # Valores por defecto
-                if producto_tipo == 'carne_cerdo':
-                    productos['CARNE_DE_CERDO'] = 0
-                elif producto_tipo == 'carne_res':
-                    productos['CARNE_DE_RES'] = 0
-                elif producto_tipo == 'MUSLO_CONTRAMUSLO':
-                    productos['MUSLO_CONTRAMUSLO'] = 0
-                elif producto_tipo == 'pollo_peso':
-                    productos['POLLO_PESO'] = 0
-                elif producto_tipo == 'tilapia':
-                    productos['TILAPIA'] = 0
+        Args:
+            fila (list): Valores de la fila con None en celdas vacías
+        """
+        def celda(col):
+            return fila[col] if col < len(fila) else None
+        
+        def texto(col):
+            valor = celda(col)
+            return str(valor).strip() if valor is not None else ""
         
+        cobertura = celda(3)
+        return {
+            'PROGRAMA': info_extraida.get('programa', 'N/A'), 'EMPRESA': info_extraida.get('empresa', 'N/A'),
+            'MODALIDAD': info_extraida.get('modalidad', 'N/A'), 'SOLICITUD_REMESA': info_extraida.get('solicitud_remesa', 'N/A'),
+            'DIAS_CONSUMO': info_extraida.get('dias_consumo', 'N/A'), 'FECHA_ENTREGA': info_extraida.get('fecha_entrega', 'N/A'),
+            'DIA': dia, 'RUTA': ruta, 'N°': int(fila[0]), 'MUNICIPIO': texto(1),
+            'COMEDOR/ESCUELA': texto(2), 'COBER': cobertura if cobertura is not None else 0,
+            'DIRECCIÓN': texto(4),
+        }
+    
+    def _crear_registro(self, fila, columnas_productos, dia, ruta, info_extraida):
+        """
+        🧾 Construye el registro completo de un comedor fila a fila (usado por la ingesta en streaming)
+        """
+        registro = self._crear_registro_base(fila, dia, ruta, info_extraida)
+        registro.update(self._mapear_productos(fila, columnas_productos))
+        return registro
+    
+    def _mapear_productos(self, fila, columnas_productos):
+        """
+        🥩 Mapea los productos de una fila según las columnas detectadas
+        """
+        productos = {}
+        for producto_tipo, nombre_columna in self.COLUMNAS_PRODUCTOS.items():
+            col = columnas_productos.get(producto_tipo)
+            valor = fila[col] if col is not None and col < len(fila) else None
+            productos[nombre_columna] = valor if valor is not None else 0
         return productos
     
     def _crear_dataframe_final(self, registros_consolidados):
         """
-        📊 Crea el DataFrame final con validación y limpieza de datos
+        📊 Crea el DataFrame final con validación y limpieza de datos a partir de registros fila a fila
+        (ingesta en streaming); produce los mismos tipos compactos que ConstructorRegistros
         """
         df_final = pd.DataFrame(registros_consolidados)
         
         # Limpiar y validar datos numéricos
-        df_final['COBER'] = pd.to_numeric(df_final['COBER'], errors='coerce').fillna(0).astype(int)
-        df_final['CARNE_DE_CERDO'] = pd.to_numeric(df_final['CARNE_DE_CERDO'], errors='coerce').fillna(0).astype(float)
-        df_final['CARNE_DE_RES'] = pd.to_numeric(df_final['CARNE_DE_RES'], errors='coerce').fillna(0).astype(float)
-        df_final['MUSLO_CONTRAMUSLO'] = pd.to_numeric(df_final['MUSLO_CONTRAMUSLO'], errors='coerce').fillna(0).astype(int)
-        df_final['POLLO_PESO'] = pd.to_numeric(df_final['POLLO_PESO'], errors='coerce').fillna(0).astype(float)
-        df_final['TILAPIA'] = pd.to_numeric(df_final['TILAPIA'], errors='coerce').fillna(0).astype(float)
-        
-        # Validar campos de texto
-        for col in ['PROGRAMA', 'EMPRESA', 'MODALIDAD', 'SOLICITUD_REMESA', 'DIAS_CONSUMO']:
-            df_final[col] = df_final[col].astype(str)
+        for col in ['COBER', 'CARNE_DE_CERDO', 'CARNE_DE_RES', 'MUSLO_CONTRAMUSLO', 'POLLO_PESO', 'TILAPIA']:
+            df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
         
-        return df_final
+        return compactar_tipos(df_final)
     
     def get_estadisticas_procesamiento(self, df_procesado):
         """
@@ -0,0 +1,251 @@
+"""
+🌊 EXCEL_STREAM.PY
+Ingesta en streaming de archivos Excel con openpyxl en modo solo lectura
+Recorre la hoja una única vez, fila por fila, y entrega los registros de
+comedores a medida que se encuentran, con memoria constante
+"""
+
+import math
+from collections import deque
+
+import pandas as pd
+from openpyxl import load_workbook
+from pandas._libs.parsers import STR_NA_VALUES
+
+from raw_sheet import RawSheet, TableIndex
+
+# Filas de la cabecera que se conservan para detectar el tipo de archivo (filas 1-30)
+FILAS_DETECCION_TIPO = 30
+# Filas de la cabecera necesarias para la información estructurada (filas 4, 8 y 9)
+FILAS_INFORMACION = 9
+# Ventana de búsqueda del encabezado de productos (igual que _detectar_columnas_productos)
+FILAS_VENTANA_ENCABEZADO = 10
+# Filas previas a la tabla usadas por la detección por contexto
+FILAS_CONTEXTO_PREVIO = 3
+
+
+def normalizar_celda(valor):
+    """
+    🧽 Normaliza un valor de openpyxl igual que pd.read_excel: vacíos y textos de NA por
+    defecto de pandas ("N/A", "NULL", "#N/A"...) a None y flotantes enteros a int
+    """
+    if valor is None or (isinstance(valor, str) and valor in STR_NA_VALUES):
+        return None
+    if isinstance(valor, float):
+        if math.isnan(valor):
+            return None
+        if valor.is_integer():
+            return int(valor)
+    return valor
+
+
+class _TablaAbierta:
+    """
+    Estado de una tabla de comedores mientras se recorre la hoja
+    """
+
+    def __init__(self, ruta, ventana):
+        self.ruta = ruta
+        self.ventana = ventana            # Filas [inicio-3, inicio] para detectar productos
+        self.filas_encabezado = 1         # Filas de la ventana desde el inicio de la tabla
+        self.columnas_productos = None    # Se resuelve al completar la ventana
+        self.pendientes = []              # Filas recibidas antes de resolver los productos
+        self.leyendo = False              # True después de la primera fila de datos
+        self.cerrada = False
+        self.registros = deque()
+
+
+class ExcelStreamReader:
+    """
+    Lector en streaming: una sola pasada hacia adelante sobre las filas del libro.
+
+    Uso:
+        lector = ExcelStreamReader(processor)
+        for registro in lector.iterar_registros(archivo):
+            ...
+        lector.tipo_archivo, lector.info_extraida  # disponibles al terminar
+
+    Solo mantiene en memoria la cabecera (30 filas), una ventana de 3 filas previas
+    y las filas de las tablas cuyo encabezado de productos aún no se ha resuelto.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.tipo_archivo = "DESCONOCIDO"
+        self.info_extraida = None
+        self.filas_leidas = 0
+
+    @staticmethod
+    def _iterar_filas(archivo_excel):
+        """
+        📥 Generador de filas normalizadas usando openpyxl en modo solo lectura
+        """
+        if hasattr(archivo_excel, "seek"):
+            archivo_excel.seek(0)
+        libro = load_workbook(archivo_excel, read_only=True, data_only=True, keep_links=False)
+        try:
+            hoja = libro.worksheets[0]
+            for fila in hoja.iter_rows(values_only=True):
+                yield [normalizar_celda(valor) for valor in fila]
+        finally:
+            libro.close()
+
+    @classmethod
+    def hoja_muestra(cls, archivo_excel, num_filas=20):
+        """
+        🔎 RawSheet con las primeras `num_filas` filas del libro (para validarlo sin cargarlo entero)
+        """
+        filas = []
+        for fila in cls._iterar_filas(archivo_excel):
+            filas.append(fila)
+            if len(filas) >= num_filas:
+                break
+        return cls._hoja_desde_filas(filas, max((len(fila) for fila in filas), default=0))
+
+    @staticmethod
+    def _hoja_desde_filas(filas, ancho):
+        """
+        🧮 Crea una RawSheet pequeña a partir de unas pocas filas (rellenando hasta `ancho`)
+        """
+        filas_rellenas = [list(fila) + [None] * (ancho - len(fila)) for fila in filas]
+        return RawSheet(pd.DataFrame(filas_rellenas, columns=range(ancho)).astype(object))
+
+    @staticmethod
+    def _clasificar_fila(fila):
+        """
+        🔎 Calcula para una fila los mismos criterios que TableIndex sobre las columnas A/B/C
+        """
+        celda_a = fila[0] if len(fila) > 0 else None
+        celda_b = fila[1] if len(fila) > 1 else None
+        celda_c = fila[2] if len(fila) > 2 else None
+
+        texto_a = str(celda_a).strip() if celda_a is not None else ""
+        texto_b = str(celda_b).strip() if celda_b is not None else ""
+        mayus_a = texto_a.upper()
+        numerico_a = celda_a is not None and isinstance(celda_a, (int, float))
+
+        es_inicio = texto_a in TableIndex.MARCADORES_INICIO and texto_b not in ["nan", ""]
+        es_dato = (
+            numerico_a and math.isfinite(celda_a)
+            and celda_b is not None and celda_c is not None
+        )
+        es_total = not numerico_a and "TOTAL" in mayus_a
+        es_titulo = (
+            isinstance(celda_a, str) and texto_a != ""
+            and not any(excluido in mayus_a for excluido in TableIndex.EXCLUIR_TITULO)
+        )
+        return es_inicio, es_dato, es_total, es_titulo, texto_a
+
+    def _resolver_productos(self, tabla, ancho):
+        """
+        🥩 Detecta las columnas de productos de una tabla con la ventana ya completa
+        """
+        hoja_ventana = self._hoja_desde_filas(tabla.ventana, ancho)
+        fila_inicio = len(tabla.ventana) - tabla.filas_encabezado
+        tabla.columnas_productos, _ = self.processor._detectar_columnas_productos(hoja_ventana, fila_inicio)
+        tabla.ventana = None
+
+        pendientes, tabla.pendientes = tabla.pendientes, []
+        for fila, es_dato, es_total in pendientes:
+            self._avanzar_tabla(tabla, fila, es_dato, es_total)
+
+    def _avanzar_tabla(self, tabla, fila, es_dato, es_total):
+        """
+        ➡️ Aplica una fila a la máquina de estados de la tabla (misma regla que TableIndex)
+        """
+        if tabla.cerrada:
+            return
+        if tabla.columnas_productos is None:
+            tabla.pendientes.append((fila, es_dato, es_total))
+            return
+
+        if es_dato:
+            tabla.leyendo = True
+            tabla.registros.append(self.processor._crear_registro(
+                fila, tabla.columnas_productos, "DIA 1", tabla.ruta, self.info_extraida
+            ))
+        elif tabla.leyendo or es_total:
+            tabla.cerrada = True
+
+    def _asegurar_informacion(self, cabecera, ancho):
+        """
+        📋 Extrae la información estructurada en cuanto se han leído las filas 4, 8 y 9
+        """
+        if self.info_extraida is None:
+            hoja_cabecera = self._hoja_desde_filas(cabecera[:FILAS_INFORMACION], ancho)
+            self.info_extraida = self.processor.extractor.extraer_informacion_estructurada(hoja_cabecera)
+
+    def iterar_registros(self, archivo_excel):
+        """
+        🌊 Recorre el archivo en una sola pasada y entrega cada registro de comedor
+
+        Args:
+            archivo_excel: Ruta o archivo subido en Streamlit
+
+        Yields:
+            dict: Registro de comedor con la misma estructura que procesar_archivo_completo
+        """
+        cabecera = []
+        previas = deque(maxlen=FILAS_CONTEXTO_PREVIO)
+        tablas = deque()
+        ruta_actual = "RUTA GENERAL"
+        ultimo_titulo = None
+        ancho = 0
+        self.info_extraida = None
+        self.tipo_archivo = "DESCONOCIDO"
+        self.filas_leidas = 0
+
+        for fila in self._iterar_filas(archivo_excel):
+            # openpyxl puede entregar filas más largas con celdas vacías al final
+            while fila and fila[-1] is None:
+                fila.pop()
+            ancho = max(ancho, len(fila))
+            self.filas_leidas += 1
+
+            if len(cabecera) < FILAS_DETECCION_TIPO:
+                cabecera.append(fila)
+            if len(cabecera) >= FILAS_INFORMACION:
+                self._asegurar_informacion(cabecera, ancho)
+
+            es_inicio, es_dato, es_total, es_titulo, texto_a = self._clasificar_fila(fila)
+
+            # Las tablas abiertas reciben la fila antes de registrar una nueva tabla
+            for tabla in tablas:
+                if tabla.ventana is not None:
+                    tabla.ventana.append(fila)
+                    tabla.filas_encabezado += 1
+                self._avanzar_tabla(tabla, fila, es_dato, es_total)
+                if tabla.ventana is not None and tabla.filas_encabezado >= FILAS_VENTANA_ENCABEZADO:
+                    self._asegurar_informacion(cabecera, ancho)
+                    self._resolver_productos(tabla, ancho)
+
+            if es_inicio:
+                if ultimo_titulo is not None:
+                    ruta_actual = ultimo_titulo
+                tabla = _TablaAbierta(ruta_actual, list(previas) + [fila])
+                tablas.append(tabla)
+
+            if es_titulo:
+                ultimo_titulo = texto_a
+            previas.append(fila)
+
+            # Entregar en orden: solo la tabla más antigua emite; las demás acumulan
+            while tablas:
+                cabeza = tablas[0]
+                while cabeza.registros:
+                    yield cabeza.registros.popleft()
+                if not cabeza.cerrada:
+                    break
+                tablas.popleft()
+
+        # Fin del archivo: resolver lo pendiente y vaciar las tablas abiertas
+        self._asegurar_informacion(cabecera, max(ancho, 1))
+        for tabla in tablas:
+            if tabla.ventana is not None:
+                self._resolver_productos(tabla, ancho)
+        for tabla in tablas:
+            while tabla.registros:
+                yield tabla.registros.popleft()
+
+        hoja_cabecera = self._hoja_desde_filas(cabecera, max(ancho, 1))
+        self.tipo_archivo, _ = self.processor.extractor.detectar_tipo_archivo(hoja_cabecera)
@@ -3,59 +3,100 @@ from reportlab.platypus import SimpleDocTemplate, PageBreak
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 from io import BytesIO
-import zipfile
+import os
+import random
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
-from template import PlantillaGuiaTransporte
+from template import PlantillaGuiaTransporte, FIRMANTE_APROBACION
+from canvas_renderer import RenderizadorCanvas, DisposicionNoSoportada
+from bundle_writer import EscritorZip
+from route_groups import agrupar_rutas, totales_comedores, paginas_necesarias
+from report_summary import resumir
+from render_cache import semilla_desde_clave
+from process_pool import crear_pool, cerrar_pool
+from logger_config import logger
+
+# Tiempo máximo de renderizado por guía en el pool de procesos (segundos)
+TIMEOUT_POR_GUIA = 60
+
+# Motores de render: "platypus" (SimpleDocTemplate) o "canvas" (RenderizadorCanvas)
+MOTORES = ("platypus", "canvas")
+
+# Generador propio de cada proceso del pool (se crea una vez por proceso)
+_GENERADOR_TRABAJADOR = None
+
+
+def _inicializar_trabajador():
+    """
+    Siembra el generador aleatorio de cada proceso del pool con entropía propia, para que
+    las guías sin semilla no repitan números de guía, lotes ni temperaturas
+    """
+    random.seed()
+
+
+def _renderizar_guia(ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info, motor="platypus", semilla=None):
+    """
+    Renderiza una guía en un proceso del pool y devuelve (bytes del PDF, degradada)
+    """
+    global _GENERADOR_TRABAJADOR
+    if _GENERADOR_TRABAJADOR is None or _GENERADOR_TRABAJADOR.motor != motor:
+        _GENERADOR_TRABAJADOR = GeneradorPDFsRutas(motor=motor)
+    pdf_buffer = _GENERADOR_TRABAJADOR.generar_pdf_individual(
+        ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info, semilla
+    )
+    return pdf_buffer.getvalue(), _GENERADOR_TRABAJADOR.ultima_degradada
+
 
 class GeneradorPDFsRutas:
-    def __init__(self):
+    # Versión del diseño de las guías: subirla invalida las guías guardadas en RenderCache
+    VERSION = "1"
+    
+    def __init__(self, motor="platypus", cache=None, motor_por_comedor="canvas"):
+        if motor not in MOTORES:
+            raise ValueError(f"Motor de render desconocido: {motor}")
+        if motor_por_comedor not in MOTORES:
+            raise ValueError(f"Motor de render desconocido: {motor_por_comedor}")
+        self.motor = motor
+        # Motor de las guías por comedor; "canvas" (por defecto) arma el molde de encabezado
+        # y pie una vez por ruta y cada comedor solo agrega su título y su tabla. Si el canvas
+        # falla, esa guía se renderiza con SimpleDocTemplate
+        self.motor_por_comedor = motor_por_comedor
         self.plantilla = PlantillaGuiaTransporte()
+        self.renderizador = RenderizadorCanvas(self.plantilla)
+        # Caché opcional de guías renderizadas (RenderCache); sin ella todo se renderiza siempre
+        self.cache = cache
+        self.guias_reutilizadas = 0
+        # Guías que excedieron el tiempo límite en el pool y quedaron fuera del ZIP
+        self.guias_fallidas = []
+        # Si la última guía salió del método de fallback (sin paginación correcta)
+        self.ultima_degradada = False
         
     def procesar_datos_para_pdf(self, df_procesado):
         """
         Convierte los datos procesados del formato de comedores al formato necesario para las guías de transporte
-        """
-        # Agrupar por ruta
-        rutas_data = {}
-        
-        for _, row in df_procesado.iterrows():
-            ruta = row['RUTA']
-            if ruta not in rutas_data:
-                rutas_data[ruta] = {
-                    'comedores': [],
-                    'programa_info': {
-                        'programa': row['PROGRAMA'],
-                        'fecha_entrega': row['FECHA_ENTREGA'],
-                        'empresa': row.get('EMPRESA', 'CONSORCIO ALIMENTANDO A CALI 2025'),
-                        'modalidad': row.get('MODALIDAD', 'CP AM CALI'),
-                        'solicitud_remesa': row.get('SOLICITUD_REMESA', 'MENUS PARA 10 DIAS'),
-                        'dias_consumo': row.get('DIAS_CONSUMO', f"{row['FECHA_ENTREGA']} - {row['FECHA_ENTREGA']}"),
-                        'dia': row['DIA']
-                    }
-                }
-            
-            # Incluir muslo_contramuslo en los datos del comedor
-            comedor_data = {
-                'MUNICIPIO': row['MUNICIPIO'],
-                'DEPARTAMENTO': 'VALLE',  # Valor por defecto
-                'COMEDOR/ESCUELA': row['COMEDOR/ESCUELA'],
-                'COBER': row['COBER'],
-                'DIRECCIÓN': row['DIRECCIÓN'],
-                'CARNE_DE_RES': row.get('CARNE_DE_RES', 0),        # Puede ser 0
-                'CARNE_DE_CERDO': row['CARNE_DE_CERDO'],           # Siempre presente
-                'MUSLO_CONTRAMUSLO': row.get('MUSLO_CONTRAMUSLO', 0),  # ⭐ NUEVA LÍNEA
-                'POLLO_PESO': row.get('POLLO_PESO', 0),             # Puede ser 0
-                'TILAPIA': row.get('TILAPIA', 0)                    # ⭐ NUEVA LÍNEA TILAPIA
-            }
-            
-            rutas_data[ruta]['comedores'].append(comedor_data)
         
-        return rutas_data
+        Un solo groupby por ruta (agrupar_rutas) arma los comedores, la información del
+        programa y los totales de cada ruta; el reporte y la interfaz usan el mismo resultado.
+        """
+        return agrupar_rutas(df_procesado)
     
-    def generar_pdf_individual(self, ruta_nombre, datos_ruta, elaborado_por=None, dictamen=None, lotes_personalizados=None, transporte_info=None):
+    def generar_pdf_individual(self, ruta_nombre, datos_ruta, elaborado_por=None, dictamen=None, lotes_personalizados=None, transporte_info=None, semilla=None, motor=None):
         """
         ⭐ MÉTODO CORREGIDO: Ahora USA la paginación de 4 filas por página
+        
+        Con semilla, los lotes, temperaturas y número de guía generados son reproducibles.
+        motor reemplaza el motor del generador solo para esta guía. Si se termina usando el
+        método de fallback, ultima_degradada queda en True (esa guía no se guarda en la caché).
         """
+        if semilla is not None:
+            self.plantilla.sembrar(semilla)
+            try:
+                return self.generar_pdf_individual(ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info, motor=motor)
+            finally:
+                self.plantilla.sembrar(None)
+        
+        self.ultima_degradada = False
         buffer = BytesIO()
         
         # Configurar datos del programa
@@ -63,33 +104,49 @@ class GeneradorPDFsRutas:
         if dictamen:
             programa_info['dictamen'] = dictamen
         
+        # Bloque ya normalizado al agrupar las rutas (las guías armadas a mano traen solo la lista)
+        datos_comedores = datos_ruta.get('bloque') or datos_ruta['comedores']
+        
         # Extraer conductor y placa si existen para esta ruta
         conductor = transporte_info.get('conductor') if transporte_info else None
         placa = transporte_info.get('placa') if transporte_info else None
         
-        # ⭐ CLAVE: Usar el método de paginación correcto
-        nombre_archivo_temporal = f"temp_guia_{ruta_nombre}.pdf"
+        if (motor or self.motor) == "canvas":
+            try:
+                # Motor rápido: dibuja directo en el canvas con el diseño fijo de la guía
+                self.renderizador.generar_pdf(
+                    datos_programa=programa_info,
+                    datos_comedores=datos_comedores,
+                    lotes_personalizados=lotes_personalizados,
+                    elaborado_por=elaborado_por or "____________________",
+                    nombre_archivo=f"guia_{ruta_nombre}.pdf",
+                    conductor=conductor,
+                    placa=placa,
+                    buffer=buffer
+                )
+                buffer.seek(0)
+                return buffer
+            except DisposicionNoSoportada as e:
+                print(f"Guía {ruta_nombre} fuera del diseño fijo ({e}); se renderiza con SimpleDocTemplate")
+                buffer = BytesIO()
+            except Exception as e:
+                # El molde usa estado interno del canvas de ReportLab: ante cualquier fallo, platypus
+                logger.warning(f"Guía {ruta_nombre}: falló el render en canvas ({e!r}); se renderiza con SimpleDocTemplate")
+                buffer = BytesIO()
         
         try:
-            # ⭐ LLAMAR AL MÉTODO QUE SÍ PAGINA CORRECTAMENTE
+            # ⭐ LLAMAR AL MÉTODO QUE SÍ PAGINA CORRECTAMENTE (renderiza directo en memoria)
             self.plantilla.generar_pdf_con_paginacion(
                 datos_programa=programa_info,
-                datos_comedores=datos_ruta['comedores'],
+                datos_comedores=datos_comedores,
                 lotes_personalizados=lotes_personalizados,
                 elaborado_por=elaborado_por or "____________________",
-                nombre_archivo=nombre_archivo_temporal,
+                nombre_archivo=f"guia_{ruta_nombre}.pdf",
                 conductor=conductor, # <-- NUEVO
-                placa=placa          # <-- NUEVO
+                placa=placa,         # <-- NUEVO
+                buffer=buffer
             )
             
-            # Leer el archivo temporal y escribirlo al buffer
-            import os
-            if os.path.exists(nombre_archivo_temporal):
-                with open(nombre_archivo_temporal, 'rb') as temp_file:
-                    buffer.write(temp_file.read())
-                # Limpiar archivo temporal
-                os.remove(nombre_archivo_temporal)
-            
             buffer.seek(0)
             return buffer
             
@@ -97,6 +154,7 @@ class GeneradorPDFsRutas:
             print(f"ADVERTENCIA: Falló la generación con paginación, usando método de fallback. Error: {e}")
             import traceback
             traceback.print_exc() # Imprime el traceback completo para depuración
+            self.ultima_degradada = True
             return self._generar_pdf_fallback(ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados)
     
     def _generar_pdf_fallback(self, ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados):
@@ -133,7 +191,7 @@ class GeneradorPDFsRutas:
         elementos.extend(self.plantilla.crear_seccion_ruta(ruta_nombre))
         
         # 4. Tabla principal de comedores (⚠️ AQUÍ NO SE PAGINA CORRECTAMENTE)
-        elementos.append(self.plantilla.crear_tabla_comedores(datos_ruta['comedores'], lotes_personalizados))
+        elementos.append(self.plantilla.crear_tabla_comedores(datos_ruta.get('bloque') or datos_ruta['comedores'], lotes_personalizados))
         
         
         elaborado_val = elaborado_por if elaborado_por is not None else "____________________"
@@ -173,50 +231,228 @@ class GeneradorPDFsRutas:
         
         return self.generar_pdf_individual(ruta_nombre, datos_comedor, elaborado_por, dictamen)
     
-    def generar_todos_los_pdfs(self, df_procesado, modo="por_ruta", elaborado_por=None, dictamen=None, lotes_personalizados=None, transporte_por_ruta=None):
+    def generar_todos_los_pdfs(self, df_procesado, modo="por_ruta", elaborado_por=None, dictamen=None, lotes_personalizados=None, transporte_por_ruta=None, paralelo=False, max_workers=None, timeout=TIMEOUT_POR_GUIA, rutas_data=None):
         """
         Genera PDFs para todas las rutas y los comprime en un ZIP
         modo: "por_ruta" o "por_comedor"
         ⭐ AHORA CON PAGINACIÓN CORRECTA DE 4 FILAS
+        
+        Con paralelo=True las guías se reparten en un pool de procesos (max_workers, por
+        defecto todos los núcleos) con un tiempo límite por guía; el ZIP conserva siempre
+        el mismo orden. Con una sola guía se renderiza en serie. Las guías que exceden el
+        tiempo límite quedan fuera del ZIP y se listan en guias_fallidas.
+        
+        Cada PDF se agrega al ZIP apenas se renderiza (EscritorZip) y se libera; el ZIP
+        se devuelve como archivo temporal posicionado al inicio (en memoria mientras es
+        pequeño, en disco si crece).
+        
+        rutas_data permite pasar la agrupación ya calculada con procesar_datos_para_pdf.
+        
+        En modo "por_comedor" las guías se dibujan con motor_por_comedor (con "canvas" el
+        encabezado y el pie se arman una vez por ruta y cada comedor solo paga su título y su tabla).
+        
+        Con caché (RenderCache) cada guía se identifica por una huella de sus datos y
+        parámetros de render: solo se renderizan las guías que cambiaron, con semilla
+        derivada de la huella, y las demás se copian de la caché al ZIP
+        (guias_reutilizadas cuenta cuántas). Las guías que salen del método de fallback
+        van al ZIP pero no a la caché, para que el siguiente lote vuelva a intentarlas.
         """
-        rutas_data = self.procesar_datos_para_pdf(df_procesado)
-        zip_buffer = BytesIO()
-        total_pdfs = 0
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for ruta_nombre, datos_ruta in rutas_data.items():
-                # Obtener info de transporte para esta ruta específica
-                transporte_info = transporte_por_ruta.get(ruta_nombre, {}) if transporte_por_ruta else {}
-                
-                if modo == "por_comedor":
-                    for i, comedor in enumerate(datos_ruta['comedores'], 1):
-                        datos_comedor_individual = {
-                            'comedores': [comedor],
-                            'programa_info': datos_ruta['programa_info'].copy()
-                        }
-                        pdf_buffer = self.generar_pdf_individual(ruta_nombre, datos_comedor_individual, elaborado_por, dictamen, lotes_personalizados, transporte_info)
-                        nombre_comedor = self.limpiar_nombre_archivo(comedor['COMEDOR/ESCUELA'])
-                        numero_comedor = str(i).zfill(2)
-                        ruta_limpia = self.limpiar_nombre_archivo(ruta_nombre)
-                        nombre_pdf = f"Guia_{ruta_limpia}_{numero_comedor}_{nombre_comedor}.pdf"
-                        zip_file.writestr(nombre_pdf, pdf_buffer.getvalue())
-                        pdf_buffer.close()
-                        total_pdfs += 1
+        if rutas_data is None:
+            rutas_data = self.procesar_datos_para_pdf(df_procesado)
+        trabajos = self._planificar_guias(rutas_data, modo, transporte_por_ruta)
+        
+        # Flowables estáticos, firmas y moldes de ruta: se construyen una vez para todo el lote
+        self.plantilla.contexto.reiniciar()
+        self.renderizador.reiniciar()
+        motor = self._motor_modo(modo)
+        
+        if self.cache is not None:
+            firmante = elaborado_por or "____________________"
+            version_firmas = self._version_firmas(firmante)
+            claves = [
+                self._clave_guia(trabajo, firmante, dictamen, lotes_personalizados, version_firmas, motor)
+                for trabajo in trabajos
+            ]
+        else:
+            claves = [None] * len(trabajos)
+        # Posiciones de las guías que no están en la caché (todas si no hay caché)
+        pendientes = [
+            i for i, clave in enumerate(claves)
+            if clave is None or not self.cache.contiene(clave)
+        ]
+        semillas = [semilla_desde_clave(claves[i]) if claves[i] else None for i in pendientes]
+        self.guias_reutilizadas = len(trabajos) - len(pendientes)
+        self.guias_fallidas = []
+        
+        trabajos_pendientes = [trabajos[i] for i in pendientes]
+        if paralelo and len(trabajos_pendientes) > 1:
+            pdfs = self._renderizar_en_pool(trabajos_pendientes, elaborado_por, dictamen, lotes_personalizados, max_workers, timeout, semillas, motor)
+        else:
+            pdfs = (
+                self._renderizar_guia_serie(trabajo, elaborado_por, dictamen, lotes_personalizados, semilla, motor)
+                for trabajo, semilla in zip(trabajos_pendientes, semillas)
+            )
+        renderizados = zip(pendientes, pdfs)
+        siguiente = next(renderizados, None)
+        
+        with EscritorZip() as paquete:
+            for i, (trabajo, clave) in enumerate(zip(trabajos, claves)):
+                if siguiente is not None and siguiente[0] == i:
+                    renderizado = siguiente[1]
+                    siguiente = next(renderizados, None)
+                    if renderizado is None:
+                        # Tiempo límite agotado en el pool: la guía no se incluye
+                        self.guias_fallidas.append(trabajo[0])
+                        continue
+                    pdf_bytes, degradada = renderizado
+                    if clave is not None and not degradada:
+                        self.cache.guardar(clave, pdf_bytes)
                 else:
-                    # ⭐ MODO POR RUTA CON PAGINACIÓN CORRECTA
-                    pdf_buffer = self.generar_pdf_individual(ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info)
-                    ruta_limpia = self.limpiar_nombre_archivo(ruta_nombre)
-                    if datos_ruta['comedores']:
-                        primer_comedor = self.limpiar_nombre_archivo(datos_ruta['comedores'][0]['COMEDOR/ESCUELA'])
-                        nombre_pdf = f"Guia_{ruta_limpia}_{primer_comedor}.pdf"
-                    else:
-                        nombre_pdf = f"Guia_{ruta_limpia}.pdf"
-                    zip_file.writestr(nombre_pdf, pdf_buffer.getvalue())
-                    pdf_buffer.close()
-                    total_pdfs += 1
-                    
-        zip_buffer.seek(0)
-        return zip_buffer, total_pdfs
+                    pdf_bytes = self.cache.obtener(clave)
+                    if pdf_bytes is None:
+                        # Desalojada entre la consulta y la lectura: se renderiza aquí mismo
+                        self.guias_reutilizadas -= 1
+                        pdf_bytes, degradada = self._renderizar_guia_serie(trabajo, elaborado_por, dictamen, lotes_personalizados, semilla_desde_clave(clave), motor)
+                        if not degradada:
+                            self.cache.guardar(clave, pdf_bytes)
+                paquete.agregar(trabajo[0], pdf_bytes)
+        
+        return paquete.archivo, paquete.num_entradas
+    
+    def _motor_modo(self, modo):
+        """Motor de render de las guías de un modo ("por_ruta" o "por_comedor")"""
+        return self.motor_por_comedor if modo == "por_comedor" else self.motor
+    
+    def _version_firmas(self, firmante):
+        """
+        Versión de las imágenes de firma de quien elabora y de quien aprueba
+        """
+        firmas = self.plantilla.contexto.firmas
+        return [firmas.version(firmante), firmas.version(FIRMANTE_APROBACION)]
+    
+    def parametros_lote(self, modo="por_ruta", elaborado_por=None, dictamen=None, lotes_personalizados=None, transporte_por_ruta=None):
+        """
+        Parámetros que, junto con los datos, determinan el ZIP de generar_todos_los_pdfs
+        
+        Identifican el ZIP completo (AlmacenArtefactos): versión del diseño, motor, firmas
+        y fecha del día, como la huella de cada guía en _clave_guia.
+        """
+        firmante = elaborado_por or "____________________"
+        return {
+            'version': self.VERSION,
+            'motor': self._motor_modo(modo),
+            'modo': modo,
+            'elaborado_por': firmante,
+            'dictamen': dictamen,
+            'lotes': lotes_personalizados or {},
+            'transporte': transporte_por_ruta or {},
+            'firmas': self._version_firmas(firmante),
+            'fecha': datetime.now().strftime('%Y-%m-%d')
+        }
+    
+    def _clave_guia(self, trabajo, firmante, dictamen, lotes_personalizados, version_firmas, motor):
+        """
+        Huella de una guía para la caché: todo lo que cambia su PDF
+        
+        Incluye la fecha del día (número de guía y fecha de elaboración) y la versión de las
+        imágenes de firma. La hora del título no forma parte de la huella: una guía reutilizada
+        ese día conserva la hora de su primer render.
+        """
+        _, ruta_nombre, datos_ruta, transporte_info = trabajo
+        return self.cache.clave({
+            'motor': motor,
+            'ruta': ruta_nombre,
+            'comedores': datos_ruta['comedores'],
+            'programa_info': datos_ruta['programa_info'],
+            'elaborado_por': firmante,
+            'dictamen': dictamen,
+            'lotes': lotes_personalizados or {},
+            'conductor': (transporte_info or {}).get('conductor'),
+            'placa': (transporte_info or {}).get('placa'),
+            'firmas': version_firmas,
+            'fecha': datetime.now().strftime('%Y-%m-%d')
+        })
+    
+    def _planificar_guias(self, rutas_data, modo, transporte_por_ruta):
+        """
+        Lista ordenada de guías a renderizar: (nombre_pdf, ruta_nombre, datos_ruta, transporte_info)
+        """
+        trabajos = []
+        for ruta_nombre, datos_ruta in rutas_data.items():
+            # Obtener info de transporte para esta ruta específica
+            transporte_info = transporte_por_ruta.get(ruta_nombre, {}) if transporte_por_ruta else {}
+            ruta_limpia = self.limpiar_nombre_archivo(ruta_nombre)
+            
+            if modo == "por_comedor":
+                bloque = datos_ruta.get('bloque')
+                for i, comedor in enumerate(datos_ruta['comedores'], 1):
+                    datos_comedor_individual = {
+                        'comedores': [comedor],
+                        'programa_info': datos_ruta['programa_info'].copy()
+                    }
+                    if bloque is not None:
+                        datos_comedor_individual['bloque'] = bloque[i - 1:i]
+                    nombre_comedor = self.limpiar_nombre_archivo(comedor['COMEDOR/ESCUELA'])
+                    numero_comedor = str(i).zfill(2)
+                    nombre_pdf = f"Guia_{ruta_limpia}_{numero_comedor}_{nombre_comedor}.pdf"
+                    trabajos.append((nombre_pdf, ruta_nombre, datos_comedor_individual, transporte_info))
+            else:
+                # ⭐ MODO POR RUTA CON PAGINACIÓN CORRECTA
+                if datos_ruta['comedores']:
+                    primer_comedor = self.limpiar_nombre_archivo(datos_ruta['comedores'][0]['COMEDOR/ESCUELA'])
+                    nombre_pdf = f"Guia_{ruta_limpia}_{primer_comedor}.pdf"
+                else:
+                    nombre_pdf = f"Guia_{ruta_limpia}.pdf"
+                trabajos.append((nombre_pdf, ruta_nombre, datos_ruta, transporte_info))
+        return trabajos
+    
+    def _renderizar_guia_serie(self, trabajo, elaborado_por, dictamen, lotes_personalizados, semilla=None, motor=None):
+        """
+        Renderiza una guía en el proceso actual y devuelve (bytes del PDF, degradada)
+        """
+        _, ruta_nombre, datos_ruta, transporte_info = trabajo
+        pdf_buffer = self.generar_pdf_individual(ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info, semilla, motor)
+        pdf_bytes = pdf_buffer.getvalue()
+        pdf_buffer.close()
+        return pdf_bytes, self.ultima_degradada
+    
+    def _renderizar_en_pool(self, trabajos, elaborado_por, dictamen, lotes_personalizados, max_workers, timeout, semillas=None, motor=None):
+        """
+        Renderiza las guías en un ProcessPoolExecutor y las entrega en el orden de `trabajos`
+        
+        Una guía que excede el tiempo límite se entrega como None (volver a renderizarla en
+        serie la colgaría de nuevo, esta vez en el proceso de la interfaz) y al terminar se
+        matan los procesos que siguen ocupados. Una guía cuyo proceso falla se vuelve a
+        renderizar en serie.
+        """
+        semillas = semillas or [None] * len(trabajos)
+        motor = motor or self.motor
+        num_workers = min(len(trabajos), max_workers or os.cpu_count() or 1)
+        inicio = time.perf_counter()
+        pool = crear_pool(num_workers, initializer=_inicializar_trabajador)
+        abandonado = False
+        try:
+            futuros = [
+                pool.submit(_renderizar_guia, ruta_nombre, datos_ruta, elaborado_por, dictamen, lotes_personalizados, transporte_info, motor, semilla)
+                for (_, ruta_nombre, datos_ruta, transporte_info), semilla in zip(trabajos, semillas)
+            ]
+            for posicion, (trabajo, futuro, semilla) in enumerate(zip(trabajos, futuros, semillas)):
+                espera = None
+                if timeout:
+                    # La guía en la posición p empieza, como muy tarde, tras p // num_workers tandas
+                    espera = max(0.0, inicio + (posicion // num_workers + 1) * timeout - time.perf_counter())
+                try:
+                    yield futuro.result(timeout=espera)
+                except FuturesTimeoutError:
+                    abandonado = True
+                    logger.error(f"Guía {trabajo[0]} excedió {timeout} s en el pool; queda fuera del ZIP")
+                    yield None
+                except Exception as e:
+                    logger.warning(f"Guía {trabajo[0]} falló en el pool ({e}); se renderiza en serie")
+                    yield self._renderizar_guia_serie(trabajo, elaborado_por, dictamen, lotes_personalizados, semilla, motor)
+        finally:
+            # Si alguna guía se abandonó, no esperar al proceso colgado: se termina
+            cerrar_pool(pool, abandonado)
     
     def limpiar_nombre_archivo(self, nombre):
         """
@@ -246,24 +482,19 @@ class GeneradorPDFsRutas:
         reporte = []
         
         for ruta_nombre, datos_ruta in rutas_data.items():
-            comedores_count = len(datos_ruta['comedores'])
-            total_cobertura = sum(c['COBER'] for c in datos_ruta['comedores'])
-            total_cerdo = sum(c['CARNE_DE_CERDO'] for c in datos_ruta['comedores'])
-            total_res = sum(c.get('CARNE_DE_RES', 0) for c in datos_ruta['comedores'])
-            total_muslo_contramuslo = sum(c.get('MUSLO_CONTRAMUSLO', 0) for c in datos_ruta['comedores'])
-            total_pollo = sum(c.get('POLLO_PESO', 0) for c in datos_ruta['comedores'])
-            total_tilapia = sum(c.get('TILAPIA', 0) for c in datos_ruta['comedores'])
+            # Totales calculados en la agrupación (o sobre la marcha si el bloque se armó a mano)
+            totales = datos_ruta.get('totales') or totales_comedores(datos_ruta['comedores'])
             
             reporte.append({
                 'Ruta': ruta_nombre,
-                'Comedores': comedores_count,
-                'Paginas_PDF': self._calcular_paginas_necesarias(comedores_count),  # ⭐ NUEVA COLUMNA
-                'Total_Beneficiarios': total_cobertura,
-                'Total_Res_kg': total_res,
-                'Total_Cerdo_kg': total_cerdo,
-                'Total_Muslo_Contramuslo_und': total_muslo_contramuslo,
-                'Total_Pollo_kg': total_pollo,
-                'Total_Tilapia_kg': total_tilapia,
+                'Comedores': totales['COMEDORES'],
+                'Paginas_PDF': self._calcular_paginas_necesarias(totales['COMEDORES']),  # ⭐ NUEVA COLUMNA
+                'Total_Beneficiarios': totales['COBER'],
+                'Total_Res_kg': totales['CARNE_DE_RES'],
+                'Total_Cerdo_kg': totales['CARNE_DE_CERDO'],
+                'Total_Muslo_Contramuslo_und': totales['MUSLO_CONTRAMUSLO'],
+                'Total_Pollo_kg': totales['POLLO_PESO'],
+                'Total_Tilapia_kg': totales['TILAPIA'],
                 'Empresa': datos_ruta['programa_info']['empresa'],
                 'Solicitud_Remesa': datos_ruta['programa_info']['solicitud_remesa'],
                 'Dias_Consumo': datos_ruta['programa_info']['dias_consumo'],
@@ -277,8 +508,7 @@ class GeneradorPDFsRutas:
         ⭐ NUEVA FUNCIÓN: Calcula cuántas páginas se necesitan para N comedores
         Con regla de 4 filas por página
         """
-        import math
-        return math.ceil(num_comedores / 4)
+        return paginas_necesarias(num_comedores)
 
 # Funciones de integración con Streamlit
 
@@ -308,16 +538,19 @@ def integrar_generador_pdf_streamlit():
         st.warning("⚠️ **DataFrame procesado con versión anterior detectado**")
         st.info("🔄 **Solución**: Vuelve a cargar y procesar tu archivo Excel para obtener todos los datos dinámicos.")
     
+    # Agrupación por ruta compartida por la paginación, la selección, los PDFs y el reporte
+    generador = GeneradorPDFsRutas()
+    rutas_data = generador.procesar_datos_para_pdf(df_procesado)
+    
     # ⭐ MOSTRAR INFO DE PAGINACIÓN
     st.subheader("📊 Información de Paginación")
-    rutas_disponibles = df_procesado['RUTA'].unique() if 'RUTA' in df_procesado.columns else []
+    rutas_disponibles = list(rutas_data)
     
     if len(rutas_disponibles) > 0:
-        for ruta in rutas_disponibles:
-            comedores_en_ruta = len(df_procesado[df_procesado['RUTA'] == ruta])
-            import math
-            paginas_necesarias = math.ceil(comedores_en_ruta / 4)
-            st.write(f"**{ruta}**: {comedores_en_ruta} comedores → **{paginas_necesarias} páginas** (4 filas/página)")
+        for ruta, datos_ruta in rutas_data.items():
+            comedores_en_ruta = datos_ruta['totales']['COMEDORES']
+            paginas = paginas_necesarias(comedores_en_ruta)
+            st.write(f"**{ruta}**: {comedores_en_ruta} comedores → **{paginas} páginas** (4 filas/página)")
     
     # Mostrar información de la empresa
     st.subheader("🏢 Información de la Empresa")
@@ -331,25 +564,22 @@ def integrar_generador_pdf_streamlit():
     st.subheader("📊 Productos incluidos en el PDF")
     col1, col2, col3, col4, col5 = st.columns(5)
     
+    totales = (st.session_state.get('resumen_reporte') or resumir(df_procesado)).totales
+    
     with col1:
-        total_res = df_procesado['CARNE_DE_RES'].sum() if 'CARNE_DE_RES' in df_procesado.columns else 0
-        st.metric("🐄 Carne de Res", f"{total_res:.1f} kg")
+        st.metric("🐄 Carne de Res", f"{totales['CARNE_DE_RES']:.1f} kg")
     
     with col2:
-        total_cerdo = df_procesado['CARNE_DE_CERDO'].sum() if 'CARNE_DE_CERDO' in df_procesado.columns else 0
-        st.metric("🐷 Carne de Cerdo", f"{total_cerdo:.1f} kg")
+        st.metric("🐷 Carne de Cerdo", f"{totales['CARNE_DE_CERDO']:.1f} kg")
     
     with col3:
-        total_muslo = df_procesado['MUSLO_CONTRAMUSLO'].sum() if 'MUSLO_CONTRAMUSLO' in df_procesado.columns else 0
-        st.metric("🍗 Muslo/Contramuslo", f"{total_muslo:,} und")
+        st.metric("🍗 Muslo/Contramuslo", f"{totales['MUSLO_CONTRAMUSLO']:,} und")
     
     with col4:
-        total_pollo = df_procesado['POLLO_PESO'].sum() if 'POLLO_PESO' in df_procesado.columns else 0
-        st.metric("🐔 Pechuga Pollo", f"{total_pollo:.1f} kg")
+        st.metric("🐔 Pechuga Pollo", f"{totales['POLLO_PESO']:.1f} kg")
         
     with col5:
-        total_tilapia = df_procesado['TILAPIA'].sum() if 'TILAPIA' in df_procesado.columns else 0
-        st.metric("🐟 Tilapia", f"{total_tilapia:.1f} kg")
+        st.metric("🐟 Tilapia", f"{totales['TILAPIA']:.1f} kg")
     
     # Mostrar datos dinámicos
     st.subheader("📋 Información Dinámica del Archivo")
@@ -384,8 +614,7 @@ def integrar_generador_pdf_streamlit():
         
         # Si se selecciona una ruta, mostrar opciones de comedor
         if generar_individual != "Seleccionar ruta...":
-            df_ruta = df_procesado[df_procesado['RUTA'] == generar_individual]
-            comedores_ruta = df_ruta['COMEDOR/ESCUELA'].tolist()
+            comedores_ruta = [c['COMEDOR/ESCUELA'] for c in rutas_data[generar_individual]['comedores']]
             
             tipo_pdf = st.radio(
                 "Tipo de PDF:",
@@ -418,13 +647,13 @@ def integrar_generador_pdf_streamlit():
     if generar_individual != "Seleccionar ruta...":
         if st.button(f"📄 Generar PDF con paginación corregida"):
             with st.spinner("Generando PDF con paginación de 4 filas por página..."):
-                generador = GeneradorPDFsRutas()
-                rutas_data = generador.procesar_datos_para_pdf(df_procesado)
-                
                 if generar_individual in rutas_data:
                     if comedor_seleccionado:
                         # PDF para comedor específico
-                        comedor_data = df_ruta[df_ruta['COMEDOR/ESCUELA'] == comedor_seleccionado].iloc[0].to_dict()
+                        comedor_data = next(
+                            c for c in rutas_data[generar_individual]['comedores']
+                            if c['COMEDOR/ESCUELA'] == comedor_seleccionado
+                        )
                         datos_comedor = {
                             'comedores': [comedor_data],
                             'programa_info': rutas_data[generar_individual]['programa_info']
@@ -459,20 +688,17 @@ def integrar_generador_pdf_streamlit():
                     )
                     
                     # Mostrar confirmación con info de paginación
-                    num_comedores = len(rutas_data[generar_individual]['comedores']) if not comedor_seleccionado else 1
-                    import math
-                    paginas = math.ceil(num_comedores / 4)
+                    num_comedores = rutas_data[generar_individual]['totales']['COMEDORES'] if not comedor_seleccionado else 1
+                    paginas = paginas_necesarias(num_comedores)
                     st.success(f"✅ PDF generado con **{paginas} páginas** para {num_comedores} comedores (4 filas/página)")
     
     # Generar todos los PDFs
     if generar_todos:
         with st.spinner("🔄 Generando PDFs con paginación correcta de 4 filas..."):
-            generador = GeneradorPDFsRutas()
-            
             # Determinar modo basado en selección
             modo = "por_comedor" if modo_masivo == "🏪 Un PDF por comedor" else "por_ruta"
             
-            zip_buffer, num_pdfs = generador.generar_todos_los_pdfs(df_procesado, modo=modo)
+            zip_buffer, num_pdfs = generador.generar_todos_los_pdfs(df_procesado, modo=modo, paralelo=True, rutas_data=rutas_data)
             
             fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
             
@@ -485,15 +711,16 @@ def integrar_generador_pdf_streamlit():
             
             st.download_button(
                 label=f"📦 Descargar ZIP con {descripcion}",
-                data=zip_buffer,
+                data=zip_buffer.read(),  # download_button no admite SpooledTemporaryFile (sí bytes o archivos abiertos)
                 file_name=nombre_zip,
                 mime="application/zip"
             )
             
             st.success(f"✅ {num_pdfs} PDFs generados con **paginación correcta de 4 filas por página**")
+            if generador.guias_fallidas:
+                st.warning(f"⚠️ Guías fuera del ZIP por tiempo límite: {', '.join(generador.guias_fallidas)}")
             
             # Mostrar reporte con info de paginación
-            rutas_data = generador.procesar_datos_para_pdf(df_procesado)
             reporte = generador.crear_reporte_generacion(rutas_data)
             
             with st.expander("📋 Ver reporte detallado con info de paginación"):
@@ -0,0 +1,47 @@
+"""
+🏭 PROCESS_POOL.PY
+Pools de procesos para la ingesta de archivos y el render de guías
+Los procesos se crean con forkserver: hacer fork del servidor de Streamlit, que tiene
+varios hilos, puede heredar locks tomados (logging, tornado) y bloquearse
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def crear_pool(num_workers, initializer=None):
+    """
+    🏭 ProcessPoolExecutor de `num_workers` procesos creados con forkserver
+    """
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=initializer,
+    )
+
+
+def terminar_procesos(pool):
+    """
+    Termina los procesos de un pool con tareas abandonadas (colgadas) en vez de dejarlos vivos
+    """
+    terminar = getattr(pool, "terminate_workers", None)
+    if terminar is not None:
+        terminar()
+        return
+    for proceso in list((getattr(pool, "_processes", None) or {}).values()):
+        if proceso.is_alive():
+            proceso.terminate()
+
+
+def cerrar_pool(pool, abandonado):
+    """
+    🧹 Cierra el pool: espera a que termine o, si alguna tarea se abandonó, termina sus procesos
+
+    Las tareas abandonadas no se cancelan con cancel(): al terminar los procesos el pool
+    marca los futuros pendientes como rotos (en Python 3.11 fallaría con futuros ya cancelados).
+    """
+    if abandonado:
+        terminar_procesos(pool)
+        pool.shutdown(wait=False)
+    else:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,96 @@
+"""
+🏷️ PRODUCT_CLASSIFIER.PY
+Clasificador compilado de encabezados de productos
+Compila una sola vez el catálogo de patrones en una expresión regular combinada
+y memoriza la clasificación de cada encabezado distinto
+"""
+
+import re
+from functools import lru_cache
+
+# Encabezados distintos que se recuerdan por clasificador
+TAMANO_MEMO = 4096
+
+_PATRON_NO_PALABRA = re.compile(r'[^\w\s]')
+_PATRON_ESPACIOS = re.compile(r'\s+')
+
+
+def limpiar_texto(texto):
+    """
+    🧹 Mayúsculas, caracteres especiales a espacios y espacios normalizados
+    """
+    texto_limpio = _PATRON_NO_PALABRA.sub(' ', texto.upper())
+    return _PATRON_ESPACIOS.sub(' ', texto_limpio).strip()
+
+
+class ClasificadorProductos:
+    """
+    Clasificador de encabezados compilado a partir de ``patrones_productos``.
+
+    Todas las palabras clave, unidades y variaciones (ya limpiadas) forman una única
+    expresión regular; cada posición del texto reporta el término más largo que empieza
+    allí y los términos contenidos en él se deducen de una tabla precalculada, de modo
+    que un encabezado se recorre una sola vez. El resultado es idéntico a la puntuación
+    original: palabras clave + variaciones coincidentes, exigiendo palabra clave y unidad,
+    y en caso de empate gana el producto que aparece primero en el catálogo.
+    """
+
+    _compilados = {}
+
+    def __init__(self, patrones_productos, tamano_memo=TAMANO_MEMO):
+        self.productos = []
+        terminos = set()
+        for producto, config in patrones_productos.items():
+            palabras = tuple(config['palabras_clave'])
+            unidades = tuple(config['unidades_validas'])
+            variaciones = tuple(limpiar_texto(v) for v in config['variaciones_texto'])
+            self.productos.append((producto, palabras, unidades, variaciones))
+            terminos.update(palabras, unidades, variaciones)
+
+        # Unidades en bruto: la búsqueda del encabezado las compara sin limpiar el texto
+        self.unidades = sorted({u for config in patrones_productos.values() for u in config['unidades_validas']})
+
+        terminos.discard("")
+        # Más largo primero: en cada posición la alternancia toma el término más largo
+        ordenados = sorted(terminos, key=lambda t: (-len(t), t))
+        self._patron = re.compile("(?=(" + "|".join(re.escape(t) for t in ordenados) + "))") if ordenados else None
+        # Términos contenidos en cada término (incluido él mismo)
+        self._contenidos = {t: frozenset(s for s in ordenados if s in t) for t in ordenados}
+
+        self.clasificar = lru_cache(maxsize=tamano_memo)(self._clasificar)
+
+    @classmethod
+    def para(cls, patrones_productos):
+        """
+        ♻️ Devuelve el clasificador compilado para un catálogo, compartido entre procesadores
+        """
+        clave = tuple(
+            (producto, tuple(config['palabras_clave']), tuple(config['unidades_validas']),
+             tuple(config['variaciones_texto']))
+            for producto, config in patrones_productos.items()
+        )
+        if clave not in cls._compilados:
+            cls._compilados[clave] = cls(patrones_productos)
+        return cls._compilados[clave]
+
+    def _terminos_presentes(self, texto_limpio):
+        presentes = {""}  # La cadena vacía está contenida en cualquier texto
+        if self._patron is not None:
+            for coincidencia in self._patron.finditer(texto_limpio):
+                presentes |= self._contenidos[coincidencia.group(1)]
+        return presentes
+
+    def _clasificar(self, encabezado):
+        """
+        🏷️ Producto con mayor puntuación para el encabezado, o None
+        """
+        presentes = self._terminos_presentes(limpiar_texto(encabezado))
+
+        mejor_producto, mejor_score = None, -1
+        for producto, palabras, unidades, variaciones in self.productos:
+            palabras_presentes = sum(1 for palabra in palabras if palabra in presentes)
+            if palabras_presentes and any(unidad in presentes for unidad in unidades):
+                score = palabras_presentes + sum(1 for variacion in variaciones if variacion in presentes)
+                if score > mejor_score:
+                    mejor_producto, mejor_score = producto, score
+        return mejor_producto
@@ -0,0 +1,226 @@
+"""
+🧮 RAW_SHEET.PY
+Acceso matricial a la hoja cruda de un archivo Excel
+Convierte la hoja una sola vez en arreglos NumPy para que la ingesta
+trabaje por columnas en lugar de consultar celda por celda con iloc
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RawSheet:
+    """
+    Hoja Excel sin encabezados representada como arreglos NumPy precomputados.
+
+    Atributos:
+        valores (ndarray[object]): Valores originales de cada celda
+        vacio (ndarray[bool]): True donde la celda está vacía (NaN/None)
+        numerico (ndarray[bool]): True donde la celda contiene un número
+        es_cadena (ndarray[bool]): True donde la celda contiene texto (str)
+        texto (ndarray[str]): str(celda).strip(), cadena vacía si la celda está vacía
+        texto_mayus (ndarray[str]): Versión en mayúsculas de ``texto``
+    """
+
+    def __init__(self, df_raw, nombre=None):
+        self.nombre = nombre
+        self.valores = df_raw.to_numpy(dtype=object)
+        self.n_filas, self.n_columnas = self.valores.shape
+
+        self.vacio = pd.isna(self.valores)
+        self.numerico = self._calcular_mascara_tipo(self.valores, (int, float, np.integer, np.floating)) & ~self.vacio
+        self.es_cadena = self._calcular_mascara_tipo(self.valores, str)
+
+        texto = np.char.strip(self.valores.astype(str))
+        texto[self.vacio] = ""
+        self.texto = texto
+        self.texto_mayus = np.char.upper(texto)
+
+    @classmethod
+    def desde_archivo(cls, archivo_excel):
+        """
+        📂 Lee el archivo Excel una única vez y devuelve la hoja lista para toda la ingesta
+        
+        La misma instancia se comparte entre validación, detección de tipo,
+        extracción de encabezados y extracción de tablas, evitando releer el libro.
+        
+        Args:
+            archivo_excel: Ruta o archivo subido en Streamlit
+        """
+        if hasattr(archivo_excel, "seek"):
+            archivo_excel.seek(0)
+        df_raw = pd.read_excel(archivo_excel, header=None)
+        nombre = getattr(archivo_excel, "name", archivo_excel if isinstance(archivo_excel, str) else None)
+        return cls(df_raw, nombre=nombre)
+
+    @classmethod
+    def desde(cls, origen):
+        """
+        🔁 Devuelve una RawSheet a partir de un DataFrame crudo o de una RawSheet existente
+        """
+        if isinstance(origen, cls):
+            return origen
+        return cls(origen)
+
+    @staticmethod
+    def _calcular_mascara_tipo(valores, tipos):
+        """
+        🔎 Marca las celdas cuyo valor es instancia de los tipos indicados
+        """
+        if valores.size == 0:
+            return np.zeros(valores.shape, dtype=bool)
+        es_tipo = np.frompyfunc(lambda v: isinstance(v, tipos), 1, 1)
+        return es_tipo(valores).astype(bool)
+
+    def __len__(self):
+        return self.n_filas
+
+    def columnas_usadas(self, max_filas=None):
+        """
+        📏 Número de columnas hasta la última celda con datos (opcionalmente en las primeras filas)
+        """
+        ocupadas = np.flatnonzero(~self.vacio[:max_filas].all(axis=0))
+        return int(ocupadas[-1]) + 1 if len(ocupadas) else 0
+
+    def _en_rango(self, fila, col):
+        return 0 <= fila < self.n_filas and 0 <= col < self.n_columnas
+
+    def valor(self, fila, col):
+        """
+        📦 Valor original de la celda, o None si está vacía o fuera de rango
+        """
+        if not self._en_rango(fila, col) or self.vacio[fila, col]:
+            return None
+        return self.valores[fila, col]
+
+    def esta_vacia(self, fila, col):
+        """
+        ⬜ Indica si la celda está vacía (las celdas fuera de rango se consideran vacías)
+        """
+        return not self._en_rango(fila, col) or bool(self.vacio[fila, col])
+
+    def es_numero(self, fila, col):
+        """
+        🔢 Indica si la celda contiene un valor numérico
+        """
+        return self._en_rango(fila, col) and bool(self.numerico[fila, col])
+
+    def fila(self, fila):
+        """
+        📋 Valores de una fila como lista, con None en las celdas vacías
+        """
+        return [None if vacia else valor for valor, vacia in zip(self.valores[fila], self.vacio[fila])]
+
+    def celda_texto(self, fila, col):
+        """
+        🔤 Texto limpio de la celda ("" si está vacía o fuera de rango)
+        """
+        if not self._en_rango(fila, col):
+            return ""
+        return str(self.texto[fila, col])
+
+    def celda_mayus(self, fila, col):
+        """
+        🔠 Texto en mayúsculas de la celda ("" si está vacía o fuera de rango)
+        """
+        if not self._en_rango(fila, col):
+            return ""
+        return str(self.texto_mayus[fila, col])
+
+
+class TableIndex:
+    """
+    Índice de las tablas de comedores de una hoja, calculado en un solo barrido
+    vectorizado sobre las columnas A/B/C.
+
+    Cada atributo es un arreglo con una posición por tabla:
+        fila_encabezado: Fila con "N°"/"No." en la columna A (encabezado de la tabla)
+        datos_inicio: Primera fila de datos (igual a fila_fin si la tabla está vacía)
+        fila_fin: Fila que termina la tabla (TOTAL, vacía o n_filas si llega al final);
+            las filas de datos son exactamente [datos_inicio, fila_fin)
+        fila_titulo: Fila del título de ruta más cercano por encima (-1 si no hay)
+    """
+
+    MARCADORES_INICIO = ["N°", "No."]
+    EXCLUIR_TITULO = ["PROGRAMA:", "EMPRESA:"]
+
+    def __init__(self, fila_encabezado, datos_inicio, fila_fin, fila_titulo):
+        self.fila_encabezado = fila_encabezado
+        self.datos_inicio = datos_inicio
+        self.fila_fin = fila_fin
+        self.fila_titulo = fila_titulo
+
+    def __len__(self):
+        return len(self.fila_encabezado)
+
+    def __iter__(self):
+        """
+        🔁 Recorre las tablas como tuplas (encabezado, datos_inicio, fila_fin, titulo)
+        """
+        return zip(
+            self.fila_encabezado.tolist(),
+            self.datos_inicio.tolist(),
+            self.fila_fin.tolist(),
+            self.fila_titulo.tolist(),
+        )
+
+    @staticmethod
+    def _siguiente_verdadero(mascara):
+        """
+        ⏭️ Para cada fila i devuelve el menor j >= i con mascara[j] (len(mascara) si no existe)
+        """
+        n = len(mascara)
+        indices = np.where(mascara, np.arange(n), n)
+        siguiente = np.minimum.accumulate(indices[::-1])[::-1]
+        # Posición centinela para consultar "después de la última fila"
+        return np.append(siguiente, n)
+
+    @classmethod
+    def construir(cls, hoja):
+        """
+        🗂️ Calcula el índice de tablas de una RawSheet
+        """
+        vacio = np.zeros(0, dtype=np.int64)
+        if hoja.n_columnas < 3 or hoja.n_filas == 0:
+            return cls(vacio, vacio, vacio, vacio)
+
+        n = hoja.n_filas
+        columna_a = hoja.texto[:, 0]
+        mayus_a = hoja.texto_mayus[:, 0]
+
+        # Inicio de tabla: "N°" en Col A y texto en Col B
+        inicios = np.flatnonzero(
+            np.isin(columna_a, cls.MARCADORES_INICIO) & ~np.isin(hoja.texto[:, 1], ["nan", ""])
+        )
+
+        # Fila de datos: número finito en Col A y datos en Col B y C
+        numerico_a = hoja.numerico[:, 0]
+        finito_a = np.zeros(n, dtype=bool)
+        if numerico_a.any():
+            finito_a[numerico_a] = np.isfinite(hoja.valores[numerico_a, 0].astype(float))
+        es_dato = finito_a & ~hoja.vacio[:, 1] & ~hoja.vacio[:, 2]
+
+        # Fila TOTAL: texto no numérico que contiene la palabra TOTAL
+        es_total = ~numerico_a & (np.char.find(mayus_a, "TOTAL") >= 0)
+
+        siguiente_dato = cls._siguiente_verdadero(es_dato)
+        siguiente_total = cls._siguiente_verdadero(es_total)
+        siguiente_no_dato = cls._siguiente_verdadero(~es_dato)
+
+        # Antes del primer dato solo se ignoran filas; un TOTAL previo cierra la tabla vacía
+        primer_dato = siguiente_dato[inicios + 1]
+        primer_total = siguiente_total[inicios + 1]
+        con_datos = primer_dato < primer_total
+
+        datos_inicio = np.where(con_datos, primer_dato, primer_total)
+        fila_fin = np.where(con_datos, siguiente_no_dato[primer_dato], primer_total)
+
+        # Título de ruta: último texto de Col A por encima que no sea información del programa
+        es_titulo = hoja.es_cadena[:, 0] & (columna_a != "")
+        for excluido in cls.EXCLUIR_TITULO:
+            es_titulo &= np.char.find(mayus_a, excluido) < 0
+        filas_titulo = np.append(np.flatnonzero(es_titulo), -1)  # -1: sin título previo
+        posicion = np.searchsorted(filas_titulo[:-1], inicios) - 1
+        fila_titulo = filas_titulo[posicion]
+
+        return cls(inicios, datos_inicio, fila_fin, fila_titulo)
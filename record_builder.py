@@ -0,0 +1,187 @@
+"""
+🧱 RECORD_BUILDER.PY
+Constructor columnar (struct-of-arrays) de los registros de comedores
+Acumula cada campo en arreglos tipados por tabla y arma el DataFrame final
+con tipos compactos: categorías para los campos repetidos, int32 y float32
+"""
+
+import numpy as np
+import pandas as pd
+
+# Campos del encabezado del archivo: (columna final, clave en info_extraida)
+CAMPOS_ENCABEZADO = [
+    ('PROGRAMA', 'programa'),
+    ('EMPRESA', 'empresa'),
+    ('MODALIDAD', 'modalidad'),
+    ('SOLICITUD_REMESA', 'solicitud_remesa'),
+    ('DIAS_CONSUMO', 'dias_consumo'),
+    ('FECHA_ENTREGA', 'fecha_entrega'),
+]
+
+# Columnas que se guardan como categorías (se repiten en todas las filas de una ruta o archivo)
+COLUMNAS_CATEGORICAS = [campo for campo, _ in CAMPOS_ENCABEZADO] + ['DIA', 'RUTA']
+
+# Tipos compactos de las columnas numéricas
+TIPOS_NUMERICOS = {
+    'COBER': np.int32,
+    'CARNE_DE_CERDO': np.float32,
+    'CARNE_DE_RES': np.float32,
+    'MUSLO_CONTRAMUSLO': np.int32,
+    'POLLO_PESO': np.float32,
+    'TILAPIA': np.float32,
+}
+
+COLUMNAS_PRODUCTOS = ['CARNE_DE_CERDO', 'CARNE_DE_RES', 'MUSLO_CONTRAMUSLO', 'POLLO_PESO', 'TILAPIA']
+
+# Orden de las columnas del DataFrame final
+ORDEN_COLUMNAS = (
+    [campo for campo, _ in CAMPOS_ENCABEZADO]
+    + ['DIA', 'RUTA', 'N°', 'MUNICIPIO', 'COMEDOR/ESCUELA', 'COBER', 'DIRECCIÓN']
+    + COLUMNAS_PRODUCTOS
+)
+
+
+def valores_numericos(hoja, filas, col):
+    """
+    🔢 Convierte una columna de la hoja a float64 en un solo paso (vacíos y textos no numéricos a 0)
+
+    Args:
+        hoja (RawSheet): Hoja de origen
+        filas (slice): Rango de filas
+        col (int): Columna (si no existe en la hoja, el resultado son ceros)
+    """
+    num_filas = len(range(*filas.indices(hoja.n_filas)))
+    resultado = np.zeros(num_filas)
+    if col is None or col >= hoja.n_columnas:
+        return resultado
+
+    valores = hoja.valores[filas, col]
+    numerico = hoja.numerico[filas, col]
+    resultado[numerico] = valores[numerico].astype(float)
+
+    # Solo los textos (p. ej. "12,5" o "N/A") pasan por pd.to_numeric
+    texto = ~numerico & ~hoja.vacio[filas, col]
+    if texto.any():
+        convertidos = pd.to_numeric(valores[texto], errors='coerce').astype(float)
+        resultado[texto] = np.where(np.isnan(convertidos), 0.0, convertidos)
+    return resultado
+
+
+def _categoria(codigos, valores):
+    """
+    🏷️ Categórica a partir de códigos, con las categorías en orden alfabético
+    (el mismo orden que un groupby sobre texto)
+    """
+    categorica = pd.Categorical.from_codes(codigos, categories=valores)
+    return categorica.reorder_categories(sorted(valores))
+
+
+class ConstructorRegistros:
+    """
+    Acumula los registros de comedores de un archivo en arreglos por columna.
+
+    Los campos del encabezado (programa, empresa, ...) se guardan una sola vez por
+    archivo y DIA/RUTA una sola vez por tabla; las filas solo aportan los campos propios
+    del comedor y las cantidades de productos, ya numéricas.
+    """
+
+    def __init__(self, info_extraida):
+        self.encabezado = {campo: str(info_extraida.get(clave, 'N/A')) for campo, clave in CAMPOS_ENCABEZADO}
+        self._categorias = {'DIA': {}, 'RUTA': {}}
+        self._bloques = {columna: [] for columna in ['DIA', 'RUTA', 'N°', 'MUNICIPIO', 'COMEDOR/ESCUELA',
+                                                      'COBER', 'DIRECCIÓN'] + COLUMNAS_PRODUCTOS}
+        self._num_registros = 0
+
+    def __len__(self):
+        return self._num_registros
+
+    def _codigo(self, campo, valor):
+        return self._categorias[campo].setdefault(valor, len(self._categorias[campo]))
+
+    def agregar_tabla(self, hoja, datos_inicio, fila_fin, dia, ruta, productos):
+        """
+        📥 Agrega de una vez todas las filas [datos_inicio, fila_fin) de una tabla
+
+        Args:
+            hoja (RawSheet): Hoja de origen
+            productos (dict): {columna_producto: ndarray} con una posición por fila
+        """
+        num_filas = fila_fin - datos_inicio
+        if num_filas <= 0:
+            return
+        filas = slice(datos_inicio, fila_fin)
+
+        self._bloques['DIA'].append(np.full(num_filas, self._codigo('DIA', str(dia)), dtype=np.int32))
+        self._bloques['RUTA'].append(np.full(num_filas, self._codigo('RUTA', str(ruta)), dtype=np.int32))
+        # Las filas del índice de tablas siempre tienen un número finito en la columna A
+        self._bloques['N°'].append(hoja.valores[filas, 0].astype(float).astype(np.int64))
+        for columna, col in (('MUNICIPIO', 1), ('COMEDOR/ESCUELA', 2), ('DIRECCIÓN', 4)):
+            if col < hoja.n_columnas:
+                self._bloques[columna].append(hoja.texto[filas, col].astype(object))
+            else:
+                self._bloques[columna].append(np.full(num_filas, "", dtype=object))
+        self._bloques['COBER'].append(valores_numericos(hoja, filas, 3))
+        for columna in COLUMNAS_PRODUCTOS:
+            self._bloques[columna].append(np.asarray(productos[columna], dtype=float))
+        self._num_registros += num_filas
+
+    def construir_dataframe(self):
+        """
+        📊 Arma el DataFrame final con tipos compactos
+
+        Returns:
+            DataFrame: Columnas en ORDEN_COLUMNAS; categorías para COLUMNAS_CATEGORICAS,
+                int32 para COBER y MUSLO_CONTRAMUSLO, float32 para los kilos
+        """
+        n = self._num_registros
+        columnas = {}
+        for campo, valor in self.encabezado.items():
+            columnas[campo] = _categoria(np.zeros(n, dtype=np.int32), [valor])
+        for campo in ('DIA', 'RUTA'):
+            columnas[campo] = _categoria(np.concatenate(self._bloques[campo]), list(self._categorias[campo]))
+        columnas['N°'] = np.concatenate(self._bloques['N°'])
+        for campo in ('MUNICIPIO', 'COMEDOR/ESCUELA', 'DIRECCIÓN'):
+            columnas[campo] = np.concatenate(self._bloques[campo])
+        for campo, tipo in TIPOS_NUMERICOS.items():
+            columnas[campo] = np.concatenate(self._bloques[campo]).astype(tipo)
+        return pd.DataFrame({columna: columnas[columna] for columna in ORDEN_COLUMNAS})
+
+
+def compactar_tipos(df):
+    """
+    🗜️ Aplica los tipos compactos a un DataFrame de registros ya numérico
+    (usado por la ingesta en streaming, que construye los registros fila a fila)
+    """
+    for campo in COLUMNAS_CATEGORICAS:
+        if campo in df.columns:
+            df[campo] = df[campo].astype(str).astype('category')
+    for campo, tipo in TIPOS_NUMERICOS.items():
+        if campo in df.columns:
+            df[campo] = df[campo].astype(tipo)
+    return df
+
+
+def concatenar_registros(dataframes):
+    """
+    🧩 Concatena DataFrames de varios archivos conservando las columnas categóricas
+    (pd.concat las convierte a texto cuando las categorías de cada archivo difieren)
+    """
+    df_combinado = pd.concat(dataframes, ignore_index=True)
+    for campo in COLUMNAS_CATEGORICAS:
+        if campo in df_combinado.columns and not isinstance(df_combinado[campo].dtype, pd.CategoricalDtype):
+            df_combinado[campo] = df_combinado[campo].astype('category')
+    return df_combinado
+
+
+def ampliar_flotantes(df):
+    """
+    🔎 Copia del DataFrame con las columnas float32 pasadas a float64 por su representación
+    decimal (12.3 en lugar de 12.300000190734863), para exportar a Excel u otros formatos
+    """
+    columnas = [c for c in df.columns if df[c].dtype == np.float32]
+    if not columnas:
+        return df
+    df = df.copy()
+    for columna in columnas:
+        df[columna] = df[columna].astype(str).astype(np.float64)
+    return df
@@ -0,0 +1,178 @@
+"""
+🗃️ RENDER_CACHE.PY
+Caché en disco de guías de transporte ya renderizadas
+La clave es el SHA-256 de todo lo que determina el PDF de una guía (comedores, datos del
+programa, quien elabora, dictamen, lotes, conductor, placa, firmas y fecha); al regenerar
+el ZIP solo se renderizan las guías cuya clave cambió, con desalojo LRU por tamaño
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from logger_config import logger
+
+DIRECTORIO_POR_DEFECTO = os.path.join(tempfile.gettempdir(), "procesador_reportes_guias")
+TAMANO_MAXIMO_POR_DEFECTO = 128 * 1024 * 1024  # 128 MB
+
+
+def semilla_desde_clave(clave):
+    """
+    🎲 Semilla de lotes, temperaturas y número de guía derivada de la clave de la guía
+
+    Con la misma clave la guía se renderiza siempre igual, así que da lo mismo
+    renderizarla de nuevo o tomarla de la caché.
+    """
+    return int(clave[:16], 16)
+
+
+class RenderCache:
+    """
+    Caché de PDFs de guías compartida entre sesiones.
+
+    Cada entrada es un archivo ``<clave>.pdf``; su fecha de modificación marca el
+    último uso para el desalojo LRU.
+    """
+
+    def __init__(self, version, directorio=None, tamano_maximo=TAMANO_MAXIMO_POR_DEFECTO):
+        self.version = str(version)
+        self.directorio = directorio or DIRECTORIO_POR_DEFECTO
+        self.tamano_maximo = tamano_maximo
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        # Tamaño ocupado según este proceso (None hasta el primer recorrido del directorio)
+        self._tamano_total = None
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def clave(self, partes):
+        """
+        🔑 Calcula la clave de una guía: SHA-256 de la versión y de sus datos de render
+
+        Args:
+            partes (dict): Datos de los que depende el PDF (serializables a JSON)
+        """
+        digest = hashlib.sha256()
+        digest.update(f"GuiaTransporte:{self.version}\0".encode("utf-8"))
+        digest.update(json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def contiene(self, clave):
+        """
+        ❓ Indica si la guía está en la caché (si no está, cuenta como fallo)
+        """
+        if os.path.exists(self._ruta(clave)):
+            return True
+        self._contar(acierto=False)
+        return False
+
+    def obtener(self, clave):
+        """
+        🔍 Busca una guía en la caché
+
+        Returns:
+            bytes | None: PDF de la guía o None si no existe
+        """
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                pdf_bytes = f.read()
+            os.utime(ruta)  # Marcar como usado recientemente
+        except FileNotFoundError:
+            self._contar(acierto=False)
+            return None
+        except OSError as e:
+            logger.warning(f"Guía en caché ilegible {clave[:12]}: {e}")
+            self._contar(acierto=False)
+            return None
+
+        self._contar(acierto=True)
+        return pdf_bytes
+
+    def guardar(self, clave, pdf_bytes):
+        """
+        💾 Guarda el PDF de una guía
+
+        La escritura es atómica (archivo temporal + rename) para que sesiones
+        concurrentes nunca lean una entrada a medio escribir.
+        """
+        ruta = self._ruta(clave)
+        try:
+            temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la guía en caché {clave[:12]}: {e}")
+            return False
+
+        with self._lock:
+            if self._tamano_total is None:
+                self._tamano_total = sum(tamano for _, tamano, _ in self._entradas())
+            else:
+                self._tamano_total += len(pdf_bytes)
+            excedido = self._tamano_total > self.tamano_maximo
+        # El directorio solo se recorre de nuevo cuando la cuenta supera el máximo
+        if excedido:
+            self._desalojar()
+        return True
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def _entradas(self):
+        """
+        📋 Lista las entradas como (ultimo_uso, tamano_bytes, ruta)
+        """
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".pdf"):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                estado = os.stat(ruta)
+                entradas.append((estado.st_mtime, estado.st_size, ruta))
+            except OSError:
+                continue
+        return entradas
+
+    def _desalojar(self):
+        """
+        🧹 Elimina las guías usadas hace más tiempo hasta quedar bajo el tamaño máximo
+        """
+        entradas = sorted(self._entradas())
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in entradas:
+            if total <= self.tamano_maximo:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            total -= tamano
+        with self._lock:
+            self._tamano_total = total
+
+    def estadisticas(self):
+        """
+        📊 Resumen de uso de la caché
+
+        Returns:
+            dict: {'aciertos', 'fallos', 'entradas', 'tamano_bytes'}
+        """
+        entradas = self._entradas()
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "entradas": len(entradas),
+            "tamano_bytes": sum(tamano for _, tamano, _ in entradas),
+        }
@@ -0,0 +1,97 @@
+"""
+🧩 RENDER_CONTEXT.PY
+Caché de los elementos estáticos de las guías de transporte
+Construye una sola vez por lote la tabla de encabezados de productos, la tabla de firmas
+y las imágenes de firma decodificadas, y las reutiliza en cada página y en cada guía
+"""
+
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Image
+
+from signature_assets import AlmacenFirmas, CARPETA_IMAGENES
+
+# Hoja de estilos base compartida por todas las plantillas del proceso
+_HOJA_ESTILOS = None
+
+
+def hoja_estilos():
+    """
+    🎨 Hoja de estilos de ReportLab, creada una sola vez por proceso
+    """
+    global _HOJA_ESTILOS
+    if _HOJA_ESTILOS is None:
+        _HOJA_ESTILOS = getSampleStyleSheet()
+    return _HOJA_ESTILOS
+
+
+class ContextoRender:
+    """
+    Caché de flowables estáticos para un lote de guías.
+
+    La tabla de encabezados de productos solo depende de la empresa y la tabla de firmas
+    solo de quien elabora, así que se construyen una vez por clave y el mismo flowable
+    se inserta en todas las páginas. Las imágenes de firma salen del AlmacenFirmas ya
+    escaladas a resolución de impresión y se decodifican una sola vez por firmante.
+    ``reiniciar()`` descarta todo al empezar un lote nuevo, para recoger firmas
+    agregadas o cambiadas entre lotes.
+    """
+
+    def __init__(self, carpeta_imagenes=CARPETA_IMAGENES, firmas=None):
+        self.firmas = firmas or AlmacenFirmas(carpeta_imagenes)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """
+        🔄 Vacía la caché (se llama al comenzar cada lote de guías)
+        """
+        self._tablas_encabezado = {}
+        self._tablas_firmas = {}
+        self._imagenes_firma = {}
+        self.aciertos = 0
+        self.construcciones = 0
+
+    def _memorizar(self, cache, clave, construir):
+        if clave in cache:
+            self.aciertos += 1
+            return cache[clave]
+        valor = construir()
+        cache[clave] = valor
+        self.construcciones += 1
+        return valor
+
+    def tabla_encabezados(self, empresa, construir):
+        """
+        📋 Tabla de encabezados de productos de la empresa
+
+        Args:
+            empresa (str): Nombre de la empresa (clave de la caché)
+            construir (callable): construir(empresa) -> Table, usado solo la primera vez
+        """
+        return self._memorizar(self._tablas_encabezado, empresa, lambda: construir(empresa))
+
+    def tabla_firmas(self, elaborado_por, construir):
+        """
+        ✍️ Tabla de firmas de quien elabora
+
+        Args:
+            elaborado_por (str): Nombre de quien elabora (clave de la caché)
+            construir (callable): construir(elaborado_por) -> Table, usado solo la primera vez
+        """
+        return self._memorizar(self._tablas_firmas, elaborado_por, lambda: construir(elaborado_por))
+
+    def imagen_firma(self, nombre_persona, ancho, alto):
+        """
+        🖼️ Imagen de firma ya decodificada, o None si la persona no tiene firma
+
+        La búsqueda en disco y la decodificación ocurren una sola vez por firmante y tamaño.
+        ReportLab registra cada imagen como un único XObject por documento, así que todas
+        las páginas de una guía referencian la misma copia embebida.
+        """
+        def cargar():
+            ruta_imagen = self.firmas.ruta_impresion(nombre_persona, ancho, alto)
+            if ruta_imagen is None:
+                return None
+            # lazy=0: decodificar ahora y conservar la imagen en memoria para todo el lote
+            return Image(ruta_imagen, width=ancho, height=alto, lazy=0)
+
+        return self._memorizar(self._imagenes_firma, (nombre_persona, ancho, alto), cargar)
@@ -0,0 +1,236 @@
+"""
+📊 REPORT_SUMMARY.PY
+Resumen agregado del lote consolidado en una sola pasada
+Una única pasada agrupada por (RUTA, EMPRESA, MODALIDAD, DIAS_CONSUMO) calcula conteos y
+sumas de cobertura y productos; los totales generales y los análisis por ruta, por empresa y
+temporal se derivan de esos pocos grupos. Las hojas del Excel, el correo y las métricas
+de la interfaz leen del mismo ResumenReporte
+"""
+
+import numpy as np
+import pandas as pd
+
+from record_builder import ampliar_flotantes
+
+# Columnas que se suman en la pasada agrupada (las que falten cuentan como 0)
+COLUMNAS_SUMA = ['COBER', 'CARNE_DE_CERDO', 'CARNE_DE_RES', 'MUSLO_CONTRAMUSLO', 'POLLO_PESO', 'TILAPIA']
+# Claves de agrupación: cada análisis es un re-agrupado de estos grupos
+CLAVES_GRUPO = ['RUTA', 'EMPRESA', 'MODALIDAD', 'DIAS_CONSUMO']
+# Precio estimado por kg (COP)
+PRECIOS_KG = {
+    'CARNE_DE_CERDO': 15000,
+    'CARNE_DE_RES': 18000,
+    'POLLO_PESO': 12000,
+    'TILAPIA': 16000,
+}
+# Campos informativos que se toman de la primera fila
+COLUMNAS_PRIMERA_FILA = ['PROGRAMA', 'EMPRESA', 'MODALIDAD', 'SOLICITUD_REMESA', 'DIAS_CONSUMO', 'FECHA_ENTREGA']
+
+
+class ResumenReporte:
+    """
+    Totales y agregados por grupo de un DataFrame consolidado.
+
+    ``grupos`` tiene una fila por combinación observada de CLAVES_GRUPO (con NaN incluidos)
+    y las columnas COMEDORES (comedores con nombre), FILAS y las de COLUMNAS_SUMA.
+    """
+
+    def __init__(self, grupos, claves, columnas, num_filas, primera_fila, municipios):
+        self.grupos = grupos
+        self.claves = claves
+        self.columnas = columnas
+        self.num_filas = num_filas
+        self.primera_fila = primera_fila
+        self.municipios = municipios
+        # Totales generales: suma de los grupos
+        self.totales = {columna: grupos[columna].sum() for columna in COLUMNAS_SUMA}
+        self._por_ruta = None
+
+    def tiene(self, columna):
+        """Indica si la columna existía en el DataFrame resumido"""
+        return columna in self.columnas
+
+    def primero(self, columna, defecto="N/A"):
+        """Valor de la columna en la primera fila (o el valor por defecto)"""
+        return self.primera_fila.get(columna, defecto)
+
+    @property
+    def rutas(self):
+        """Número de rutas distintas"""
+        if 'RUTA' not in self.claves:
+            return 0
+        return self.grupos['RUTA'].nunique()
+
+    @property
+    def promedio_beneficiarios(self):
+        return self.totales['COBER'] / self.num_filas if self.num_filas else 0.0
+
+    def valor_estimado(self, columna):
+        """💰 Valor estimado (COP) del total de kg de un producto"""
+        return self.totales[columna] * PRECIOS_KG[columna]
+
+    def _reagrupar(self, claves, columnas, distintas=None):
+        """
+        🔁 Agrega los grupos por un subconjunto de las claves (como groupby(claves).agg)
+
+        Los grupos con alguna clave NaN se descartan y el resultado queda ordenado por
+        las categorías de cada clave, igual que un groupby con sort=True.
+
+        Args:
+            claves (list): Claves del agregado
+            columnas (list): Columnas de ``grupos`` que se suman
+            distintas (str): Clave cuyos valores distintos se cuentan por grupo, en la columna
+                             ``<clave>S`` (opcional)
+        """
+        codigos = [self.grupos[clave].cat.codes.to_numpy(np.int64) for clave in claves]
+        tamanos = [len(self.grupos[clave].cat.categories) for clave in claves]
+        validos = np.logical_and.reduce([c >= 0 for c in codigos])
+        combinado = np.zeros(int(validos.sum()), dtype=np.int64)
+        for c, tamano in zip(codigos, tamanos):
+            combinado = combinado * tamano + c[validos]
+        unicos, inversa = np.unique(combinado, return_inverse=True)
+
+        datos = {}
+        for columna in columnas:
+            valores = self.grupos[columna].to_numpy()
+            sumas = np.bincount(inversa, weights=valores[validos], minlength=len(unicos))
+            datos[columna] = sumas if valores.dtype.kind == 'f' else sumas.astype(np.int64)
+        if distintas is not None:
+            # Pares (grupo, valor) distintos, sin contar el NaN (como nunique)
+            valor = self.grupos[distintas].cat.codes.to_numpy(np.int64)[validos]
+            base = len(self.grupos[distintas].cat.categories)
+            pares = np.unique(inversa[valor >= 0] * base + valor[valor >= 0])
+            datos[f"{distintas}S"] = np.bincount(pares // base, minlength=len(unicos)).astype(np.int64)
+
+        # Índice: códigos de cada clave decodificados del código combinado
+        niveles = []
+        for clave, tamano in reversed(list(zip(claves, tamanos))):
+            unicos, c = np.divmod(unicos, tamano)
+            niveles.append(pd.Categorical.from_codes(c, categories=self.grupos[clave].cat.categories))
+        niveles.reverse()
+        if len(claves) == 1:
+            indice = pd.CategoricalIndex(niveles[0], name=claves[0])
+        else:
+            indice = pd.MultiIndex.from_arrays(niveles, names=claves)
+        return pd.DataFrame(datos, index=indice)
+
+    def por_ruta(self):
+        """
+        🛣️ Comedores y sumas por ruta (ordenadas como groupby('RUTA'))
+        """
+        if self._por_ruta is None:
+            self._por_ruta = self._reagrupar(['RUTA'], ['COMEDORES'] + COLUMNAS_SUMA)
+        return self._por_ruta
+
+    def por_empresa(self):
+        """
+        🏢 Comedores, beneficiarios, rutas distintas y productos por empresa y modalidad
+        """
+        agregado = self._reagrupar(['EMPRESA', 'MODALIDAD'], ['COMEDORES'] + COLUMNAS_SUMA, distintas='RUTA')
+        return agregado[['COMEDORES', 'COBER', 'RUTAS'] + COLUMNAS_SUMA[1:]]
+
+    def temporal(self):
+        """
+        📅 Comedores, beneficiarios y rutas distintas por días de consumo
+        """
+        return self._reagrupar(['DIAS_CONSUMO'], ['COMEDORES', 'COBER'], distintas='RUTA')
+
+    def cobertura_mayor_ruta(self):
+        """📊 Mayor cobertura sumada de una ruta"""
+        return self.por_ruta()['COBER'].max()
+
+    def estadisticas(self):
+        """
+        ⚡ Estadísticas para la interfaz y el correo
+        """
+        if self.num_filas == 0:
+            return {
+                'comedores': 0,
+                'beneficiarios': 0,
+                'rutas': 0,
+                'cerdo_kg': 0,
+                'res_kg': 0,
+                'pollo_kg': 0,
+                'tilapia_kg': 0,
+                'muslo_und': 0
+            }
+        return {
+            'comedores': self.num_filas,
+            'beneficiarios': int(self.totales['COBER']),
+            'rutas': self.rutas,
+            'cerdo_kg': float(self.totales['CARNE_DE_CERDO']),
+            'res_kg': float(self.totales['CARNE_DE_RES']),
+            'pollo_kg': float(self.totales['POLLO_PESO']),
+            'tilapia_kg': float(self.totales['TILAPIA']),
+            'muslo_und': int(self.totales['MUSLO_CONTRAMUSLO'])
+        }
+
+
+def _codigos(serie):
+    """
+    🔢 Códigos enteros de una columna clave (-1 = NaN) y sus categorías en orden
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(np.int64), serie.cat.categories
+    codigos, categorias = pd.factorize(serie, sort=True)
+    return codigos.astype(np.int64), categorias
+
+
+def resumir(df):
+    """
+    🧮 Resume el DataFrame consolidado en una sola pasada agrupada
+
+    Las claves se combinan en un solo código entero por fila (base mixta sobre los
+    códigos de cada columna); con ese código, cada conteo y cada suma es un np.bincount.
+    Los kilos float32 se suman por su valor decimal (como en el Excel exportado).
+
+    Returns:
+        ResumenReporte
+    """
+    if df is None:
+        df = pd.DataFrame()
+    columnas = list(df.columns)
+    num_filas = len(df)
+    claves = [clave for clave in CLAVES_GRUPO if clave in columnas]
+
+    # Código combinado de las claves (el NaN de cada clave es un valor más)
+    combinado = np.zeros(num_filas, dtype=np.int64)
+    categorias_claves = []
+    for clave in claves:
+        codigos, categorias = _codigos(df[clave])
+        combinado = combinado * (len(categorias) + 1) + (codigos + 1)
+        categorias_claves.append(categorias)
+    grupo, combinados = pd.factorize(combinado)
+    num_grupos = len(combinados)
+
+    # Claves de cada grupo, decodificadas como categóricas (mismo orden que groupby)
+    grupos = {}
+    for clave, categorias in reversed(list(zip(claves, categorias_claves))):
+        combinados, codigos = np.divmod(combinados, len(categorias) + 1)
+        grupos[clave] = pd.Categorical.from_codes(codigos - 1, categories=categorias)
+    grupos = {clave: grupos[clave] for clave in claves}
+
+    # Conteos y sumas por grupo
+    if 'COMEDOR/ESCUELA' in columnas:
+        con_nombre = df['COMEDOR/ESCUELA'].notna().to_numpy()
+        grupos['COMEDORES'] = np.bincount(grupo, weights=con_nombre, minlength=num_grupos).astype(np.int64)
+    else:
+        grupos['COMEDORES'] = np.zeros(num_grupos, dtype=np.int64)
+    grupos['FILAS'] = np.bincount(grupo, minlength=num_grupos).astype(np.int64)
+    sumandos = ampliar_flotantes(df[[c for c in COLUMNAS_SUMA if c in columnas]])
+    for columna in COLUMNAS_SUMA:
+        if columna not in columnas:
+            grupos[columna] = np.zeros(num_grupos, dtype=np.int64)
+            continue
+        valores = sumandos[columna].to_numpy()
+        if valores.dtype.kind == 'f':
+            grupos[columna] = np.bincount(grupo, weights=np.nan_to_num(valores), minlength=num_grupos)
+        else:
+            grupos[columna] = np.bincount(grupo, weights=valores, minlength=num_grupos).astype(np.int64)
+    grupos = pd.DataFrame(grupos)
+
+    primera_fila = {}
+    if num_filas:
+        primera_fila = {c: df[c].iloc[0] for c in COLUMNAS_PRIMERA_FILA if c in columnas}
+    municipios = df['MUNICIPIO'].nunique() if 'MUNICIPIO' in columnas else 0
+    return ResumenReporte(grupos, claves, columnas, num_filas, primera_fila, municipios)
@@ -0,0 +1,180 @@
+"""
+💾 RESULT_CACHE.PY
+Caché en disco de resultados de procesamiento, direccionada por contenido
+La clave es el SHA-256 de los bytes del archivo más la versión del procesador;
+guarda el DataFrame en Parquet y los metadatos en JSON, con desalojo LRU por tamaño
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+from logger_config import logger
+
+try:
+    import pyarrow  # noqa: F401  (motor de Parquet usado por pandas)
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+DIRECTORIO_POR_DEFECTO = os.path.join(tempfile.gettempdir(), "procesador_reportes_cache")
+TAMANO_MAXIMO_POR_DEFECTO = 256 * 1024 * 1024  # 256 MB
+
+
+class ResultCache:
+    """
+    Caché de resultados de ExcelProcessor compartida entre sesiones.
+
+    Cada entrada ocupa dos archivos: ``<clave>.parquet`` (DataFrame) y
+    ``<clave>.json`` (tipo de archivo, número de registros e info_extraida).
+    La fecha de modificación del JSON marca el último uso para el desalojo LRU.
+    """
+
+    def __init__(self, version, directorio=None, tamano_maximo=TAMANO_MAXIMO_POR_DEFECTO):
+        self.version = str(version)
+        self.directorio = directorio or DIRECTORIO_POR_DEFECTO
+        self.tamano_maximo = tamano_maximo
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @property
+    def disponible(self):
+        return PARQUET_DISPONIBLE
+
+    def clave(self, contenido):
+        """
+        🔑 Calcula la clave de caché: SHA-256 de la versión del procesador y los bytes del archivo
+        """
+        digest = hashlib.sha256()
+        digest.update(f"ExcelProcessor:{self.version}\0".encode("utf-8"))
+        digest.update(contenido)
+        return digest.hexdigest()
+
+    def _rutas(self, clave):
+        base = os.path.join(self.directorio, clave)
+        return base + ".parquet", base + ".json"
+
+    def obtener(self, clave):
+        """
+        🔍 Busca un resultado en la caché
+
+        Returns:
+            tuple | None: (df_procesado, num_registros, tipo_archivo, info_extraida) o None si no existe
+        """
+        ruta_datos, ruta_meta = self._rutas(clave)
+        if not self.disponible or not (os.path.exists(ruta_datos) and os.path.exists(ruta_meta)):
+            self._contar(acierto=False)
+            return None
+
+        try:
+            with open(ruta_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            df = pd.read_parquet(ruta_datos)
+            os.utime(ruta_meta)  # Marcar como usado recientemente
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible {clave[:12]}: {e}")
+            self._eliminar(clave)
+            self._contar(acierto=False)
+            return None
+
+        self._contar(acierto=True)
+        return df, meta["num_registros"], meta["tipo_archivo"], meta["info_extraida"]
+
+    def guardar(self, clave, resultado):
+        """
+        💾 Guarda un resultado (df_procesado, num_registros, tipo_archivo, info_extraida)
+
+        La escritura es atómica (archivo temporal + rename) para que sesiones
+        concurrentes nunca lean una entrada a medio escribir.
+        """
+        if not self.disponible:
+            return False
+
+        df, num_registros, tipo_archivo, info_extraida = resultado
+        ruta_datos, ruta_meta = self._rutas(clave)
+        meta = {
+            "version": self.version,
+            "num_registros": int(num_registros),
+            "tipo_archivo": tipo_archivo,
+            "info_extraida": info_extraida,
+        }
+
+        try:
+            temporal_datos = f"{ruta_datos}.{os.getpid()}.{threading.get_ident()}.tmp"
+            df.to_parquet(temporal_datos, index=False)
+            os.replace(temporal_datos, ruta_datos)
+
+            temporal_meta = f"{ruta_meta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal_meta, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+            os.replace(temporal_meta, ruta_meta)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en caché {clave[:12]}: {e}")
+            self._eliminar(clave)
+            return False
+
+        self._desalojar()
+        return True
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def _eliminar(self, clave):
+        for ruta in self._rutas(clave):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def _entradas(self):
+        """
+        📋 Lista las entradas como (ultimo_uso, tamano_bytes, clave)
+        """
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".json"):
+                continue
+            clave = nombre[:-len(".json")]
+            ruta_datos, ruta_meta = self._rutas(clave)
+            try:
+                tamano = os.path.getsize(ruta_meta) + os.path.getsize(ruta_datos)
+                entradas.append((os.path.getmtime(ruta_meta), tamano, clave))
+            except OSError:
+                continue
+        return entradas
+
+    def _desalojar(self):
+        """
+        🧹 Elimina las entradas usadas hace más tiempo hasta quedar bajo el tamaño máximo
+        """
+        entradas = sorted(self._entradas())
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, clave in entradas:
+            if total <= self.tamano_maximo:
+                break
+            self._eliminar(clave)
+            total -= tamano
+
+    def estadisticas(self):
+        """
+        📊 Resumen de uso de la caché
+
+        Returns:
+            dict: {'aciertos', 'fallos', 'entradas', 'tamano_bytes'}
+        """
+        entradas = self._entradas()
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "entradas": len(entradas),
+            "tamano_bytes": sum(tamano for _, tamano, _ in entradas),
+        }
@@ -0,0 +1,111 @@
+"""
+🚚 ROUTE_GROUPS.PY
+Agrupación de comedores por ruta para las guías de transporte
+Un solo groupby sobre el DataFrame consolidado produce, para cada ruta, el bloque de
+comedores que imprime la guía, la información del programa y los totales por producto;
+el generador de PDFs, el reporte de generación y la interfaz consumen el mismo resultado.
+Cada ruta trae además su BloqueComedores, con cantidades y textos de la tabla ya normalizados
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from comedor_block import BloqueComedores
+from template import FILAS_POR_PAGINA
+
+# Columnas que se totalizan por ruta (las de productos pueden faltar y cuentan como 0)
+COLUMNAS_TOTALES = ['COBER', 'CARNE_DE_RES', 'CARNE_DE_CERDO', 'MUSLO_CONTRAMUSLO', 'POLLO_PESO', 'TILAPIA']
+# Columnas de la información del programa (se toman de la primera fila de cada ruta)
+COLUMNAS_PROGRAMA = ['PROGRAMA', 'FECHA_ENTREGA', 'EMPRESA', 'MODALIDAD', 'SOLICITUD_REMESA', 'DIAS_CONSUMO', 'DIA']
+
+EMPRESA_POR_DEFECTO = 'CONSORCIO ALIMENTANDO A CALI 2025'
+MODALIDAD_POR_DEFECTO = 'CP AM CALI'
+SOLICITUD_REMESA_POR_DEFECTO = 'MENUS PARA 10 DIAS'
+
+
+def paginas_necesarias(num_comedores):
+    """
+    📄 Páginas de la guía para N comedores (4 filas por página)
+    """
+    return math.ceil(num_comedores / FILAS_POR_PAGINA)
+
+
+def totales_comedores(comedores):
+    """
+    ➕ Totales de una lista de comedores ya armada (para bloques construidos a mano)
+    """
+    totales = {columna: sum(c.get(columna, 0) for c in comedores) for columna in COLUMNAS_TOTALES}
+    totales['COMEDORES'] = len(comedores)
+    return totales
+
+
+def _programa_info(fila):
+    """
+    📋 Información del programa a partir de la primera fila de la ruta
+    """
+    fecha_entrega = fila['FECHA_ENTREGA']
+    return {
+        'programa': fila['PROGRAMA'],
+        'fecha_entrega': fecha_entrega,
+        'empresa': fila.get('EMPRESA', EMPRESA_POR_DEFECTO),
+        'modalidad': fila.get('MODALIDAD', MODALIDAD_POR_DEFECTO),
+        'solicitud_remesa': fila.get('SOLICITUD_REMESA', SOLICITUD_REMESA_POR_DEFECTO),
+        'dias_consumo': fila.get('DIAS_CONSUMO', f"{fecha_entrega} - {fecha_entrega}"),
+        'dia': fila['DIA']
+    }
+
+
+def agrupar_rutas(df_procesado):
+    """
+    🗂️ Agrupa el DataFrame consolidado por ruta, en el orden en que aparecen las rutas
+
+    Returns:
+        dict: {ruta: {'comedores': [dict], 'bloque': BloqueComedores, 'programa_info': dict,
+              'totales': dict}}; ``totales`` trae la suma de COLUMNAS_TOTALES y el número de COMEDORES
+    """
+    if df_procesado is None or df_procesado.empty or 'RUTA' not in df_procesado.columns:
+        return {}
+
+    # Bloque de comedores en el formato de la guía, convertido de una sola vez
+    comedores = pd.DataFrame({
+        'MUNICIPIO': df_procesado['MUNICIPIO'],
+        'DEPARTAMENTO': 'VALLE',  # Valor por defecto
+        'COMEDOR/ESCUELA': df_procesado['COMEDOR/ESCUELA'],
+        'COBER': df_procesado['COBER'],
+        'DIRECCIÓN': df_procesado['DIRECCIÓN'],
+        'CARNE_DE_RES': df_procesado.get('CARNE_DE_RES', 0),
+        'CARNE_DE_CERDO': df_procesado['CARNE_DE_CERDO'],
+        'MUSLO_CONTRAMUSLO': df_procesado.get('MUSLO_CONTRAMUSLO', 0),
+        'POLLO_PESO': df_procesado.get('POLLO_PESO', 0),
+        'TILAPIA': df_procesado.get('TILAPIA', 0)
+    }).to_dict('records')
+
+    # Un solo groupby: orden de aparición de las rutas, grupo de cada fila, tamaños y sumas
+    presentes = [c for c in COLUMNAS_TOTALES if c in df_procesado.columns]
+    # Los productos vienen en float32: sumar en float64 como las sumas de Python
+    valores = df_procesado[presentes].astype({c: 'float64' for c in presentes
+                                              if df_procesado[c].dtype.kind == 'f'})
+    grupos = valores.groupby(df_procesado['RUTA'], sort=False, observed=True, dropna=False)
+    sumas = grupos.sum()
+    conteos = grupos.size().to_numpy()
+    orden = np.argsort(grupos.ngroup().to_numpy(), kind='stable')
+    bloques = np.split(orden, np.cumsum(conteos)[:-1])
+    sumas_por_columna = {c: sumas[c].tolist() for c in presentes}
+    # La información del programa sale de la primera fila de cada ruta
+    columnas_programa = [c for c in COLUMNAS_PROGRAMA if c in df_procesado.columns]
+    primeras_filas = df_procesado[columnas_programa].iloc[[bloque[0] for bloque in bloques]].to_dict('records')
+
+    rutas_data = {}
+    for numero, (ruta, bloque, primera) in enumerate(zip(sumas.index, bloques, primeras_filas)):
+        totales = {c: sumas_por_columna[c][numero] if c in sumas_por_columna else 0 for c in COLUMNAS_TOTALES}
+        totales['COMEDORES'] = len(bloque)
+        comedores_ruta = [comedores[posicion] for posicion in bloque]
+        rutas_data[ruta] = {
+            'comedores': comedores_ruta,
+            'bloque': BloqueComedores.desde_comedores(comedores_ruta),
+            'programa_info': _programa_info(primera),
+            'totales': totales
+        }
+    return rutas_data
@@ -38,6 +38,13 @@ app_password = "tu_contraseña_de_aplicacion"
 # 3. Ve a "Contraseñas de aplicaciones"
 # 4. Genera una nueva para "Correo"
 # 5. Reemplaza "tu_contraseña_de_aplicacion" con la contraseña generada
+
+# Servidor SMTP (opcional; por defecto smtp.gmail.com:465 con SSL)
+# [smtp]
+# host = "smtp.gmail.com"
+# port = 587
+# ssl = false
+# starttls = true
 """
     
     # Crear template
@@ -0,0 +1,131 @@
+"""
+✍️ SIGNATURE_ASSETS.PY
+Almacén de imágenes de firma listas para imprimir
+Reescala cada firma de imagenes/ una sola vez a la resolución con la que se imprime
+(1.5 cm × 0.8 cm en la guía) y guarda el resultado en disco, identificado por la
+fecha de modificación del archivo original
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+from logger_config import logger
+
+try:
+    from PIL import Image as PILImage
+    PIL_DISPONIBLE = True
+except ImportError:
+    PIL_DISPONIBLE = False
+
+CARPETA_IMAGENES = "imagenes"
+EXTENSIONES_FIRMA = ['.png', '.jpg', '.jpeg', '.gif']
+DIRECTORIO_POR_DEFECTO = os.path.join(tempfile.gettempdir(), "procesador_reportes_firmas")
+# Resolución de impresión de las firmas (puntos por pulgada)
+DPI_IMPRESION = 300
+
+
+def _digest(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+class AlmacenFirmas:
+    """
+    Firmas reescaladas a resolución de impresión, cacheadas en disco.
+
+    Cada versión escalada se guarda como ``<origen>_<version>.png``: ``origen`` identifica
+    el archivo fuente y ``version`` combina su fecha de modificación, su tamaño y las
+    dimensiones en píxeles, así que reemplazar una firma en imagenes/ genera una versión
+    nueva y la anterior se borra. Si PIL no está disponible o el escalado falla se usa
+    la imagen original.
+    """
+
+    def __init__(self, carpeta_imagenes=CARPETA_IMAGENES, directorio=None, dpi=DPI_IMPRESION):
+        self.carpeta_imagenes = carpeta_imagenes
+        self.directorio = directorio or DIRECTORIO_POR_DEFECTO
+        self.dpi = dpi
+        self._lock = threading.Lock()
+
+    def ruta_origen(self, nombre_persona):
+        """
+        🔍 Ruta de la imagen original de la firma, o None si no existe
+        """
+        # Crear carpeta si no existe
+        if not os.path.exists(self.carpeta_imagenes):
+            os.makedirs(self.carpeta_imagenes)
+
+        for ext in EXTENSIONES_FIRMA:
+            ruta_imagen = os.path.join(self.carpeta_imagenes, f"{nombre_persona}{ext}")
+            if os.path.exists(ruta_imagen):
+                return ruta_imagen
+        return None
+
+    def version(self, nombre_persona):
+        """
+        🏷️ Versión de la firma (fecha de modificación y tamaño del original), None si no hay firma
+        """
+        ruta_origen = self.ruta_origen(nombre_persona)
+        if ruta_origen is None:
+            return None
+        try:
+            estado = os.stat(ruta_origen)
+        except OSError:
+            return None
+        return f"{estado.st_mtime_ns}:{estado.st_size}"
+
+    def pixeles(self, ancho, alto):
+        """
+        📐 Dimensiones en píxeles de un tamaño de impresión dado en puntos
+        """
+        return max(1, round(ancho / 72 * self.dpi)), max(1, round(alto / 72 * self.dpi))
+
+    def ruta_impresion(self, nombre_persona, ancho, alto):
+        """
+        🖼️ Ruta de la firma escalada para imprimirse a ancho × alto puntos
+
+        Returns:
+            str | None: Imagen escalada (o la original si no se pudo escalar), None si no hay firma
+        """
+        ruta_origen = self.ruta_origen(nombre_persona)
+        if ruta_origen is None or not PIL_DISPONIBLE:
+            return ruta_origen
+
+        try:
+            estado = os.stat(ruta_origen)
+            ancho_px, alto_px = self.pixeles(ancho, alto)
+            origen = _digest(os.path.abspath(ruta_origen))
+            version = _digest(f"{estado.st_mtime_ns}:{estado.st_size}:{ancho_px}x{alto_px}")
+            ruta_escalada = os.path.join(self.directorio, f"{origen}_{version}.png")
+            if not os.path.exists(ruta_escalada):
+                self._escalar(ruta_origen, ruta_escalada, ancho_px, alto_px)
+                self._eliminar_versiones_anteriores(origen, ruta_escalada)
+            return ruta_escalada
+        except Exception as e:
+            logger.warning(f"No se pudo escalar la firma de {nombre_persona}: {e}")
+            return ruta_origen
+
+    def _escalar(self, ruta_origen, ruta_destino, ancho_px, alto_px):
+        """
+        📉 Reescala la imagen (sin ampliarla) y la guarda de forma atómica
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        with PILImage.open(ruta_origen) as imagen:
+            modo = "RGBA" if imagen.mode in ("RGBA", "LA", "P") else "RGB"
+            imagen = imagen.convert(modo)
+            tamano = (min(ancho_px, imagen.width), min(alto_px, imagen.height))
+            escalada = imagen.resize(tamano, PILImage.LANCZOS)
+
+        temporal = f"{ruta_destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        escalada.save(temporal, format="PNG", optimize=True)
+        os.replace(temporal, ruta_destino)
+
+    def _eliminar_versiones_anteriores(self, origen, ruta_vigente):
+        with self._lock:
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                if nombre.startswith(f"{origen}_") and nombre.endswith(".png") and ruta != ruta_vigente:
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        pass
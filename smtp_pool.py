@@ -0,0 +1,249 @@
+"""
+📮 SMTP_POOL.PY
+Pool de conexiones SMTP reutilizables
+Cada conexión hace el handshake TLS y el login una sola vez y queda abierta para los envíos
+siguientes: antes de reutilizarla se comprueba con NOOP y, si el servidor la cerró, se
+abre otra y se reintenta el envío. Un lote de mensajes viaja por una misma sesión
+"""
+
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+from logger_config import logger
+
+HOST_POR_DEFECTO = "smtp.gmail.com"
+PUERTO_POR_DEFECTO = 465
+# Conexiones abiertas que se conservan entre envíos
+MAX_CONEXIONES = 2
+# Segundos sin uso tras los que una conexión se descarta (los servidores cierran antes)
+MAX_INACTIVIDAD = 120
+TIMEOUT = 30
+
+
+def conexion_perdida(error):
+    """
+    Indica si el error significa que la conexión ya no sirve (se reconecta y se reintenta)
+
+    SMTPException hereda de OSError: las respuestas de error del servidor (destinatario
+    rechazado, mensaje demasiado grande...) no son conexiones perdidas, salvo la desconexión.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class EnvioLoteInterrumpido(Exception):
+    """
+    Error a mitad de un lote: ``enviados`` tiene el resultado de los mensajes ya aceptados
+    por el servidor (los primeros ``len(enviados)``) y ``pendientes`` cuántos no se enviaron.
+    La causa original queda en ``__cause__``.
+    """
+
+    def __init__(self, enviados, pendientes, error):
+        super().__init__(f"{len(enviados)} mensajes enviados, {pendientes} sin enviar: {error}")
+        self.enviados = enviados
+        self.pendientes = pendientes
+
+
+class _Conexion:
+    """Sesión SMTP abierta y el momento de su último uso."""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.ultimo_uso = time.monotonic()
+
+    def cerrar(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class PoolSMTP:
+    """
+    Conexiones SMTP autenticadas y reutilizables entre envíos.
+
+    Uso:
+        pool = PoolSMTP("smtp.gmail.com", 465, usuario, password)
+        pool.enviar(remitente, destinatarios, mensaje)
+        pool.enviar_lote([(remitente, destinatarios, mensaje), ...])
+
+    Con ``usar_ssl=True`` se conecta con SMTP_SSL (puerto 465); con ``usar_ssl=False`` la
+    conexión es SMTP plano y ``starttls=True`` la cifra después del EHLO (puerto 587). Sin
+    usuario no se hace login (p. ej. contra un servidor SMTP local de pruebas).
+    """
+
+    def __init__(self, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, usuario=None, password=None,
+                 usar_ssl=True, starttls=False, max_conexiones=MAX_CONEXIONES,
+                 max_inactividad=MAX_INACTIVIDAD, timeout=TIMEOUT, contexto_ssl=None):
+        self.host = host
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.usar_ssl = usar_ssl
+        self.starttls = starttls
+        self.max_conexiones = max_conexiones
+        self.max_inactividad = max_inactividad
+        self.timeout = timeout
+        self.contexto_ssl = contexto_ssl
+        self.conexiones_abiertas = 0
+        self.reconexiones = 0
+        self._libres = []
+        self._lock = threading.Lock()
+
+    def _contexto(self):
+        if self.contexto_ssl is None:
+            self.contexto_ssl = ssl.create_default_context()
+        return self.contexto_ssl
+
+    def _abrir(self):
+        """
+        🔌 Abre una conexión nueva: TCP, TLS y login
+        """
+        if self.usar_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.puerto, timeout=self.timeout, context=self._contexto())
+        else:
+            smtp = smtplib.SMTP(self.host, self.puerto, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls(context=self._contexto())
+        try:
+            if self.usuario:
+                smtp.login(self.usuario, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._lock:
+            self.conexiones_abiertas += 1
+        logger.debug(f"Conexión SMTP abierta con {self.host}:{self.puerto}")
+        return _Conexion(smtp)
+
+    def _sana(self, conexion):
+        """
+        🩺 Comprueba que una conexión libre sigue viva (inactividad y NOOP)
+        """
+        if time.monotonic() - conexion.ultimo_uso > self.max_inactividad:
+            return False
+        try:
+            codigo, _ = conexion.smtp.noop()
+        except OSError:
+            return False
+        return codigo == 250
+
+    def _tomar(self):
+        """Conexión libre y sana del pool, o una nueva"""
+        while True:
+            with self._lock:
+                conexion = self._libres.pop() if self._libres else None
+            if conexion is None:
+                return self._abrir()
+            if self._sana(conexion):
+                return conexion
+            conexion.cerrar()
+
+    def _devolver(self, conexion):
+        conexion.ultimo_uso = time.monotonic()
+        with self._lock:
+            if len(self._libres) < self.max_conexiones:
+                self._libres.append(conexion)
+                return
+        conexion.cerrar()
+
+    @contextmanager
+    def conexion(self):
+        """
+        🔗 Conexión del pool durante el bloque; se devuelve al terminar sin errores de conexión
+        """
+        conexion = self._tomar()
+        try:
+            yield conexion.smtp
+        except BaseException as e:
+            if conexion_perdida(e):
+                conexion.smtp.close()
+            else:
+                # Errores del servidor (p. ej. destinatario rechazado): la sesión sigue sirviendo
+                self._devolver(conexion)
+            raise
+        self._devolver(conexion)
+
+    def _enviar_en(self, smtp, remitente, destinatarios, mensaje):
+        if isinstance(mensaje, str):
+            return smtp.sendmail(remitente, destinatarios, mensaje)
+        return smtp.send_message(mensaje, remitente, destinatarios)
+
+    def enviar(self, remitente, destinatarios, mensaje):
+        """
+        📤 Envía un mensaje (str o EmailMessage/MIME) reconectando una vez si la conexión cayó
+
+        Returns:
+            dict: Destinatarios rechazados (vacío si todos fueron aceptados)
+        """
+        resultados = []
+        self._enviar_mensajes([(remitente, destinatarios, mensaje)], resultados)
+        return resultados[0]
+
+    def enviar_lote(self, mensajes):
+        """
+        📦 Envía varios mensajes por una misma sesión SMTP
+
+        Si la conexión se cae a mitad del lote se abre otra y se continúa desde el mensaje
+        que falló (reintentándolo una vez; si la caída fue justo después de que el servidor
+        aceptara el mensaje, ese mensaje puede llegar dos veces). Cualquier otro error detiene
+        el lote con EnvioLoteInterrumpido, que indica qué mensajes ya se enviaron, para
+        reintentar solo los restantes.
+
+        Args:
+            mensajes (list): Tuplas (remitente, destinatarios, mensaje)
+
+        Returns:
+            list: Destinatarios rechazados de cada mensaje
+
+        Raises:
+            EnvioLoteInterrumpido: Con los resultados de los mensajes ya enviados
+        """
+        mensajes = list(mensajes)
+        resultados = []
+        try:
+            self._enviar_mensajes(mensajes, resultados)
+        except Exception as e:
+            raise EnvioLoteInterrumpido(resultados, len(mensajes) - len(resultados), e) from e
+        return resultados
+
+    def _enviar_mensajes(self, mensajes, resultados):
+        """
+        Envía los mensajes en orden agregando a ``resultados`` el de cada mensaje aceptado
+        """
+        pendientes = list(mensajes)
+        reintentado = False
+        while pendientes:
+            try:
+                with self.conexion() as smtp:
+                    while pendientes:
+                        remitente, destinatarios, mensaje = pendientes[0]
+                        resultados.append(self._enviar_en(smtp, remitente, destinatarios, mensaje))
+                        pendientes.pop(0)
+                        reintentado = False
+            except OSError as e:
+                if reintentado or not conexion_perdida(e):
+                    raise
+                logger.warning(f"Conexión SMTP perdida ({e}); reconectando")
+                with self._lock:
+                    self.reconexiones += 1
+                reintentado = True
+
+    def estadisticas(self):
+        """📊 Conexiones abiertas en total, reconexiones y conexiones libres"""
+        return {
+            'conexiones_abiertas': self.conexiones_abiertas,
+            'reconexiones': self.reconexiones,
+            'libres': len(self._libres),
+        }
+
+    def cerrar(self):
+        """🧹 Cierra (QUIT) todas las conexiones libres"""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conexion in libres:
+            conexion.cerrar()
@@ -1,18 +1,70 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.pdfgen import canvas
 from datetime import datetime
 import random
-import os
 import math
+from render_context import ContextoRender, hoja_estilos
+from comedor_block import BloqueComedores, PRODUCTOS
+
+# Anchos de las 23 columnas de la guía (tabla de encabezados y tabla de comedores)
+ANCHOS_COLUMNAS = [
+    0.25*cm, # N°
+    0.7*cm,  # MUNICIPIO
+    0.7*cm,  # DEPARTAMENTO
+    1.8*cm,  # COMEDOR/ESCUELA
+    0.6*cm,  # COBER
+    1.5*cm,  # DIRECCIÓN
+    0.7*cm, 0.9*cm, 0.7*cm,  # Cerdo: KG, LOTE, °C
+    0.7*cm, 0.9*cm, 0.7*cm,  # Pechuga: KG, LOTE, °C
+    0.7*cm, 0.9*cm, 0.7*cm,  # Muslo/Contramuslo: UND, LOTE, °C
+    0.7*cm, 0.9*cm, 0.7*cm,  # Tilapia: KG, LOTE, °C
+    0.7*cm, 0.9*cm, 0.7*cm,  # Res: KG, LOTE, °C
+    1.5*cm, 0.8*cm           # FIRMA, HORA
+]
+
+# Márgenes de la guía paginada y comedores por página
+MARGENES_GUIA = {
+    'rightMargin': 0.3*inch,
+    'leftMargin': 0.3*inch,
+    'topMargin': 0.2*inch,
+    'bottomMargin': 0.5*inch,
+}
+FILAS_POR_PAGINA = 4
+# Firmante fijo de la aprobación en el pie de la guía
+FIRMANTE_APROBACION = "SANDRA HENAO TORO"
+# Encabezado de la tabla de comedores (orden de columnas de la guía)
+ENCABEZADO_COMEDORES = [
+    'N°', 'MUNICIPIO', 'DEPARTA\nMENTO', 'COMEDOR / ESCUELA', 'COBER', 'DIRECCIÓN',
+    'KG', 'LOTE', '°C',      # Carne de cerdo
+    'KG', 'LOTE', '°C',      # Pechuga de pollo
+    'UND', 'LOTE', '°C',     # Muslo/Contramuslo
+    'KG', 'LOTE', '°C',      # Tilapia
+    'KG', 'LOTE', '°C',      # Carne de res
+    'FIRMA DE RECIBO', 'HORA'
+]
 
 class PlantillaGuiaTransporte:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
+    def __init__(self, contexto=None):
+        # Estilos y flowables estáticos compartidos entre páginas y guías
+        self.contexto = contexto or ContextoRender()
+        self.styles = hoja_estilos()
         self.setup_custom_styles()
+        # Fuente de lotes, temperaturas y números de guía (global salvo que se siembre)
+        self.aleatorio = random
+        # TableStyle de la tabla de comedores por (filas, productos presentes)
+        self._estilos = {}
+    
+    def sembrar(self, semilla):
+        """
+        🎲 Fija la semilla de lotes, temperaturas y número de guía para que la guía sea reproducible
+        
+        Con semilla=None se vuelve al generador aleatorio global.
+        """
+        self.aleatorio = random if semilla is None else random.Random(semilla)
         
     def setup_custom_styles(self):
         """Configura los estilos personalizados para el documento"""
@@ -68,13 +120,29 @@ class PlantillaGuiaTransporte:
             leading=6
         )
 
+        # Estilo para la sección de ruta
+        self.ruta_style = ParagraphStyle(
+            'RutaStylePequeno',
+            parent=self.styles['Normal'],
+            fontSize=5,
+            spaceAfter=0,
+            spaceBefore=0,
+            alignment=0,
+            textColor=colors.black,
+            fontName='Helvetica-Bold'
+        )
+
     def generar_temperatura_aleatoria(self):
         """Genera una temperatura aleatoria entre -18°C y -10°C"""
-        return random.randint(-18, -10)
+        return self.aleatorio.randint(-18, -10)
     
     def generar_lote_aleatorio(self):
         """Genera un número de lote aleatorio"""
-        return random.randint(1000, 9999)
+        return self.aleatorio.randint(1000, 9999)
+
+    def generar_numero_guia_aleatorio(self):
+        """Genera el número de guía de un documento (fecha + 3 dígitos aleatorios)"""
+        return f"{datetime.now().strftime('%m%d')}-{self.aleatorio.randint(100, 999)}"
 
     def dividir_lote_inteligente(self, lote_texto, max_chars_por_linea=8):
         """
@@ -106,21 +174,26 @@ class PlantillaGuiaTransporte:
                 lineas.append(lote_str[i:i + max_chars_por_linea])
             return '\n'.join(lineas)
 
-    def crear_encabezado(self, datos_programa, numero_guia=None):
+    def crear_titulo_guia(self, numero_guia=None):
         """
-        Crea el encabezado completo del documento
+        Crea el título con el número de guía y la hora de generación (primer elemento del encabezado)
         """
-        elementos = []
-        
-        # Número de guía
         if not numero_guia:
             numero_guia = "001-001"
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        titulo_guia = Paragraph(
+        return Paragraph(
             f"GUIA DE TRANSPORTE No. {numero_guia} - {timestamp}",
             self.title_style
         )
-        elementos.append(titulo_guia)
+
+    def crear_encabezado(self, datos_programa, numero_guia=None):
+        """
+        Crea el encabezado completo del documento
+        """
+        elementos = []
+        
+        # Número de guía
+        elementos.append(self.crear_titulo_guia(numero_guia))
         elementos.append(Spacer(1, 0.05*cm))
 
         # Información del programa
@@ -167,12 +240,13 @@ class PlantillaGuiaTransporte:
     def crear_tabla_encabezados(self, datos_programa=None):
         """
         Crea la tabla de encabezados de productos con writing mode vertical
+        (construida una vez por empresa y reutilizada desde el contexto de render)
         """
         if datos_programa:
             empresa = datos_programa.get('empresa', 'CONSORCIO ALIMENTANDO A CALI 2025')
         else:
             empresa = 'CONSORCIO ALIMENTANDO A CALI 2025'
-        return self._crear_tabla_con_writing_mode_real(empresa)
+        return self.contexto.tabla_encabezados(empresa, self._crear_tabla_con_writing_mode_real)
     
     # En template.py, método _crear_tabla_con_writing_mode_real
 # CORRECCIÓN COMPLETA para eliminar el error de SPAN
@@ -231,21 +305,7 @@ class PlantillaGuiaTransporte:
             ]
         ]
 
-        tabla = Table(data, colWidths=[
-            0.25*cm, # N°
-            0.7*cm,  # MUNICIPIO
-            0.7*cm,  # DEPARTAMENTO
-            1.8*cm,  # COMEDOR/ESCUELA
-            0.6*cm,  # COBER
-            1.5*cm,  # DIRECCIÓN
-            0.7*cm, 0.9*cm, 0.7*cm,  # Cerdo: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Pechuga: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Muslo/Contramuslo: UND, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Tilapia: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Res: KG, LOTE, °C
-            1.5*cm, 0.8*cm           # FIRMA, HORA
-        ], 
-        rowHeights=[None])  # ✅ SOLO UNA FILA
+        tabla = Table(data, colWidths=ANCHOS_COLUMNAS, rowHeights=[None])  # ✅ SOLO UNA FILA
 
         # ✅ ESTILOS CORREGIDOS SIN SPANS PROBLEMÁTICOS
         tabla.setStyle(TableStyle([
@@ -271,19 +331,8 @@ class PlantillaGuiaTransporte:
         """
         Crea la sección que identifica la ruta
         """
-        ruta_style_pequeno = ParagraphStyle(
-            'RutaStylePequeno',
-            parent=self.styles['Normal'],
-            fontSize=5,
-            spaceAfter=0,
-            spaceBefore=0,
-            alignment=0,
-            textColor=colors.black,
-            fontName='Helvetica-Bold'
-        )
-        
         ruta_text = f"{nombre_ruta}"
-        ruta_para = Paragraph(ruta_text, ruta_style_pequeno)
+        ruta_para = Paragraph(ruta_text, self.ruta_style)
         
         return [ruta_para]
     
@@ -292,159 +341,69 @@ class PlantillaGuiaTransporte:
         Crea la tabla principal con los comedores y productos (SIN PAGINACIÓN)
         Optimización: Los lotes se muestran solo en la primera ocurrencia de cada producto
         """
-        def dividir_texto_inteligente(texto, max_chars_por_linea=20, max_lineas=3):
-            """Divide texto largo en múltiples líneas"""
-            if not texto or len(str(texto)) <= max_chars_por_linea:
-                return str(texto)
-            
-            texto_str = str(texto).strip()
-            palabras = texto_str.split()
-            lineas = []
-            linea_actual = ""
-            
-            for palabra in palabras:
-                if linea_actual and len(linea_actual + " " + palabra) > max_chars_por_linea:
-                    lineas.append(linea_actual)
-                    linea_actual = palabra
-                else:
-                    if linea_actual:
-                        linea_actual += " " + palabra
-                    else:
-                        linea_actual = palabra
-            
-            if linea_actual:
-                lineas.append(linea_actual)
-            
-            if len(lineas) > max_lineas:
-                lineas = lineas[:max_lineas]
-                if len(lineas[max_lineas-1]) <= max_chars_por_linea - 3:
-                    lineas[max_lineas-1] += "..."
-                else:
-                    lineas[max_lineas-1] = lineas[max_lineas-1][:max_chars_por_linea-3] + "..."
-            
-            return "\n".join(lineas)
-
-        # ENCABEZADO CON ORDEN CORREGIDO
-        encabezado = [
-            'N°', 'MUNICIPIO', 'DEPARTA\nMENTO', 'COMEDOR / ESCUELA', 'COBER', 'DIRECCIÓN',
-            'KG', 'LOTE', '°C',      # Carne de cerdo
-            'KG', 'LOTE', '°C',      # Pechuga de pollo  
-            'UND', 'LOTE', '°C',     # Muslo/Contramuslo
-            'KG', 'LOTE', '°C',      # Tilapia
-            'KG', 'LOTE', '°C',      # Carne de res
-            'FIRMA DE RECIBO', 'HORA'
-        ]
-        
-        data = [encabezado]
-        total_cobertura = 0
-        total_cerdo = 0
-        total_pollo = 0
-        total_muslo_contramuslo = 0
-        total_tilapia = 0
-        total_res = 0
-        
-        # Analizar datos para determinar qué productos hay y sus lotes únicos
+        data, presentes = self.preparar_filas_comedores(datos_comedores, lotes_personalizados)
+
+        # CREAR LA TABLA CON ANCHOS ALINEADOS (altura automática para todas las filas)
+        tabla = Table(data, colWidths=ANCHOS_COLUMNAS, rowHeights=[None] * len(data))
+        tabla.setStyle(self.estilo_compilado(len(data) - 2, presentes))
+        return tabla
+
+    def estilo_compilado(self, num_filas_datos, presentes):
+        """
+        ♻️ TableStyle de la tabla de comedores, armado una vez por número de filas y productos
+        """
+        clave = (num_filas_datos, presentes)
+        estilo = self._estilos.get(clave)
+        if estilo is None:
+            estilo = self._estilos[clave] = TableStyle(self.estilo_tabla_comedores(num_filas_datos, presentes))
+        return estilo
+
+    def preparar_filas_comedores(self, datos_comedores, lotes_personalizados=None):
+        """
+        Arma las filas de texto de la tabla de comedores (encabezado, comedores y totales)
+
+        `datos_comedores` es un BloqueComedores (ya tipado y formateado al agrupar las rutas)
+        o una lista de comedores, que se normaliza aquí.
+
+        Returns:
+            tuple: (data, presentes) con presentes = (tiene_cerdo, tiene_pechuga, tiene_muslo,
+                   tiene_tilapia, tiene_res), que decide qué columnas de lote se fusionan
+        """
+        bloque = datos_comedores
+        if not isinstance(bloque, BloqueComedores):
+            bloque = BloqueComedores.desde_comedores(datos_comedores)
+
+        # Lote de cada producto presente (los personalizados tienen prioridad)
         lotes = lotes_personalizados or {}
-        lotes_finales = {}
-        
-        # Determinar lotes únicos para cada tipo de producto
-        tiene_cerdo = any(float(c.get('CARNE_DE_CERDO', 0) or 0) > 0 for c in datos_comedores)
-        tiene_pechuga = any(float(c.get('POLLO_PESO', 0) or 0) > 0 for c in datos_comedores)
-        tiene_muslo = any(int(c.get('MUSLO_CONTRAMUSLO', 0) or 0) > 0 for c in datos_comedores)
-        tiene_tilapia = any(float(c.get('TILAPIA', 0) or 0) > 0 for c in datos_comedores)
-        tiene_res = any(float(c.get('CARNE_DE_RES', 0) or 0) > 0 for c in datos_comedores)
-        
-        if tiene_cerdo:
-            lotes_finales['cerdo'] = lotes.get('cerdo') if lotes.get('cerdo') else str(self.generar_lote_aleatorio())
-        if tiene_pechuga:
-            lotes_finales['pechuga'] = lotes.get('pechuga') if lotes.get('pechuga') else str(self.generar_lote_aleatorio())
-        if tiene_muslo:
-            lotes_finales['muslo'] = lotes.get('muslo') if lotes.get('muslo') else str(self.generar_lote_aleatorio())
-        if tiene_tilapia:
-            lotes_finales['tilapia'] = lotes.get('tilapia') if lotes.get('tilapia') else str(self.generar_lote_aleatorio())
-        if tiene_res:
-            lotes_finales['res'] = lotes.get('res') if lotes.get('res') else str(self.generar_lote_aleatorio())
-        
-        # Construir filas de datos
-        for i, comedor in enumerate(datos_comedores, 1):
-            # Obtener datos de los productos
-            cerdo_peso = float(comedor.get('CARNE_DE_CERDO', 0) or 0)
-            pollo_peso = float(comedor.get('POLLO_PESO', 0) or 0)
-            muslo_contramuslo_und = int(comedor.get('MUSLO_CONTRAMUSLO', 0) or 0)
-            tilapia_peso = float(comedor.get('TILAPIA', 0) or 0)
-            res_peso = float(comedor.get('CARNE_DE_RES', 0) or 0)
-            
-            # Acumular totales
-            total_cobertura += int(comedor.get('COBER', 0) or 0)
-            total_cerdo += cerdo_peso
-            total_pollo += pollo_peso
-            total_muslo_contramuslo += muslo_contramuslo_und
-            total_tilapia += tilapia_peso
-            total_res += res_peso
-            
-            fila = [
-                str(i),
-                dividir_texto_inteligente(comedor.get('MUNICIPIO', 'CALI'), max_chars_por_linea=8, max_lineas=2),
-                comedor.get('DEPARTAMENTO', 'VALLE'),
-                dividir_texto_inteligente(comedor.get('COMEDOR/ESCUELA', ''), max_chars_por_linea=25, max_lineas=3),
-                str(comedor.get('COBER', 0)),
-                dividir_texto_inteligente(comedor.get('DIRECCIÓN', ''), max_chars_por_linea=20, max_lineas=3),
-                # 1. Carne de cerdo (columnas 6-8)
-                f"{cerdo_peso:.2f}" if cerdo_peso > 0 else "",
-                # Para la primera fila que tiene cerdo, ponemos el lote. Para las demás, cadena vacía (se fusionará)
-                self.dividir_lote_inteligente(lotes_finales.get('cerdo', '')) if i == 1 and tiene_cerdo else '',
-                f"{self.generar_temperatura_aleatoria()}°C" if cerdo_peso > 0 else "",
-                # 2. Pechuga de pollo (columnas 9-11)
-                f"{pollo_peso:.2f}" if pollo_peso > 0 else "",
-                self.dividir_lote_inteligente(lotes_finales.get('pechuga', '')) if i == 1 and tiene_pechuga else '',
-                f"{self.generar_temperatura_aleatoria()}°C" if pollo_peso > 0 else "",
-                # 3. Muslo/Contramuslo (columnas 12-14)
-                str(muslo_contramuslo_und) if muslo_contramuslo_und > 0 else "",
-                self.dividir_lote_inteligente(lotes_finales.get('muslo', '')) if i == 1 and tiene_muslo else '',
-                f"{self.generar_temperatura_aleatoria()}°C" if muslo_contramuslo_und > 0 else "",
-                # 4. Tilapia (columnas 15-17)
-                f"{tilapia_peso:.2f}" if tilapia_peso > 0 else "",
-                self.dividir_lote_inteligente(lotes_finales.get('tilapia', '')) if i == 1 and tiene_tilapia else '',
-                f"{self.generar_temperatura_aleatoria()}°C" if tilapia_peso > 0 else "",
-                # 5. Carne de res (columnas 18-20)
-                f"{res_peso:.2f}" if res_peso > 0 else "",
-                self.dividir_lote_inteligente(lotes_finales.get('res', '')) if i == 1 and tiene_res else '',
-                f"{self.generar_temperatura_aleatoria()}°C" if res_peso > 0 else "",
-                # 6. Firma y hora (columnas 21-22)
-                '',  # FIRMA DE RECIBO
-                ''   # HORA DE ENTREGA
-            ]
-            
+        lotes_texto = [
+            self.dividir_lote_inteligente(lotes.get(producto) if lotes.get(producto) else str(self.generar_lote_aleatorio()))
+            if presente else ''
+            for (producto, _, _), presente in zip(PRODUCTOS, bloque.presentes)
+        ]
+
+        data = [list(ENCABEZADO_COMEDORES)]
+        textos = [bloque.textos[columna] for _, columna, _ in PRODUCTOS]
+        for i, celdas in enumerate(bloque.celdas):
+            fila = [str(i + 1), *celdas]
+            for lote_texto, textos_producto in zip(lotes_texto, textos):
+                texto = textos_producto[i]
+                # El lote va solo en la primera fila (las demás se fusionan con ella)
+                fila += [
+                    texto,
+                    lote_texto if i == 0 else '',
+                    f"{self.generar_temperatura_aleatoria()}°C" if texto else "",
+                ]
+            fila += ['', '']  # FIRMA DE RECIBO, HORA DE ENTREGA
             data.append(fila)
 
-        # AGREGAR FILA DE TOTALES
-        fila_total = [
-            'TOTAL COBERTURA RUTA', '', '', '',     # Posiciones 0-3 combinadas
-            f"{total_cobertura:,}", '',             # Posiciones 4-5
-            f"{total_cerdo:.2f}" if total_cerdo > 0 else "", '', '',           # Total cerdo (6-8)
-            f"{total_pollo:.2f}" if total_pollo > 0 else "", '', '',           # Total pechuga (9-11)
-            f"{total_muslo_contramuslo}" if total_muslo_contramuslo > 0 else "", '', '',   # Total muslo/contramuslo (12-14)
-            f"{total_tilapia:.2f}" if total_tilapia > 0 else "", '', '',       # Total tilapia (15-17)
-            f"{total_res:.2f}" if total_res > 0 else "", '', '',             # Total res (18-20)
-            '', ''                                  # Firma y hora (21-22)
-        ]
-        data.append(fila_total)
-
-        # CREAR LA TABLA CON ANCHOS ALINEADOS
-        tabla = Table(data, colWidths=[
-            0.25*cm, # N°
-            0.7*cm,  # MUNICIPIO
-            0.7*cm,  # DEPARTAMENTO
-            1.8*cm,  # COMEDOR/ESCUELA
-            0.6*cm,  # COBER
-            1.5*cm,  # DIRECCIÓN
-            0.7*cm, 0.9*cm, 0.7*cm,  # Cerdo: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Pechuga: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Muslo/Contramuslo: UND, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Tilapia: KG, LOTE, °C
-            0.7*cm, 0.9*cm, 0.7*cm,  # Res: KG, LOTE, °C
-            1.5*cm, 0.8*cm           # FIRMA, HORA
-        ], rowHeights=[None for _ in range(len(data))])  # Altura automática para todas las filas
+        data.append(bloque.fila_totales())
+        return data, bloque.presentes
+
+    def estilo_tabla_comedores(self, num_filas_datos, presentes):
+        """
+        Comandos de TableStyle de la tabla de comedores para `num_filas_datos` comedores
+        """
+        tiene_cerdo, tiene_pechuga, tiene_muslo, tiene_tilapia, tiene_res = presentes
 
         # APLICAR ESTILOS
         style = [
@@ -501,8 +460,6 @@ class PlantillaGuiaTransporte:
         ]
         
         # Agregar comandos SPAN para fusionar celdas de lotes verticalmente
-        num_filas_datos = len(datos_comedores)  # Número de filas de comedores (sin contar encabezado ni total)
-        
         if num_filas_datos > 1:  # Solo fusionar si hay más de una fila
             # SPAN para columnas de lotes (fusionar desde fila 1 hasta la última fila de datos)
             # Fila 0 = encabezado, Fila 1 a num_filas_datos = datos, Fila -1 = totales
@@ -526,87 +483,8 @@ class PlantillaGuiaTransporte:
             ('SPAN', (0, -1), (3, -1)),
         ]
             
-        tabla.setStyle(TableStyle(style))
-        return tabla
+        return style
 
-        # APLICAR ESTILOS
-        style = [
-            ('FONTSIZE', (0, 0), (-1, -1), 4),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), -1),  # Espacio inferior mínimo en toda la tabla
-            # Estilo del encabezado
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            # Alineación especial para algunas columnas
-            ('ALIGN', (0, 1), (0, -2), 'CENTER'),  # Números
-            ('ALIGN', (4, 1), (4, -2), 'RIGHT'),   # Cobertura
-            ('ALIGN', (6, 1), (6, -2), 'RIGHT'),   # KG Cerdo
-            ('ALIGN', (9, 1), (9, -2), 'RIGHT'),   # KG Pechuga
-            ('ALIGN', (12, 1), (12, -2), 'RIGHT'), # UND Muslo/Contramuslo
-            ('ALIGN', (15, 1), (15, -2), 'RIGHT'), # KG Res
-            # AJUSTES ESPECIALES PARA COMEDOR/ESCUELA (columna 3)
-            ('FONTSIZE', (3, 1), (3, -2), 4),
-            ('ALIGN', (3, 1), (3, -2), 'LEFT'),
-            ('VALIGN', (3, 1), (3, -2), 'TOP'),
-            ('LEFTPADDING', (3, 1), (3, -2), 1),
-            ('RIGHTPADDING', (3, 1), (3, -2), 1),
-            # AJUSTES ESPECIALES PARA DIRECCIÓN (columna 5)
-            ('FONTSIZE', (5, 1), (5, -2), 4),
-            ('ALIGN', (5, 1), (5, -2), 'LEFT'),
-            ('VALIGN', (5, 1), (5, -2), 'TOP'),
-            ('LEFTPADDING', (5, 1), (5, -2), 1),
-            ('RIGHTPADDING', (5, 1), (5, -2), 1),
-            # ESTILOS PARA COLUMNAS DE LOTES
-            ('FONTSIZE', (7, 1), (7, -2), 4),    # Lote Cerdo (columna 7)
-            ('FONTSIZE', (10, 1), (10, -2), 4),  # Lote Pechuga (columna 10)
-            ('FONTSIZE', (13, 1), (13, -2), 4),  # Lote Muslo (columna 13)
-            ('FONTSIZE', (16, 1), (16, -2), 4),  # Lote Res (columna 16)
-            ('VALIGN', (7, 1), (7, -2), 'MIDDLE'), # Alineación vertical centrada para celdas fusionadas
-            ('VALIGN', (10, 1), (10, -2), 'MIDDLE'),
-            ('VALIGN', (13, 1), (13, -2), 'MIDDLE'),
-            ('VALIGN', (16, 1), (16, -2), 'MIDDLE'),
-            ('LEFTPADDING', (7, 1), (7, -2), 1),  # Padding reducido
-            ('RIGHTPADDING', (7, 1), (7, -2), 1),
-            ('LEFTPADDING', (10, 1), (10, -2), 1),
-            ('RIGHTPADDING', (10, 1), (10, -2), 1),
-            ('LEFTPADDING', (13, 1), (13, -2), 1),
-            ('RIGHTPADDING', (13, 1), (13, -2), 1),
-            ('LEFTPADDING', (16, 1), (16, -2), 1),
-            ('RIGHTPADDING', (16, 1), (16, -2), 1)
-        ]
-        
-        # Agregar comandos SPAN para fusionar celdas de lotes verticalmente
-        num_filas_datos = len(datos_comedores)  # Número de filas de comedores (sin contar encabezado ni total)
-        
-        if num_filas_datos > 1:  # Solo fusionar si hay más de una fila
-            # SPAN para columnas de lotes (fusionar desde fila 1 hasta la última fila de datos)
-            # Fila 0 = encabezado, Fila 1 a num_filas_datos = datos, Fila -1 = totales
-            ultima_fila_datos = num_filas_datos  # La última fila de datos (antes de totales)
-            
-            if tiene_cerdo:
-                style.append(('SPAN', (7, 1), (7, ultima_fila_datos)))  # Columna 7 (Lote Cerdo)
-            if tiene_pechuga:
-                style.append(('SPAN', (10, 1), (10, ultima_fila_datos)))  # Columna 10 (Lote Pechuga)
-            if tiene_muslo:
-                style.append(('SPAN', (13, 1), (13, ultima_fila_datos)))  # Columna 13 (Lote Muslo)
-            if tiene_res:
-                style.append(('SPAN', (16, 1), (16, ultima_fila_datos)))  # Columna 16 (Lote Res)
-        
-        # Estilo de la fila de totales
-        style += [
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('SPAN', (0, -1), (3, -1)),
-        ]
-            
-        tabla.setStyle(TableStyle(style))
-        return tabla
-    
-    
-        
     def crear_pie_pagina(self, elaborado_por="____________________", conductor=None, placa=None):
         """
         Crea el pie de página con firmas y notas finales
@@ -626,8 +504,8 @@ class PlantillaGuiaTransporte:
                 
         elementos.append(Spacer(1, 0.3*cm))
         
-        # Crear tabla con firmas dinámicas
-        tabla_firmas = self._crear_tabla_firmas_con_imagenes(elaborado_por)
+        # Crear tabla con firmas dinámicas (una sola vez por firmante en el lote)
+        tabla_firmas = self.contexto.tabla_firmas(elaborado_por, self._crear_tabla_firmas_con_imagenes)
         elementos.append(tabla_firmas)
         
         # Nota final
@@ -643,19 +521,11 @@ class PlantillaGuiaTransporte:
         Crea tabla de firmas con imágenes dinámicas o texto placeholder
         """
         def cargar_imagen_firma(nombre_persona, ancho=1.5*cm, alto=0.8*cm):
-            """Carga imagen de firma desde la carpeta imagenes/"""
+            """Carga imagen de firma desde la carpeta imagenes/ (decodificada una vez por lote)"""
             try:
-                # Crear carpeta si no existe
-                if not os.path.exists("imagenes"):
-                    os.makedirs("imagenes")
-                
-                # Buscar imagen con diferentes extensiones
-                extensiones = ['.png', '.jpg', '.jpeg', '.gif']
-                for ext in extensiones:
-                    ruta_imagen = os.path.join("imagenes", f"{nombre_persona}{ext}")
-                    if os.path.exists(ruta_imagen):
-                        imagen = Image(ruta_imagen, width=ancho, height=alto)
-                        return imagen
+                imagen = self.contexto.imagen_firma(nombre_persona, ancho, alto)
+                if imagen is not None:
+                    return imagen
                 
                 # Si no encuentra imagen, devolver línea de firma
                 return Paragraph("_" * 25, self.styles['Normal'])
@@ -666,10 +536,10 @@ class PlantillaGuiaTransporte:
 
         # Preparar datos para la tabla de firmas
         elaborado_texto = f'ELABORADO POR: {elaborado_por}'
-        aprobado_texto = f'APROBADO POR: SANDRA HENAO TORO'
+        aprobado_texto = f'APROBADO POR: {FIRMANTE_APROBACION}'
 
         firma_elaborado = cargar_imagen_firma(elaborado_por)
-        firma_aprobado = cargar_imagen_firma("SANDRA HENAO TORO")
+        firma_aprobado = cargar_imagen_firma(FIRMANTE_APROBACION)
 
         # Combinar nombre y firma en la misma celda
         celda_elaborado = [Paragraph(elaborado_texto, self.styles['Normal']), Spacer(0.5, 0.05*cm), firma_elaborado]
@@ -734,23 +604,20 @@ class PlantillaGuiaTransporte:
     # =================================================================================
     # === NUEVO MÉTODO AÑADIDO PARA SOLUCIONAR EL ERROR DE PAGINACIÓN ===
     # =================================================================================
-    def generar_pdf_con_paginacion(self, datos_programa, datos_comedores, lotes_personalizados=None, elaborado_por="____________________", nombre_archivo="guia_transporte.pdf", conductor=None, placa=None):
+    def generar_pdf_con_paginacion(self, datos_programa, datos_comedores, lotes_personalizados=None, elaborado_por="____________________", nombre_archivo="guia_transporte.pdf", conductor=None, placa=None, buffer=None):
         """
         Genera un PDF completo con paginación correcta, dividiendo la tabla de comedores
         en trozos de 4 filas por página.
+        
+        Si se pasa `buffer` (cualquier objeto con write, p. ej. BytesIO), el PDF se escribe
+        directamente en él sin tocar el disco; si no, se guarda en `nombre_archivo`.
         """
-        doc = SimpleDocTemplate(
-            nombre_archivo, 
-            pagesize=A4,
-            rightMargin=0.3*inch,
-            leftMargin=0.3*inch,
-            topMargin=0.2*inch, 
-            bottomMargin=0.5*inch
-        )
+        destino = buffer if buffer is not None else nombre_archivo
+        doc = SimpleDocTemplate(destino, pagesize=A4, **MARGENES_GUIA)
         
         story = []
-        filas_por_pagina = 4
-        numero_guia = f"{datetime.now().strftime('%m%d')}-{random.randint(100, 999)}"
+        filas_por_pagina = FILAS_POR_PAGINA
+        numero_guia = self.generar_numero_guia_aleatorio()
 
         # Itera sobre los datos de comedores en trozos de 'filas_por_pagina'
         for i in range(0, len(datos_comedores), filas_por_pagina):
@@ -785,7 +652,7 @@ class PlantillaGuiaTransporte:
         # Generar el PDF final con todos los elementos de todas las páginas
         try:
             doc.build(story)
-            print(f"PDF con paginación generado exitosamente: {nombre_archivo}")
+            print(f"PDF con paginación generado exitosamente: {nombre_archivo if buffer is None else 'en memoria'}")
         except Exception as e:
             print(f"Error al construir el PDF final con paginación: {e}")
             raise # Vuelve a lanzar la excepción para que sea manejada por el llamador
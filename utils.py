@@ -9,6 +9,13 @@ import re
 import unicodedata
 from datetime import datetime
 from io import BytesIO
+from raw_sheet import RawSheet
+from record_builder import ampliar_flotantes
+from report_summary import resumir
+from excel_export import escribir_libro_streaming
+
+# Filas a partir de las cuales el Excel de descarga se escribe en streaming (memoria constante)
+FILAS_EXCEL_STREAMING = 20000
 
 class UtilsHelper:
     """
@@ -16,7 +23,7 @@ class UtilsHelper:
     """
     
     @staticmethod
-    def crear_excel_descarga_universal(df, tipo_archivo, info_extraida=None):
+    def crear_excel_descarga_universal(df, tipo_archivo, info_extraida=None, resumen=None, motor=None):
         """
         ✅ Crea un archivo Excel optimizado para descarga - COMPLETAMENTE RENOVADO
         
@@ -24,61 +31,82 @@ class UtilsHelper:
             df (DataFrame): Datos procesados
             tipo_archivo (str): Tipo de archivo detectado
             info_extraida (dict): Información extraída del encabezado
+            resumen (ResumenReporte): Agregados ya calculados de df (se calculan si falta)
+            motor (str): "openpyxl" (pd.ExcelWriter, libro completo en memoria) o "streaming"
+                         (write_only, memoria constante); None elige "streaming" a partir de
+                         FILAS_EXCEL_STREAMING filas
             
         Returns:
-            BytesIO: Buffer con archivo Excel
+            BytesIO | SpooledTemporaryFile: Archivo Excel posicionado al inicio
         """
-        output = BytesIO()
+        if motor is None:
+            motor = "streaming" if len(df) >= FILAS_EXCEL_STREAMING else "openpyxl"
+        if motor == "streaming":
+            # Los float32 se convierten a su valor decimal bloque a bloque al escribir
+            return escribir_libro_streaming(UtilsHelper._hojas_excel(df, tipo_archivo, info_extraida, resumen))
         
+        output = BytesIO()
+        # Los kilos se guardan en float32: exportarlos con su valor decimal (12.3, no 12.300000190734863)
+        df = ampliar_flotantes(df)
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # 📊 HOJA 1: DATOS PROCESADOS
-            df.to_excel(writer, sheet_name='Datos_Procesados', index=False)
-            
-            # 📋 HOJA 2: RESUMEN COMPLETO CON NUEVA ESTRUCTURA
-            resumen_data = UtilsHelper._crear_datos_resumen(df, tipo_archivo, info_extraida)
-            df_resumen = pd.DataFrame(resumen_data)
-            df_resumen.to_excel(writer, sheet_name='Resumen_General', index=False)
-            
-            # 📈 HOJA 3: ANÁLISIS POR RUTA
-            df_por_ruta = UtilsHelper._crear_analisis_por_ruta(df)
-            df_por_ruta.to_excel(writer, sheet_name='Analisis_Por_Ruta')
-            
-            # 🏢 HOJA 4: ANÁLISIS POR EMPRESA/MODALIDAD
-            if 'EMPRESA' in df.columns and 'MODALIDAD' in df.columns:
-                try:
-                    df_por_empresa = UtilsHelper._crear_analisis_por_empresa(df)
-                    if not df_por_empresa.empty:
-                        df_por_empresa.to_excel(writer, sheet_name='Analisis_Por_Empresa')
-                except Exception as e:
-                    # Si hay error, crear hoja con mensaje de error
-                    error_df = pd.DataFrame({'Error': [f'Error creando análisis por empresa: {str(e)}']})
-                    error_df.to_excel(writer, sheet_name='Analisis_Por_Empresa', index=False)
-            
-            # 📅 HOJA 5: ANÁLISIS TEMPORAL (si hay datos de fechas)
-            if 'DIAS_CONSUMO' in df.columns:
-                try:
-                    df_temporal = UtilsHelper._crear_analisis_temporal(df)
-                    if not df_temporal.empty:
-                        df_temporal.to_excel(writer, sheet_name='Analisis_Temporal')
-                except Exception as e:
-                    # Si hay error, crear hoja con mensaje de error
-                    error_df = pd.DataFrame({'Error': [f'Error creando análisis temporal: {str(e)}']})
-                    error_df.to_excel(writer, sheet_name='Analisis_Temporal', index=False)
-            
-            # 🔍 HOJA 6: METADATOS Y INFORMACIÓN TÉCNICA
-            metadatos_dict = UtilsHelper._crear_metadatos(df, tipo_archivo, info_extraida)
-            df_metadatos = pd.DataFrame(metadatos_dict)
-            df_metadatos.to_excel(writer, sheet_name='Metadatos', index=False)
+            for nombre, hoja, index in UtilsHelper._hojas_excel(df, tipo_archivo, info_extraida, resumen):
+                hoja.to_excel(writer, sheet_name=nombre, index=index)
         
         output.seek(0)
         return output
     
     @staticmethod
-    def _crear_datos_resumen(df, tipo_archivo, info_extraida):
+    def _hojas_excel(df, tipo_archivo, info_extraida, resumen=None):
+        """
+        📑 Hojas del Excel de descarga, en orden: lista de (nombre, DataFrame, index)
+        """
+        # Todas las hojas de análisis salen de una sola pasada agrupada
+        resumen = resumen or resumir(df)
+        
+        # 📊 HOJA 1: DATOS PROCESADOS
+        hojas = [('Datos_Procesados', df, False)]
+        
+        # 📋 HOJA 2: RESUMEN COMPLETO CON NUEVA ESTRUCTURA
+        resumen_data = UtilsHelper._crear_datos_resumen(resumen, tipo_archivo, info_extraida)
+        hojas.append(('Resumen_General', pd.DataFrame(resumen_data), False))
+        
+        # 📈 HOJA 3: ANÁLISIS POR RUTA
+        hojas.append(('Analisis_Por_Ruta', UtilsHelper._crear_analisis_por_ruta(resumen), True))
+        
+        # 🏢 HOJA 4: ANÁLISIS POR EMPRESA/MODALIDAD
+        if 'EMPRESA' in df.columns and 'MODALIDAD' in df.columns:
+            try:
+                df_por_empresa = UtilsHelper._crear_analisis_por_empresa(resumen)
+                if not df_por_empresa.empty:
+                    hojas.append(('Analisis_Por_Empresa', df_por_empresa, True))
+            except Exception as e:
+                # Si hay error, crear hoja con mensaje de error
+                error_df = pd.DataFrame({'Error': [f'Error creando análisis por empresa: {str(e)}']})
+                hojas.append(('Analisis_Por_Empresa', error_df, False))
+        
+        # 📅 HOJA 5: ANÁLISIS TEMPORAL (si hay datos de fechas)
+        if 'DIAS_CONSUMO' in df.columns:
+            try:
+                df_temporal = UtilsHelper._crear_analisis_temporal(resumen)
+                if not df_temporal.empty:
+                    hojas.append(('Analisis_Temporal', df_temporal, True))
+            except Exception as e:
+                # Si hay error, crear hoja con mensaje de error
+                error_df = pd.DataFrame({'Error': [f'Error creando análisis temporal: {str(e)}']})
+                hojas.append(('Analisis_Temporal', error_df, False))
+        
+        # 🔍 HOJA 6: METADATOS Y INFORMACIÓN TÉCNICA
+        metadatos_dict = UtilsHelper._crear_metadatos(df, tipo_archivo, info_extraida, resumen)
+        hojas.append(('Metadatos', pd.DataFrame(metadatos_dict), False))
+        return hojas
+    
+    @staticmethod
+    def _crear_datos_resumen(resumen, tipo_archivo, info_extraida):
         """
-        📋 Crea los datos de resumen con la nueva estructura
+        📋 Crea los datos de resumen con la nueva estructura (a partir del ResumenReporte)
         """
         info_extraida = info_extraida or {}
+        totales = resumen.totales
         
         return {
             'Métrica': [
@@ -107,47 +135,39 @@ class UtilsHelper:
             ],
             'Valor': [
                 tipo_archivo,
-                info_extraida.get('programa', df['PROGRAMA'].iloc[0] if len(df) > 0 and 'PROGRAMA' in df.columns else "N/A"),
-                info_extraida.get('empresa', df['EMPRESA'].iloc[0] if len(df) > 0 and 'EMPRESA' in df.columns else "N/A"),
-                info_extraida.get('modalidad', df['MODALIDAD'].iloc[0] if len(df) > 0 and 'MODALIDAD' in df.columns else "N/A"),
-                info_extraida.get('solicitud_remesa', df['SOLICITUD_REMESA'].iloc[0] if len(df) > 0 and 'SOLICITUD_REMESA' in df.columns else "N/A"),
-                info_extraida.get('dias_consumo', df['DIAS_CONSUMO'].iloc[0] if len(df) > 0 and 'DIAS_CONSUMO' in df.columns else "N/A"),
-                info_extraida.get('fecha_entrega', df['FECHA_ENTREGA'].iloc[0] if len(df) > 0 and 'FECHA_ENTREGA' in df.columns else "N/A"),
-                len(df),
-                f"{df['COBER'].sum():,}" if 'COBER' in df.columns else "0",
-                df['RUTA'].nunique() if 'RUTA' in df.columns else "0",
-                f"{df['CARNE_DE_CERDO'].sum():.2f}" if 'CARNE_DE_CERDO' in df.columns else "0.00",
-                f"{df['CARNE_DE_RES'].sum():.2f}" if 'CARNE_DE_RES' in df.columns else "0.00",
-                f"{df['MUSLO_CONTRAMUSLO'].sum():,}" if 'MUSLO_CONTRAMUSLO' in df.columns else "0",
-                f"{df['POLLO_PESO'].sum():.2f}" if 'POLLO_PESO' in df.columns else "0.00",
-                f"{df['TILAPIA'].sum():.2f}" if 'TILAPIA' in df.columns else "0.00",
-                f"${df['CARNE_DE_CERDO'].sum() * 15000:,.0f}" if 'CARNE_DE_CERDO' in df.columns else "$0",  # Precio estimado
-                f"${df['CARNE_DE_RES'].sum() * 18000:,.0f}" if 'CARNE_DE_RES' in df.columns else "$0",
-                f"${df['POLLO_PESO'].sum() * 12000:,.0f}" if 'POLLO_PESO' in df.columns else "$0",
-                f"${df['TILAPIA'].sum() * 16000:,.0f}" if 'TILAPIA' in df.columns else "$0",
-                f"{df['COBER'].mean():.1f}" if 'COBER' in df.columns and len(df) > 0 else "0.0",
-                df.groupby('RUTA')['COBER'].sum().max() if 'RUTA' in df.columns and 'COBER' in df.columns else "0",
+                info_extraida.get('programa', resumen.primero('PROGRAMA')),
+                info_extraida.get('empresa', resumen.primero('EMPRESA')),
+                info_extraida.get('modalidad', resumen.primero('MODALIDAD')),
+                info_extraida.get('solicitud_remesa', resumen.primero('SOLICITUD_REMESA')),
+                info_extraida.get('dias_consumo', resumen.primero('DIAS_CONSUMO')),
+                info_extraida.get('fecha_entrega', resumen.primero('FECHA_ENTREGA')),
+                resumen.num_filas,
+                f"{totales['COBER']:,}" if resumen.tiene('COBER') else "0",
+                resumen.rutas if resumen.tiene('RUTA') else "0",
+                f"{totales['CARNE_DE_CERDO']:.2f}" if resumen.tiene('CARNE_DE_CERDO') else "0.00",
+                f"{totales['CARNE_DE_RES']:.2f}" if resumen.tiene('CARNE_DE_RES') else "0.00",
+                f"{totales['MUSLO_CONTRAMUSLO']:,}" if resumen.tiene('MUSLO_CONTRAMUSLO') else "0",
+                f"{totales['POLLO_PESO']:.2f}" if resumen.tiene('POLLO_PESO') else "0.00",
+                f"{totales['TILAPIA']:.2f}" if resumen.tiene('TILAPIA') else "0.00",
+                f"${resumen.valor_estimado('CARNE_DE_CERDO'):,.0f}" if resumen.tiene('CARNE_DE_CERDO') else "$0",  # Precio estimado
+                f"${resumen.valor_estimado('CARNE_DE_RES'):,.0f}" if resumen.tiene('CARNE_DE_RES') else "$0",
+                f"${resumen.valor_estimado('POLLO_PESO'):,.0f}" if resumen.tiene('POLLO_PESO') else "$0",
+                f"${resumen.valor_estimado('TILAPIA'):,.0f}" if resumen.tiene('TILAPIA') else "$0",
+                f"{resumen.promedio_beneficiarios:.1f}" if resumen.tiene('COBER') and resumen.num_filas > 0 else "0.0",
+                resumen.cobertura_mayor_ruta() if resumen.tiene('RUTA') and resumen.tiene('COBER') else "0",
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             ]
         }
     
     @staticmethod
-    def _crear_analisis_por_ruta(df):
+    def _crear_analisis_por_ruta(resumen):
         """
         📈 Crea análisis detallado por ruta
         """
-        if 'RUTA' not in df.columns:
+        if not resumen.tiene('RUTA'):
             return pd.DataFrame({'Error': ['No se encontraron rutas en los datos']})
         
-        df_por_ruta = df.groupby('RUTA').agg({
-            'COMEDOR/ESCUELA': 'count',
-            'COBER': 'sum',
-            'CARNE_DE_CERDO': 'sum',
-            'CARNE_DE_RES': 'sum',
-            'MUSLO_CONTRAMUSLO': 'sum',
-            'POLLO_PESO': 'sum',
-            'TILAPIA': 'sum'
-        }).round(2)
+        df_por_ruta = resumen.por_ruta().round(2)
         
         # Renombrar columnas para mayor claridad
         df_por_ruta.columns = [
@@ -173,24 +193,15 @@ class UtilsHelper:
         return df_por_ruta
     
     @staticmethod
-    def _crear_analisis_por_empresa(df):
+    def _crear_analisis_por_empresa(resumen):
         """
         🏢 Crea análisis por empresa y modalidad
         """
-        if 'EMPRESA' not in df.columns:
+        if not resumen.tiene('EMPRESA'):
             return pd.DataFrame({'Error': ['No se encontró información de empresa']})
         
         # Análisis por empresa
-        df_empresa = df.groupby(['EMPRESA', 'MODALIDAD']).agg({
-            'COMEDOR/ESCUELA': 'count',
-            'COBER': 'sum',
-            'RUTA': 'nunique',
-            'CARNE_DE_CERDO': 'sum',
-            'CARNE_DE_RES': 'sum',
-            'MUSLO_CONTRAMUSLO': 'sum',
-            'POLLO_PESO': 'sum',
-            'TILAPIA': 'sum'
-        }).round(2)
+        df_empresa = resumen.por_empresa().round(2)
         
         df_empresa.columns = [
             'Comedores',
@@ -206,26 +217,22 @@ class UtilsHelper:
         return df_empresa
     
     @staticmethod
-    def _crear_analisis_temporal(df):
+    def _crear_analisis_temporal(resumen):
         """
         📅 Crea análisis temporal basado en días de consumo
         """
-        if 'DIAS_CONSUMO' not in df.columns:
+        if not resumen.tiene('DIAS_CONSUMO'):
             return pd.DataFrame({'Error': ['No se encontró información temporal']})
         
         # Crear análisis básico por días de consumo
-        df_temporal = df.groupby('DIAS_CONSUMO').agg({
-            'COMEDOR/ESCUELA': 'count',
-            'COBER': 'sum',
-            'RUTA': 'nunique'
-        })
+        df_temporal = resumen.temporal()
         
         df_temporal.columns = ['Comedores', 'Beneficiarios', 'Rutas']
         
         return df_temporal
     
     @staticmethod
-    def _crear_metadatos(df, tipo_archivo, info_extraida):
+    def _crear_metadatos(df, tipo_archivo, info_extraida, resumen=None):
         """
         🔍 Crea hoja de metadatos técnicos
         
@@ -233,6 +240,8 @@ class UtilsHelper:
             dict: Diccionario con estructura para DataFrame
         """
         info_extraida = info_extraida or {}
+        if resumen is None and df is not None:
+            resumen = resumir(df)
         
         metadatos = {
             'Propiedad': [
@@ -259,8 +268,8 @@ class UtilsHelper:
                 len(df) if df is not None else 0,
                 "Numérico, Texto, Fecha",
                 "Cerdo, Res, Muslo/Contramuslo, Pechuga, Tilapia",
-                df['RUTA'].nunique() if df is not None and 'RUTA' in df.columns else 0,
-                df['MUNICIPIO'].nunique() if df is not None and 'MUNICIPIO' in df.columns else 0,
+                resumen.rutas if resumen is not None else 0,
+                resumen.municipios if resumen is not None else 0,
                 f"{info_extraida.get('dias_consumo', 'No especificado')}",
                 "Patrones regex + contexto",
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -375,32 +384,13 @@ class UtilsHelper:
         return f"{prefijo}_{timestamp}.{extension}"
     
     @staticmethod
-    def extraer_estadisticas_rapidas(df):
+    def extraer_estadisticas_rapidas(df, resumen=None):
         """
         ⚡ Extrae estadísticas rápidas para mostrar en la interfaz
-        """
-        if df is None or len(df) == 0:
-            return {
-                'comedores': 0,
-                'beneficiarios': 0,
-                'rutas': 0,
-                'cerdo_kg': 0,
-                'res_kg': 0,
-                'pollo_kg': 0,
-                'tilapia_kg': 0,
-                'muslo_und': 0
-            }
         
-        return {
-            'comedores': len(df),
-            'beneficiarios': int(df['COBER'].sum()) if 'COBER' in df.columns else 0,
-            'rutas': df['RUTA'].nunique() if 'RUTA' in df.columns else 0,
-            'cerdo_kg': float(df['CARNE_DE_CERDO'].sum()) if 'CARNE_DE_CERDO' in df.columns else 0,
-            'res_kg': float(df['CARNE_DE_RES'].sum()) if 'CARNE_DE_RES' in df.columns else 0,
-            'pollo_kg': float(df['POLLO_PESO'].sum()) if 'POLLO_PESO' in df.columns else 0,
-            'tilapia_kg': float(df['TILAPIA'].sum()) if 'TILAPIA' in df.columns else 0,
-            'muslo_und': int(df['MUSLO_CONTRAMUSLO'].sum()) if 'MUSLO_CONTRAMUSLO' in df.columns else 0
-        }
+        Si se pasa el ResumenReporte del lote, se leen de él sin volver a agrupar.
+        """
+        return (resumen or resumir(df)).estadisticas()
     
     @staticmethod
     def crear_mensaje_html_correo(estadisticas, info_extraida, nombres_archivos):
@@ -465,24 +455,28 @@ class FileValidator:
         """
         ✅ Valida que el archivo Excel tenga el formato esperado
         
+        Args:
+            archivo: RawSheet ya leída (recomendado, no vuelve a leer el libro) o archivo subido
+        
         Returns:
             tuple: (es_valido, mensaje_error)
         """
         try:
-            # Leer las primeras filas para validación
-            df_sample = pd.read_excel(archivo, header=None, nrows=20)
+            # Reutilizar la hoja ya leída; solo se lee el archivo si no se entregó una RawSheet
+            hoja = archivo if isinstance(archivo, RawSheet) else RawSheet.desde_archivo(archivo)
+            filas_muestra = min(hoja.n_filas, 20)
             
             # Validar que tenga al menos 10 filas
-            if len(df_sample) < 10:
+            if filas_muestra < 10:
                 return False, "El archivo debe tener al menos 10 filas de datos"
             
             # Validar que tenga al menos 6 columnas
-            if len(df_sample.columns) < 6:
+            if hoja.columnas_usadas(max_filas=20) < 6:
                 return False, "El archivo debe tener al menos 6 columnas (A-F)"
             
             # Validar que la fila 4 tenga contenido (información del programa)
-            if len(df_sample) > 3:
-                fila_4 = str(df_sample.iloc[3, 0]).strip()
+            if filas_muestra > 3:
+                fila_4 = hoja.celda_texto(3, 0)
                 if not fila_4 or fila_4.lower() in ['nan', 'none', '']:
                     return False, "La fila 4 debe contener información del programa"
             
@@ -496,31 +490,36 @@ class FileValidator:
         """
         🔧 Detecta problemas comunes en archivos Excel
         
+        Args:
+            df_raw: DataFrame crudo o RawSheet ya construida
+            
         Returns:
             list: Lista de problemas detectados
         """
         problemas = []
+        hoja = RawSheet.desde(df_raw)
         
         # Problema 1: Archivo muy pequeño
-        if len(df_raw) < 15:
+        if hoja.n_filas < 15:
             problemas.append("⚠️ El archivo parece muy pequeño (menos de 15 filas)")
         
         # Problema 2: Muchas celdas vacías en columna A
-        celdas_vacias = df_raw.iloc[:, 0].isna().sum()
-        if celdas_vacias > len(df_raw) * 0.5:
+        celdas_vacias = hoja.vacio[:, 0].sum() if hoja.n_columnas > 0 else 0
+        if celdas_vacias > hoja.n_filas * 0.5:
             problemas.append("⚠️ Muchas celdas vacías en la columna A")
         
         # Problema 3: No hay datos en columnas de productos (F, G, H si existen)
-        num_columnas = len(df_raw.columns)
+        num_columnas = hoja.n_columnas
         if num_columnas >= 6:  # Solo validar si tiene al menos 6 columnas
+            columnas_vacias = hoja.vacio[:, 5:min(num_columnas, 8)].all(axis=0)
             for col in range(5, min(num_columnas, 8)):  # Validar F, G, H si existen
-                if df_raw.iloc[:, col].isna().all():
+                if columnas_vacias[col - 5]:
                     problemas.append(f"⚠️ La columna {chr(65+col)} está completamente vacía")
         
         # Problema 4: Formato de fecha inusual
         fecha_encontrada = False
-        for i in range(min(15, len(df_raw))):
-            celda = str(df_raw.iloc[i, 0])
+        for i in range(min(15, hoja.n_filas)):
+            celda = hoja.celda_texto(i, 0)
             if re.search(r'\d{4}-\d{1,2}-\d{1,2}', celda):
                 fecha_encontrada = True
                 break